@@ -1,67 +1,62 @@
-import requests
-import time
 import pandas as pd
 from dotenv import load_dotenv
 import os
-import xml.etree.ElementTree as ET
-import urllib3
+import sys
+import concurrent.futures
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.fetch_journal import PageJournal, ResultCache, safe_name
+from modules.public_data import MAX_WORKERS, Endpoint, Progress, get_client
 
 
 # 1. 환경 변수 로드
 load_dotenv()
-SERVICE_KEY = os.getenv("DRUG_DATA_API_DECODED_KEY")
-
-if SERVICE_KEY is None:
-    raise ValueError("❌ .env 파일에 DRUG_DATA_API_DECODED_KEY 항목이 없습니다.")
 
-# 2. API 기본 설정
-BASE_URL = "http://apis.data.go.kr/1471000/DURPrdlstInfoService03/getUsjntTabooInfoList03"
-ROWS_PER_PAGE = 100
+# 2. API 기본 설정 (itemName 파라미터로 성분명 조회)
+ENDPOINT = Endpoint(
+    path="DURPrdlstInfoService03/getUsjntTabooInfoList03",
+    fields={  # 저장 컬럼명: XML 태그
+        '품목명': 'ITEM_NAME',
+        '성분명': 'INGR_NAME',
+        '금기약품명': 'PROHBT_ITEM_NAME',
+        '금기내용': 'PROHBT_CONTENT',
+        '혼합금기대상약품명': 'MIXTURE_ITEM_NAME',
+    },
+)
+JOURNAL_NAME = "taboo_from_drfstf"  # 성분별 하위 저널: data/journal/taboo_from_drfstf/<성분명>
+INGREDIENT_WORKERS = int(os.getenv("TABOO_INGREDIENT_WORKERS", str(MAX_WORKERS)))  # 동시에 조회할 성분 수
+RESULT_TTL = int(os.getenv("TABOO_CACHE_TTL", str(7 * 24 * 60 * 60)))  # 성분별 결과 캐시 유효 시간(초)
+
+result_cache = ResultCache(JOURNAL_NAME, ttl=RESULT_TTL)
 
 # 3. 성분명으로 병용금기 정보 조회
+# - TTL 안에 조회한 성분은 결과 캐시에서 바로 반환 (API 재조회 없음)
+# - 완료된 페이지는 저널에 기록 → 중단 시 이어서 수집
+def get_journal(item_name):
+    return PageJournal(os.path.join(JOURNAL_NAME, safe_name(item_name)))
+
 def fetch_taboo_by_drfstf(item_name):
-    rows = []
-    page = 1
-    while True:
-        params = {
-            'serviceKey': SERVICE_KEY,
-            'pageNo': str(page),
-            'numOfRows': str(ROWS_PER_PAGE),
-            'type': 'xml',
-            'itemName': item_name
-        }
-        try:
-            response = requests.get(BASE_URL, params=params, verify=False, timeout=10)
-            if response.status_code != 200:
-                print(f"❌ [{item_name}] 페이지 {page} 요청 실패: {response.status_code}")
-                break
-
-            root = ET.fromstring(response.content)
-            items = root.findall('.//item')
-
-            if not items:
-                print(f"⚠️ [{item_name}] 페이지 {page} 결과 없음.")
-                break
-
-            for item in items:
-                rows.append({
-                    '조회성분명': item_name,
-                    '품목명': item.findtext('ITEM_NAME'),
-                    '성분명': item.findtext('INGR_NAME'),
-                    '금기약품명': item.findtext('PROHBT_ITEM_NAME'),
-                    '금기내용': item.findtext('PROHBT_CONTENT'),
-                    '혼합금기대상약품명': item.findtext('MIXTURE_ITEM_NAME')
-                })
-
-            print(f"✅ [{item_name}] 페이지 {page} 완료 (누적 {len(rows)}건)")
-            page += 1
-            time.sleep(0.1)
-
-        except Exception as e:
-            print(f"❌ [{item_name}] 오류 발생: {e}")
-            break
-
-    return rows
+    cached = result_cache.get(item_name)
+    if cached is not None:
+        return cached, True
+
+    journal = get_journal(item_name)
+    try:
+        # 성분 단위로 병렬 처리하므로 성분 내부 페이지는 순차 수집 (동시 요청 수 = INGREDIENT_WORKERS)
+        result = get_client().crawl(
+            ENDPOINT,
+            journal,
+            params={'itemName': item_name},
+            extra_columns={'조회성분명': item_name},
+            workers=1,
+            label=f"[{item_name}] ",
+        )
+    except Exception as e:
+        print(f"❌ [{item_name}] 오류 발생: {e}")
+        raise
+    result_cache.put(item_name, result)
+    journal.clear()
+    return result, False
 
 # 4. 전체 성분명 기반 병용금기 정보 수집
 def fetch_all_from_narcotic_csv(csv_path):
@@ -69,16 +64,38 @@ def fetch_all_from_narcotic_csv(csv_path):
     if 'DRFSTF' not in df.columns:
         raise ValueError("❌ 'DRFSTF' 컬럼이 존재하지 않습니다.")
 
-    unique_items = df['DRFSTF'].dropna().unique()
-    all_rows = []
-
-    for item_name in unique_items:
-        print(f"\n🚀 병용금기 수집 시작: {item_name}")
-        result = fetch_taboo_by_drfstf(item_name)
-        all_rows.extend(result)
-        time.sleep(0.2)
-
-    return pd.DataFrame(all_rows)
+    # 공백/빈 값 정리 후 성분명 중복 제거 (같은 성분은 한 번만 조회)
+    names = df['DRFSTF'].dropna().astype(str).str.strip()
+    unique_items = list(dict.fromkeys(names[names != ""]))
+    results = {}
+    failed = []
+    cache_hits = 0
+
+    print(f"🚀 병용금기 수집 시작: 성분 {len(unique_items)}개 (동시 {INGREDIENT_WORKERS}개)")
+    progress = Progress(len(unique_items), label="성분 ")
+    # 속도 제한기는 get_client()가 프로세스 전체에 하나만 두므로 워커 수와 관계없이 API 한도를 지킴
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, INGREDIENT_WORKERS)) as executor:
+        futures = {executor.submit(fetch_taboo_by_drfstf, item_name): item_name for item_name in unique_items}
+        for future in concurrent.futures.as_completed(futures):
+            item_name = futures[future]
+            try:
+                result, from_cache = future.result()
+            except Exception:
+                failed.append(item_name)
+                progress.update(f"❌ {item_name}")
+                continue
+            results[item_name] = result
+            cache_hits += from_cache
+            progress.update(f"{'♻️' if from_cache else '✅'} {item_name} ({len(result)}건)")
+
+    print(f"📊 성분 {len(unique_items)}개 중 캐시 재사용 {cache_hits}개, 신규 조회 {len(results) - cache_hits}개, 실패 {len(failed)}개")
+
+    if failed:
+        raise ConnectionError(f"❌ {len(failed)}개 성분 수집 미완료 ({', '.join(failed[:5])} ...) — 다시 실행하면 중단된 페이지부터 이어서 수집합니다.")
+
+    # 입력 CSV의 성분 순서대로 재조립
+    frames = [results[item_name] for item_name in unique_items]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
 # 5. 결과 저장 함수
 def save_to_csv(df, filename="data/taboo_from_drfstf.csv"):
@@ -91,10 +108,14 @@ def save_to_csv(df, filename="data/taboo_from_drfstf.csv"):
 if __name__ == "__main__":
     try:
         print("🚀 병용금기 정보 수집 시작 (from narcotic_drug_list.csv)...")
-        df_result = fetch_all_from_narcotic_csv("data\\narcotic_drug_list.csv")
+        df_result = fetch_all_from_narcotic_csv(os.path.join("data", "narcotic_drug_list.csv"))
         if not df_result.empty:
             save_to_csv(df_result)
         else:
             print("⚠️ 수집된 데이터가 없습니다.")
+        PageJournal(JOURNAL_NAME).clear()
     except Exception as e:
         print(f"❌ 전체 오류 발생: {e}")
+        sys.exit(1)
+    finally:
+        get_client().report()
@@ -1,59 +1,26 @@
-import requests
-import time
 import pandas as pd
 from dotenv import load_dotenv
 import os
-import xml.etree.ElementTree as ET
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.fetch_journal import PageJournal
+from modules.public_data import Endpoint, get_client
 
 # 1. 환경 변수 로드
 load_dotenv()
-SERVICE_KEY = os.getenv("DRUG_DATA_API_DECODED_KEY")
-
-if SERVICE_KEY is None:
-    raise ValueError("❌ .env 파일에 DRUG_DATA_API_DECODED_KEY 항목이 없습니다.")
 
 # 2. API 기본 설정
-BASE_URL = "http://apis.data.go.kr/1471000/DURPrdlstInfoService03/getUsjntTabooInfoList03"
-ROWS_PER_PAGE = 100
-
-# 3. 전체 데이터 수집
-def fetch_all_taboo_drug_data():
-    rows = []
-    page = 1
-
-    while True:
-        params = {
-            'serviceKey': SERVICE_KEY,
-            'pageNo': str(page),
-            'numOfRows': str(ROWS_PER_PAGE),
-            'type': 'xml'
-        }
-        response = requests.get(BASE_URL, params=params)
-        if response.status_code != 200:
-            print(f"❌ 페이지 {page} 요청 실패: {response.status_code}")
-            break
+ENDPOINT = Endpoint(
+    path="DURPrdlstInfoService03/getUsjntTabooInfoList03",
+    fields=['ITEM_NAME', 'INGR_NAME', 'PROHBT_ITEM_NAME', 'PROHBT_CONTENT', 'MIXTURE_ITEM_NAME'],
+)
 
-        root = ET.fromstring(response.content)
-        items = root.findall('.//item')
+# 3. 전체 데이터 수집 (완료된 페이지는 저널에 기록 → 중단 시 다음 실행에서 이어서 수집)
+journal = PageJournal("taboo_drug_data")
 
-        if not items:
-            print(f"⚠️ {page} 페이지 항목 없음. 종료")
-            break
-
-        for item in items:
-            rows.append({
-                'ITEM_NAME': item.findtext('ITEM_NAME'),
-                'INGR_NAME': item.findtext('INGR_NAME'),
-                'PROHBT_ITEM_NAME': item.findtext('PROHBT_ITEM_NAME'),
-                'PROHBT_CONTENT': item.findtext('PROHBT_CONTENT'),
-                'MIXTURE_ITEM_NAME': item.findtext('MIXTURE_ITEM_NAME')
-            })
-
-        print(f"✅ {page} 페이지 수집 완료 ({len(rows)} 누적)")
-        page += 1
-        time.sleep(0.1)
-
-    return pd.DataFrame(rows)
+def fetch_all_taboo_drug_data():
+    return get_client().crawl(ENDPOINT, journal)
 
 # 4. 마약 관련 키워드 필터링
 def filter_narcotic_related(df):
@@ -78,5 +45,9 @@ if __name__ == "__main__":
         df_all = fetch_all_taboo_drug_data()
         df_filtered = filter_narcotic_related(df_all)
         save_to_csv(df_filtered)
+        journal.clear()
     except Exception as e:
         print(f"❌ 오류 발생: {e}")
+        sys.exit(1)
+    finally:
+        get_client().report()
@@ -3,7 +3,7 @@ import streamlit as st
 from langchain_core.messages.chat import ChatMessage
 from langchain_teddynote import logging
 from langchain_teddynote.messages import random_uuid
-from modules.agent import create_agent_executor
+from modules.agent import create_agent_executor, release_thread, thread_config
 from dotenv import load_dotenv
 from modules.handler import stream_handler, format_search_result
 from modules.tools import WebSearchTool
@@ -117,6 +117,9 @@ def add_message(role, message, msg_type="text", tool_name=""):
 # 초기화 버튼이 눌리면...
 if clear_btn:
     st.session_state["messages"] = []
+    # 에이전트 체크포인터는 모든 세션이 공유하므로 지난 대화 기록은 직접 삭제
+    if "thread_id" in st.session_state:
+        release_thread(st.session_state["thread_id"])
     st.session_state["thread_id"] = random_uuid()
 # 이전 대화 기록 출력
 print_messages()
@@ -129,14 +132,19 @@ warning_msg = st.empty()
 
 # 설정 버튼이 눌리면...
 if apply_btn:
-    tool = WebSearchTool().create()
-    tool.max_results = search_result_count
-    tool.include_domains = st.session_state["include_domains"]
-    tool.topic = search_topic
+    # 같은 (모델, 검색 설정)이면 다른 세션이 만든 에이전트 그래프를 그대로 공유
+    # 도메인 목록은 복사본을 넘김 (이후 "도메인 추가"가 공유 그래프의 검색 도구를 바꾸지 않도록)
+    search_settings = {
+        "max_results": search_result_count,
+        "include_domains": list(st.session_state["include_domains"]),
+        "topic": search_topic,
+    }
     st.session_state["react_agent"] = create_agent_executor(
         model_name=selected_model,
-        tools=[tool],
+        tool_specs=[(WebSearchTool, search_settings)],
     )
+    if "thread_id" in st.session_state:
+        release_thread(st.session_state["thread_id"])
     st.session_state["thread_id"] = random_uuid()
 
 # 만약에 사용자 입력이 들어오면...
@@ -145,7 +153,7 @@ if user_input:
     # Config 설정
 
     if agent is not None:
-        config = {"configurable": {"thread_id": st.session_state["thread_id"]}}
+        config = thread_config(st.session_state["thread_id"])
         # 사용자의 입력
         st.chat_message("user").write(user_input)
 
@@ -163,6 +171,8 @@ if user_input:
                     ]
                 },
                 config,
+                # 응답별 첫 토큰까지 시간(TTFT) / 초당 토큰 수 기록
+                stream_stats=st.session_state.setdefault("stream_stats", []),
             )
 
             # 대화기록을 저장한다.
@@ -1,17 +1,23 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Tuple, Type
+
 from langchain_openai import ChatOpenAI
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
 
+# 에이전트 실행기 풀: (모델, 도구 설정)이 같으면 모든 Streamlit 세션이 같은 그래프와 LLM 클라이언트를 공유
+# - 대화 상태는 공유 체크포인터 안에서 세션별 thread_id로만 분리
+# - 도구는 세션이 넘긴 설정값의 복사본으로 풀 안에서 생성 → 한 세션이 설정을 바꿔도 공유 그래프는 영향 없음
+# - 닫힌 탭의 대화 기록은 세션과 함께 사라지지 않으므로 오래 안 쓴 thread_id부터 체크포인터에서 정리
+MAX_EXECUTORS = 32  # 보관할 (모델, 도구 설정) 조합 수 (오래 안 쓴 조합부터 제거)
+MAX_THREADS = int(os.getenv("AGENT_MAX_THREADS", "1000"))  # 체크포인터에 보관할 대화(thread_id) 수
+THREAD_TTL = int(os.getenv("AGENT_THREAD_TTL", str(2 * 60 * 60)))  # 초, 이보다 오래 안 쓴 대화 기록은 삭제
 
-def create_agent_executor(model_name="gpt-4o", tools=[]):
-    # 메모리 설정
-    memory = MemorySaver()
-
-    # 모델 설정
-    model = ChatOpenAI(model_name=model_name)
-
-    # 시스템 프롬프트 설정
-    system_prompt = """You are an helpful AI Assitant like Perplexity. Your mission is to answer the user's question.
+# 시스템 프롬프트 설정
+SYSTEM_PROMPT = """You are an helpful AI Assitant like Perplexity. Your mission is to answer the user's question.
 
 Here are the tools you can use:
 {tools}
@@ -54,8 +60,94 @@ There should be no redundant sources. It should simply be:
 - Ensure the answer follows the required structure
 - Check that all guidelines have been followed"""
 
+_lock = threading.Lock()
+_memory = MemorySaver()  # 모든 세션이 공유하는 체크포인터 (thread_id별 대화 기록)
+_llms: Dict[str, ChatOpenAI] = {}
+_executors: "OrderedDict[Tuple, Any]" = OrderedDict()
+_threads: "OrderedDict[str, float]" = OrderedDict()  # thread_id -> 마지막 사용 시각
+
+
+def _freeze(settings: Dict[str, Any]) -> Tuple:
+    """도구 설정 dict → 변경 불가능한 비교용 키 (목록 값은 정렬된 튜플로 복사)"""
+    return tuple(sorted(
+        (name, tuple(sorted(value)) if isinstance(value, (list, tuple, set)) else value)
+        for name, value in settings.items()
+    ))
+
+
+def _build_tools(tool_key: Tuple) -> list:
+    """키에 담긴 (도구 클래스, 설정)으로 풀 전용 도구 생성 (튜플 값은 새 리스트로 전달)"""
+    return [
+        tool_class.create(**{name: list(value) if isinstance(value, tuple) else value for name, value in settings})
+        for tool_class, settings in tool_key
+    ]
+
+
+def get_llm(model_name: str = "gpt-4o") -> ChatOpenAI:
+    """모델별 ChatOpenAI 한 개를 재사용 (HTTP 커넥션 풀 공유)"""
+    with _lock:
+        if model_name not in _llms:
+            _llms[model_name] = ChatOpenAI(model_name=model_name)
+        return _llms[model_name]
+
+
+def create_agent_executor(model_name="gpt-4o", tool_specs: Iterable[Tuple[Type, Dict[str, Any]]] = ()):
+    """(모델, 도구 설정)별로 한 번만 컴파일한 ReAct 에이전트 그래프 반환
+
+    tool_specs는 (BaseTool 하위 클래스, 생성 인자 dict) 목록. 도구 객체는 설정값의 복사본으로 여기서 만들므로
+    호출한 세션의 st.session_state 값을 나중에 바꿔도 공유 그래프의 도구는 바뀌지 않음.
+    대화 기록은 thread_config(thread_id)로 만든 config를 넘기면 공유 체크포인터 안에서 세션별로 분리됨
+    """
+    tool_key = tuple((tool_class, _freeze(settings)) for tool_class, settings in tool_specs)
+    key = (model_name, tool_key)
+    with _lock:
+        if key in _executors:
+            _executors.move_to_end(key)
+            return _executors[key]
+
+    model = get_llm(model_name)
     agent_executor = create_react_agent(
-        model, tools=tools, checkpointer=memory, state_modifier=system_prompt
+        model, tools=_build_tools(tool_key), checkpointer=_memory, state_modifier=SYSTEM_PROMPT
     )
 
+    with _lock:
+        # 동시에 같은 조합을 만든 세션이 있으면 먼저 등록된 그래프를 사용
+        agent_executor = _executors.setdefault(key, agent_executor)
+        _executors.move_to_end(key)
+        while len(_executors) > MAX_EXECUTORS:
+            _executors.popitem(last=False)
     return agent_executor
+
+
+def thread_config(thread_id: str) -> dict:
+    """에이전트 호출용 config 반환 + 사용 시각 기록, 오래 안 쓴(THREAD_TTL)/넘치는(MAX_THREADS) 대화 기록 정리"""
+    now = time.monotonic()
+    expired = []
+    with _lock:
+        _threads[thread_id] = now
+        _threads.move_to_end(thread_id)
+        while _threads:
+            oldest, last_used = next(iter(_threads.items()))
+            if len(_threads) <= MAX_THREADS and now - last_used <= THREAD_TTL:
+                break
+            _threads.popitem(last=False)
+            expired.append(oldest)
+    for old_thread_id in expired:
+        _delete_thread(old_thread_id)
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def release_thread(thread_id: str):
+    """대화 초기화 등으로 더 이상 쓰지 않는 thread_id의 기록을 공유 체크포인터에서 삭제"""
+    with _lock:
+        _threads.pop(thread_id, None)
+    _delete_thread(thread_id)
+
+
+def _delete_thread(thread_id: str):
+    if hasattr(_memory, "delete_thread"):
+        _memory.delete_thread(thread_id)
+    else:  # delete_thread가 없는 이전 langgraph 버전
+        _memory.storage.pop(thread_id, None)
+        for key in [key for key in _memory.writes if key[0] == thread_id]:
+            _memory.writes.pop(key, None)
@@ -0,0 +1,108 @@
+import json
+import os
+import re
+import shutil
+import time
+from typing import Dict, List, Optional, Set
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+JOURNAL_DIR = "data/journal"
+RESULT_CACHE_DIR = "data/result_cache"
+
+
+def safe_name(name: str) -> str:
+    """파일/디렉터리 이름으로 쓸 수 없는 문자를 '_'로 치환"""
+    return re.sub(r'[\\/:*?"<>|\s]', '_', name)
+
+
+class PageJournal:
+    """완료된 페이지와 페이지별 수집 행을 디스크에 기록해 중단된 수집을 이어서 진행하는 저널
+
+    페이지마다 Parquet 파일 하나를 추가로 쓰는(append-only) 컬럼형 싱크 역할도 하므로,
+    수집 중에는 행을 메모리에 쌓지 않아 페이지 수와 관계없이 메모리 사용량이 일정하다.
+    """
+
+    def __init__(self, name: str, journal_dir: str = JOURNAL_DIR):
+        self.path = os.path.join(journal_dir, name)
+        os.makedirs(self.path, exist_ok=True)
+        self._index_path = os.path.join(self.path, "pages.jsonl")
+        self._done_path = os.path.join(self.path, "DONE")
+
+    def _page_path(self, page: int) -> str:
+        return os.path.join(self.path, f"page_{page:06d}.parquet")
+
+    def completed_pages(self) -> Set[int]:
+        """저널에 기록이 끝난 페이지 번호 집합"""
+        if not os.path.exists(self._index_path):
+            return set()
+        pages = set()
+        with open(self._index_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    pages.add(json.loads(line)["page"])
+                except (json.JSONDecodeError, KeyError):
+                    continue  # 기록 도중 중단된 마지막 줄은 무시
+        return {page for page in pages if os.path.exists(self._page_path(page))}
+
+    def record_page(self, page: int, columns: Dict[str, List[Optional[str]]]):
+        """페이지의 컬럼 배치를 Parquet 파일로 내려쓴 뒤(원자적 교체) 인덱스에 완료 기록"""
+        table = pa.table({name: pa.array(values, type=pa.string()) for name, values in columns.items()})
+        tmp_path = self._page_path(page) + ".tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self._page_path(page))
+        with open(self._index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"page": page, "rows": table.num_rows}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load_frame(self) -> pd.DataFrame:
+        """기록된 모든 페이지를 페이지 순서대로 이어 붙인 DataFrame"""
+        pages = sorted(self.completed_pages())
+        if not pages:
+            return pd.DataFrame()
+        table = pa.concat_tables([pq.read_table(self._page_path(page)) for page in pages])
+        return table.to_pandas()
+
+    def mark_complete(self):
+        """마지막 페이지까지 수집이 끝났음을 기록"""
+        with open(self._done_path, "w", encoding="utf-8") as f:
+            f.write("done")
+
+    def is_complete(self) -> bool:
+        return os.path.exists(self._done_path)
+
+    def clear(self):
+        """결과 저장이 끝난 뒤 저널 삭제 (다음 실행은 처음부터 새로 수집)"""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class ResultCache:
+    """키(예: 성분명)별 최종 수집 결과를 Parquet으로 보관하는 TTL 캐시
+
+    저널은 수집이 끝나면 지워지지만, 결과 캐시는 TTL 동안 남아 있어
+    변경이 없는 대상은 다음 실행에서 API를 다시 조회하지 않는다.
+    """
+
+    def __init__(self, name: str, ttl: float, cache_dir: str = RESULT_CACHE_DIR):
+        self.path = os.path.join(cache_dir, name)
+        self.ttl = ttl
+        os.makedirs(self.path, exist_ok=True)
+
+    def _key_path(self, key: str) -> str:
+        return os.path.join(self.path, f"{safe_name(key)}.parquet")
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """TTL 안에 저장된 결과가 있으면 DataFrame, 없거나 만료됐으면 None"""
+        path = self._key_path(key)
+        if not os.path.exists(path) or time.time() - os.path.getmtime(path) > self.ttl:
+            return None
+        return pq.read_table(path).to_pandas()
+
+    def put(self, key: str, df: pd.DataFrame):
+        table = pa.table({name: pa.array(df[name].tolist(), type=pa.string()) for name in df.columns})
+        tmp_path = self._key_path(key) + f".{os.getpid()}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self._key_path(key))
@@ -1,5 +1,82 @@
+import time
+
 import streamlit as st
 
+RENDER_MIN_INTERVAL = 0.1  # seconds between re-renders of the streamed answer
+RENDER_MAX_INTERVAL = 1.0  # re-render at least this often while tokens keep arriving
+RENDER_GROWTH = 0.25  # re-render early once pending text exceeds this fraction of rendered text
+
+
+class StreamRenderer:
+    """
+    Coalesce streamed tokens and re-render them on a time/size cadence.
+
+    Streamlit can only replace a placeholder's whole content, so rendering every
+    token costs O(n^2) for an n-character answer. Renders are spaced at least
+    RENDER_MIN_INTERVAL apart and happen once the pending text has grown by
+    RENDER_GROWTH of what is already shown (or RENDER_MAX_INTERVAL has passed),
+    which keeps the total rendering work linear in the answer length.
+
+    Args:
+        placeholder_factory (callable): Creates the placeholder on the first token (e.g. st.empty)
+        started (float): time.monotonic() when the request was sent, for time-to-first-token
+    """
+
+    def __init__(self, placeholder_factory, started=None):
+        self.placeholder_factory = placeholder_factory
+        self.placeholder = None
+        self.started = started if started is not None else time.monotonic()
+        self.text = ""
+        self.rendered_length = 0
+        self.renders = 0
+        self.tokens = 0
+        self.first_token_at = None
+        self.last_token_at = None
+        self.last_render_at = 0.0
+
+    def append(self, content):
+        """Add a token and re-render if the cadence allows."""
+        now = time.monotonic()
+        if self.first_token_at is None:
+            self.first_token_at = now
+            self.placeholder = self.placeholder_factory()
+        self.last_token_at = now
+        self.tokens += 1
+        self.text += content
+
+        since_render = now - self.last_render_at
+        pending = len(self.text) - self.rendered_length
+        if since_render >= RENDER_MIN_INTERVAL and (
+            pending >= RENDER_GROWTH * self.rendered_length or since_render >= RENDER_MAX_INTERVAL
+        ):
+            self.flush()
+
+    def flush(self):
+        """Render any text that has not been shown yet."""
+        if self.placeholder is None or self.rendered_length == len(self.text):
+            return
+        self.placeholder.markdown(self.text)
+        self.rendered_length = len(self.text)
+        self.renders += 1
+        self.last_render_at = time.monotonic()
+
+    def stats(self):
+        """
+        Timing of the streamed answer.
+
+        Returns:
+            dict: ttft (seconds to first token), tokens, tokens_per_sec, renders
+        """
+        if self.first_token_at is None:
+            return {"ttft": None, "tokens": 0, "tokens_per_sec": 0.0, "renders": 0}
+        duration = self.last_token_at - self.first_token_at
+        return {
+            "ttft": self.first_token_at - self.started,
+            "tokens": self.tokens,
+            "tokens_per_sec": (self.tokens - 1) / duration if duration > 0 else 0.0,
+            "renders": self.renders,
+        }
+
 
 def get_current_tool_message(tool_args, tool_call_id):
     """
@@ -44,15 +121,19 @@ def format_search_result(results):
     return answer
 
 
-def stream_handler(streamlit_container, agent_executor, inputs, config):
+def stream_handler(streamlit_container, agent_executor, inputs, config, stream_stats=None):
     """
     Handle streaming of agent execution results in a Streamlit container.
 
+    Answer tokens are coalesced by StreamRenderer instead of re-rendering the whole
+    answer for every token; the final text is always rendered.
+
     Args:
         streamlit_container (streamlit.container): Streamlit container to display results
         agent_executor: Agent executor instance
         inputs: Input data for the agent
         config: Configuration settings
+        stream_stats (list, optional): StreamRenderer.stats() of this response is appended here
 
     Returns:
         tuple: (container, tool_args, agent_answer)
@@ -62,52 +143,63 @@ def stream_handler(streamlit_container, agent_executor, inputs, config):
     """
     # Initialize result storage
     tool_args = []
-    agent_answer = ""
-    agent_message = None  # Pre-declare agent_message variable
+    renderer = StreamRenderer(st.empty)
 
     container = streamlit_container.container()
     with container:
-        for chunk_msg, metadata in agent_executor.stream(
-            inputs, config, stream_mode="messages"
-        ):
-            if hasattr(chunk_msg, "tool_calls") and chunk_msg.tool_calls:
-                # Initialize tool call result
-                tool_arg = {
-                    "tool_name": "",
-                    "tool_result": "",
-                    "tool_call_id": chunk_msg.tool_calls[0]["id"],
-                }
-                # Save tool name
-                tool_arg["tool_name"] = chunk_msg.tool_calls[0]["name"]
-                if tool_arg["tool_name"]:
-                    tool_args.append(tool_arg)
-
-            if hasattr(chunk_msg, "tool_call_chunks") and chunk_msg.tool_call_chunks:
-                if len(chunk_msg.tool_call_chunks) > 0:  # Add None check
-                    # Accumulate tool call arguments
-                    chunk_msg.tool_call_chunks[0]["args"]
-
-            if metadata["langgraph_node"] == "tools":
-                # Save tool execution results
-                current_tool_message = get_current_tool_message(
-                    tool_args, chunk_msg.tool_call_id
+        try:
+            _consume_stream(agent_executor.stream(inputs, config, stream_mode="messages"), tool_args, renderer)
+        finally:
+            renderer.flush()  # Always show the final (or partial, on error) answer
+            stats = renderer.stats()
+            if stream_stats is not None:
+                stream_stats.append(stats)
+            if stats["ttft"] is not None:
+                print(
+                    f"⏱️ TTFT {stats['ttft']:.2f}s · {stats['tokens']} tokens "
+                    f"({stats['tokens_per_sec']:.1f} tok/s) · {stats['renders']} renders"
                 )
-                if current_tool_message:
-                    current_tool_message["tool_result"] = chunk_msg.content
-                    with st.status(f'✅ {current_tool_message["tool_name"]}'):
-                        if current_tool_message["tool_name"] == "web_search":
-                            st.markdown(
-                                format_search_result(
-                                    current_tool_message["tool_result"]
-                                )
-                            )
 
-            if metadata["langgraph_node"] == "agent":
-                if chunk_msg.content:
-                    if agent_message is None:
-                        agent_message = st.empty()
-                    # Accumulate agent message
-                    agent_answer += chunk_msg.content
-                    agent_message.markdown(agent_answer)
+        return container, tool_args, renderer.text
+
+
+def _consume_stream(stream, tool_args, renderer):
+    """Dispatch streamed messages to tool status boxes and the answer renderer."""
+    for chunk_msg, metadata in stream:
+        if hasattr(chunk_msg, "tool_calls") and chunk_msg.tool_calls:
+            # Initialize tool call result
+            tool_arg = {
+                "tool_name": "",
+                "tool_result": "",
+                "tool_call_id": chunk_msg.tool_calls[0]["id"],
+            }
+            # Save tool name
+            tool_arg["tool_name"] = chunk_msg.tool_calls[0]["name"]
+            if tool_arg["tool_name"]:
+                tool_args.append(tool_arg)
+
+        if hasattr(chunk_msg, "tool_call_chunks") and chunk_msg.tool_call_chunks:
+            if len(chunk_msg.tool_call_chunks) > 0:  # Add None check
+                # Accumulate tool call arguments
+                chunk_msg.tool_call_chunks[0]["args"]
+
+        if metadata["langgraph_node"] == "tools":
+            # Save tool execution results
+            current_tool_message = get_current_tool_message(
+                tool_args, chunk_msg.tool_call_id
+            )
+            if current_tool_message:
+                renderer.flush()  # Show the answer so far before the tool status box
+                current_tool_message["tool_result"] = chunk_msg.content
+                with st.status(f'✅ {current_tool_message["tool_name"]}'):
+                    if current_tool_message["tool_name"] == "web_search":
+                        st.markdown(
+                            format_search_result(
+                                current_tool_message["tool_result"]
+                            )
+                        )
 
-        return container, tool_args, agent_answer
+        if metadata["langgraph_node"] == "agent":
+            if chunk_msg.content:
+                # Accumulate agent message (rendered on the renderer's cadence)
+                renderer.append(chunk_msg.content)
@@ -0,0 +1,344 @@
+import os
+import math
+import time
+import json
+import random
+import hashlib
+import threading
+import concurrent.futures
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from .fetch_journal import PageJournal
+from .xml_stream import Fields, parse_items, count_rows
+
+# 식품의약품안전처(1471000) 공공데이터 API 공통 설정
+SERVICE_ROOT = "http://apis.data.go.kr/1471000"
+REQUESTS_PER_SECOND = float(os.getenv("DATA_GO_KR_RPS", "10"))  # data.go.kr 트래픽 한도에 맞춘 초당 요청 수
+MAX_WORKERS = int(os.getenv("DATA_GO_KR_WORKERS", "4"))  # 동시에 요청할 페이지 수
+CACHE_TTL = int(os.getenv("DATA_GO_KR_CACHE_TTL", "0"))  # 응답 캐시 유효 시간(초), 0이면 ETag 재검증만
+CACHE_DIR = "data/api_cache"
+RATE_LIMIT_FILE = os.getenv("DATA_GO_KR_RATE_FILE", "data/api_rate_limit")  # 수집 프로세스들이 공유하는 요청 간격 기록
+MAX_RETRIES = 5
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class Endpoint:
+    """수집 대상 API 하나의 선언 (서비스 경로 + 추출할 필드)"""
+
+    path: str  # 예: "DrbEasyDrugInfoService/getDrbEasyDrugList"
+    fields: Fields
+    rows_per_page: int = 100
+    params: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def url(self) -> str:
+        return f"{SERVICE_ROOT}/{self.path}"
+
+
+class TokenBucket:
+    """초당 rate개의 토큰을 채우고 요청마다 amount개(기본 1개)씩 소비하는 스레드 안전 속도 제한기"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: float = 1):
+        amount = min(amount, self.capacity)  # 용량보다 큰 요청은 버킷이 가득 찰 때까지만 대기
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedRateLimiter:
+    """같은 상태 파일을 쓰는 모든 프로세스/스레드가 합쳐서 초당 rate개까지만 요청하도록 하는 속도 제한기
+
+    파일에는 다음 요청이 허용되는 시각만 기록 — 파일 잠금 안에서 자기 순번을 예약하고, 잠금을 푼 뒤 그 시각까지 대기
+    (수집 스크립트 여러 개나 pipeline 병렬 단계가 같은 data.go.kr 키의 한도를 나눠 씀)
+    """
+
+    def __init__(self, rate: float, path: str = RATE_LIMIT_FILE):
+        self.interval = 1 / rate
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _reserve(self) -> float:
+        with self.lock, open(self.path, "a+b") as f:
+            _lock_file(f)
+            try:
+                f.seek(0)
+                try:
+                    next_at = float(f.read().decode() or 0)
+                except ValueError:
+                    next_at = 0.0  # 손상된 기록은 무시
+                slot = max(time.time(), next_at)
+                f.seek(0)
+                f.truncate()
+                f.write(repr(slot + self.interval).encode())
+                f.flush()
+            finally:
+                _unlock_file(f)
+        return slot
+
+    def acquire(self):
+        wait = self._reserve() - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@dataclass
+class EndpointMetrics:
+    """엔드포인트별 요청 통계"""
+
+    requests: int = 0
+    retries: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    bytes: int = 0
+    latency: float = 0.0
+    max_latency: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def observe(self, elapsed: float, size: int):
+        with self.lock:
+            self.requests += 1
+            self.bytes += size
+            self.latency += elapsed
+            self.max_latency = max(self.max_latency, elapsed)
+
+    def count(self, name: str):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+class Progress:
+    """완료 개수 / 경과 시간 / 남은 예상 시간(ETA)을 출력하는 스레드 안전 진행률 표시"""
+
+    def __init__(self, total: int, label: str = ""):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def update(self, note: str = ""):
+        with self.lock:
+            self.done += 1
+            elapsed = time.monotonic() - self.started
+            eta = elapsed / self.done * (self.total - self.done)
+            print(
+                f"⏳ {self.label}[{self.done}/{self.total}] {self.done / max(self.total, 1):.0%} "
+                f"· 경과 {elapsed:.0f}초 · 남은 예상 {eta:.0f}초 {note}".rstrip()
+            )
+
+
+class PublicDataClient:
+    """커넥션 풀, 프로세스 간 공유 속도 제한, 재시도/백오프, 응답 캐시, 엔드포인트별 지표를 갖춘 공공데이터 API 클라이언트"""
+
+    def __init__(self, service_key: Optional[str] = None, rate: float = REQUESTS_PER_SECOND,
+                 pool_size: int = MAX_WORKERS, timeout: float = 10, max_retries: int = MAX_RETRIES,
+                 cache_dir: str = CACHE_DIR, cache_ttl: int = CACHE_TTL, rate_limit_file: str = RATE_LIMIT_FILE):
+        self.service_key = service_key or os.getenv("DRUG_DATA_API_DECODED_KEY")
+        if self.service_key is None:
+            raise ValueError("❌ .env 파일에 DRUG_DATA_API_DECODED_KEY 항목이 없습니다.")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        # 프로세스 간 공유 속도 제한 (병렬로 실행한 수집 스크립트 전체 합계가 DATA_GO_KR_RPS를 넘지 않음)
+        self.rate_limiter = SharedRateLimiter(rate, rate_limit_file)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(pool_size, MAX_WORKERS))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.metrics: Dict[str, EndpointMetrics] = {}
+        self._metrics_lock = threading.Lock()
+
+    # --- 지표 ---------------------------------------------------------------
+    def _metric(self, endpoint: Endpoint) -> EndpointMetrics:
+        with self._metrics_lock:
+            return self.metrics.setdefault(endpoint.path, EndpointMetrics())
+
+    def report(self):
+        """엔드포인트별 요청 수 / 전송량 / 지연 시간 출력"""
+        for path, m in self.metrics.items():
+            avg = m.latency / m.requests if m.requests else 0.0
+            print(
+                f"📊 {path}: 요청 {m.requests}회 (재시도 {m.retries}, 실패 {m.errors}, 캐시 {m.cache_hits}), "
+                f"{m.bytes / 1024 / 1024:.1f}MB, 평균 {avg * 1000:.0f}ms / 최대 {m.max_latency * 1000:.0f}ms"
+            )
+
+    # --- 응답 캐시 (TTL + ETag) ---------------------------------------------
+    def _cache_path(self, endpoint: Endpoint, params: Dict[str, str]) -> str:
+        key = json.dumps([endpoint.path, sorted(params.items())], ensure_ascii=False)
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def _read_cache(self, path: str) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(path + ".json"):
+            return None
+        with open(path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(path + ".xml", "rb") as f:
+            meta["content"] = f.read()
+        return meta
+
+    def _write_cache(self, path: str, content: bytes, etag: Optional[str]):
+        # 본문 → 메타 순서로 원자적 교체 (메타가 보이면 본문은 항상 완전함)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        suffix = f".{threading.get_ident()}.tmp"
+        with open(path + ".xml" + suffix, "wb") as f:
+            f.write(content)
+        os.replace(path + ".xml" + suffix, path + ".xml")
+        with open(path + ".json" + suffix, "w", encoding="utf-8") as f:
+            json.dump({"etag": etag, "fetched_at": time.time()}, f)
+        os.replace(path + ".json" + suffix, path + ".json")
+
+    # --- 요청 ---------------------------------------------------------------
+    def get(self, endpoint: Endpoint, params: Dict[str, str]) -> bytes:
+        """속도 제한/재시도/캐시를 거쳐 응답 본문 반환"""
+        metric = self._metric(endpoint)
+        query = {**endpoint.params, **params, "type": "xml"}
+        cache_path = self._cache_path(endpoint, query)
+        cached = self._read_cache(cache_path)
+        if cached and time.time() - cached["fetched_at"] < self.cache_ttl:
+            metric.count("cache_hits")
+            return cached["content"]
+
+        headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else {}
+        for attempt in range(self.max_retries):
+            self.rate_limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = self.session.get(
+                    endpoint.url, params={"serviceKey": self.service_key, **query},
+                    headers=headers, timeout=self.timeout,
+                )
+                metric.observe(time.monotonic() - started, len(response.content))
+                if response.status_code == 304 and cached:
+                    metric.count("cache_hits")
+                    self._write_cache(cache_path, cached["content"], cached["etag"])
+                    return cached["content"]
+                if response.status_code == 200:
+                    etag = response.headers.get("ETag")
+                    if self.cache_ttl > 0 or etag:
+                        self._write_cache(cache_path, response.content, etag)
+                    return response.content
+                if response.status_code not in RETRY_STATUS:
+                    metric.count("errors")
+                    raise ConnectionError(f"요청 실패: {response.status_code}")
+                reason = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                reason = str(e)
+            metric.count("retries")
+            delay = random.uniform(0, min(30, 0.5 * 2 ** attempt))  # full jitter
+            print(f"🔁 [{endpoint.path}] 페이지 {params.get('pageNo')} 재시도 {attempt + 1}/{self.max_retries} ({reason}), {delay:.1f}초 대기")
+            time.sleep(delay)
+        metric.count("errors")
+        raise ConnectionError(f"페이지 {params.get('pageNo')} 요청 실패: 재시도 {self.max_retries}회 초과")
+
+    def get_total_count(self, endpoint: Endpoint, params: Optional[Dict[str, str]] = None) -> int:
+        content = self.get(endpoint, {**(params or {}), "pageNo": "1", "numOfRows": "1"})
+        total_count = ET.fromstring(content).findtext(".//totalCount")
+        if total_count is None:
+            raise ValueError("❌ totalCount를 찾을 수 없습니다. 인증키 확인 필요")
+        return int(total_count)
+
+    def fetch_page(self, endpoint: Endpoint, page: int, params: Optional[Dict[str, str]] = None) -> Dict[str, list]:
+        content = self.get(endpoint, {**(params or {}), "pageNo": str(page), "numOfRows": str(endpoint.rows_per_page)})
+        return parse_items(content, endpoint.fields)
+
+    def crawl(self, endpoint: Endpoint, journal: PageJournal, params: Optional[Dict[str, str]] = None,
+              extra_columns: Optional[Dict[str, str]] = None, workers: int = MAX_WORKERS,
+              label: str = "") -> pd.DataFrame:
+        """전체 페이지를 병렬 수집해 저널(Parquet 싱크)에 기록하고, 페이지 순서대로 DataFrame 반환
+
+        Args:
+            endpoint (Endpoint): 수집할 API
+            journal (PageJournal): 완료 페이지 기록용 저널 (중단 시 남은 페이지만 재수집)
+            params (dict): 추가 쿼리 파라미터 (예: {"itemName": "펜타닐"})
+            extra_columns (dict): 모든 행에 붙일 상수 컬럼 (예: {"조회성분명": "펜타닐"})
+            workers (int): 동시에 요청할 페이지 수
+            label (str): 진행 로그 접두어
+        """
+        if journal.is_complete():
+            print(f"♻️ {label}저널에 완료된 수집 결과가 있어 재사용합니다.")
+            return journal.load_frame()
+
+        total_count = self.get_total_count(endpoint, params)
+        total_pages = math.ceil(total_count / endpoint.rows_per_page)
+        completed = journal.completed_pages()
+        pending = [page for page in range(1, total_pages + 1) if page not in completed]
+        print(f"📦 {label}총 {total_count}건 ({total_pages} 페이지), 저널에서 {total_pages - len(pending)} 페이지 재사용")
+
+        failed = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(self.fetch_page, endpoint, page, params): page for page in pending}
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                page = futures[future]
+                try:
+                    columns = future.result()
+                    n_rows = count_rows(columns)
+                    if extra_columns:
+                        columns = {**{k: [v] * n_rows for k, v in extra_columns.items()}, **columns}
+                    journal.record_page(page, columns)  # 페이지 배치를 바로 Parquet 싱크로 내려씀
+                except Exception as e:
+                    failed.append(page)
+                    print(f"❌ {label}{page} 페이지 실패: {e}")
+                    continue
+                print(f"✅ {label}{page} 페이지 수집 완료 ({n_rows}건, {done}/{len(pending)} 페이지)")
+
+        if failed:
+            raise ConnectionError(f"❌ {label}{len(failed)} 페이지 수집 실패 — 다시 실행하면 남은 페이지부터 이어서 수집합니다.")
+
+        journal.mark_complete()
+        return journal.load_frame()
+
+
+_client: Optional[PublicDataClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> PublicDataClient:
+    """프로세스 전체가 하나의 클라이언트(커넥션 풀 + 속도 제한기)를 공유"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = PublicDataClient()
+        return _client
@@ -0,0 +1,134 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 웹 검색(Tavily) 결과 캐시: 같은 (정규화된 질문, 검색 옵션)은 TTL 동안 API를 다시 부르지 않음
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(6 * 60 * 60)))  # 초
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "512"))  # 메모리 LRU 항목 수
+SEARCH_CACHE_DIR = os.getenv("SEARCH_CACHE_DIR", "data/search_cache")  # 빈 값이면 디스크 캐시 미사용
+
+
+def normalize_query(query: str) -> str:
+    """NFKC + 소문자 + 공백 정리 ("타이레놀  부작용" == "타이레놀 부작용")"""
+    return " ".join(unicodedata.normalize("NFKC", query or "").lower().split())
+
+
+def search_key(query: str, **options: Any) -> str:
+    """정규화된 질문 + 검색 옵션(도메인 목록은 순서 무시)의 해시"""
+    options = {
+        name: sorted(value) if isinstance(value, (list, tuple, set)) else value
+        for name, value in options.items()
+    }
+    payload = json.dumps({"query": normalize_query(query), **options}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """메모리 LRU + (선택) 디스크 JSON 2단 TTL 캐시
+
+    같은 키를 동시에 요청하면 한 스레드만 실제 검색을 하고 나머지는 그 결과를 기다림 (single-flight)
+    """
+
+    def __init__(self, ttl: int = SEARCH_CACHE_TTL, max_entries: int = SEARCH_CACHE_SIZE,
+                 cache_dir: Optional[str] = SEARCH_CACHE_DIR):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir or None
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0}
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _fresh(self, created: float) -> bool:
+        return time.time() - created < self.ttl
+
+    def _remember(self, key: str, created: float, value: Any):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, Any]]:
+        if not self.cache_dir or not os.path.exists(self._disk_path(key)):
+            return None
+        try:
+            with open(self._disk_path(key), encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None  # 기록 도중 중단된 파일은 없는 것으로 취급
+        return saved["created"], saved["value"]
+
+    def _write_disk(self, key: str, created: float, value: Any):
+        if not self.cache_dir:
+            return
+        tmp_path = self._disk_path(key) + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created": created, "value": value}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._disk_path(key))
+        except (OSError, TypeError):
+            pass  # JSON으로 저장할 수 없는 결과는 메모리에만 보관
+
+    def _lookup(self, key: str) -> Tuple[bool, Any]:
+        """(적중 여부, 값) — _lock을 잡은 상태에서 호출"""
+        entry = self._memory.get(key)
+        if entry and self._fresh(entry[0]):
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            return True, entry[1]
+        entry = self._read_disk(key)
+        if entry and self._fresh(entry[0]):
+            self._remember(key, *entry)
+            self.stats["disk_hits"] += 1
+            return True, entry[1]
+        return False, None
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """캐시에 있으면 복사본 반환, 없으면 compute() 결과를 저장 후 반환"""
+        while True:
+            with self._lock:
+                hit, value = self._lookup(key)
+                if hit:
+                    return copy.deepcopy(value)
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    self._inflight[key] = threading.Event()
+                    self.stats["misses"] += 1
+                    break
+                self.stats["coalesced"] += 1
+            waiter.wait()  # 같은 검색을 먼저 시작한 스레드가 끝나면 캐시에서 다시 조회 (실패했으면 직접 검색)
+
+        try:
+            value = compute()
+            created = time.time()
+            with self._lock:
+                self._remember(key, created, value)
+            self._write_disk(key, created, value)
+            return copy.deepcopy(value)
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+
+
+_search_cache: Optional[SearchCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """프로세스(모든 Streamlit 세션) 전체에서 하나의 검색 캐시를 공유"""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache()
+        return _search_cache
@@ -1,6 +1,23 @@
-from typing import Any, List
+from typing import Any, List, Optional
 from langchain_teddynote.tools.tavily import TavilySearch
 from .base import BaseTool
+from .search_cache import get_search_cache, search_key
+
+
+class CachedTavilySearch(TavilySearch):
+    """같은 검색은 TTL 동안 캐시에서 반환하는 TavilySearch (세션 간 공유, 동시 중복 검색은 1회만 호출)"""
+
+    def search(self, query: str, **kwargs: Any) -> list:
+        options = {
+            name: kwargs.get(name) or getattr(self, name)
+            for name in ("search_depth", "topic", "max_results", "include_domains", "exclude_domains")
+        }
+        for name in ("include_answer", "include_raw_content", "include_images", "format_output"):
+            options[name] = kwargs[name] if kwargs.get(name) is not None else getattr(self, name)
+        if options["topic"] == "news":
+            options["days"] = kwargs.get("days")
+        key = search_key(query, **options, extra={k: v for k, v in kwargs.items() if k not in options and k != "days"})
+        return get_search_cache().get_or_compute(key, lambda: super(CachedTavilySearch, self).search(query, **kwargs))
 
 
 class WebSearchTool(BaseTool[TavilySearch]):
@@ -27,10 +44,18 @@ class WebSearchTool(BaseTool[TavilySearch]):
         self.format_output = format_output
         self.include_domains = include_domains
         self.exclude_domains = exclude_domains
+        self._tool: Optional[TavilySearch] = None
+        self._tool_config: Optional[tuple] = None
+
+    def _config(self) -> tuple:
+        return (
+            self.topic, self.max_results, self.include_answer, self.include_raw_content, self.include_images,
+            self.format_output, tuple(self.include_domains), tuple(self.exclude_domains),
+        )
 
     def _create_tool(self) -> TavilySearch:
-        """TavilySearch 객체를 생성하고 설정하는 내부 메서드"""
-        search = TavilySearch(
+        """TavilySearch 객체를 생성하고 설정하는 내부 메서드 (결과 캐시 포함)"""
+        search = CachedTavilySearch(
             topic=self.topic,
             max_results=self.max_results,
             include_answer=self.include_answer,
@@ -45,6 +70,8 @@ class WebSearchTool(BaseTool[TavilySearch]):
         return search
 
     def __call__(self, *args: Any, **kwargs: Any) -> Any:
-        """도구를 실행하는 메서드"""
-        tool = self._create_tool()
-        return tool(*args, **kwargs)
+        """도구를 실행하는 메서드 (설정이 바뀌었을 때만 TavilySearch 재생성)"""
+        if self._tool is None or self._tool_config != self._config():
+            self._tool = self._create_tool()
+            self._tool_config = self._config()
+        return self._tool(*args, **kwargs)
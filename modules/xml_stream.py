@@ -0,0 +1,42 @@
+import io
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Union
+
+Fields = Union[List[str], Dict[str, str]]
+
+
+def parse_items(content: bytes, fields: Fields, item_tag: str = "item") -> Dict[str, List[Optional[str]]]:
+    """공공데이터 XML 응답을 iterparse로 한 번만 훑어 컬럼별 리스트로 변환
+
+    Args:
+        content (bytes): API 응답 본문
+        fields (list | dict): 추출할 태그 목록, 또는 {컬럼명: 태그} 매핑
+        item_tag (str): 한 건을 감싸는 태그 이름
+
+    Returns:
+        dict: {컬럼명: [값, ...]} (없는 태그는 None, 빈 태그는 "" — findtext와 동일)
+    """
+    mapping = fields if isinstance(fields, dict) else {field: field for field in fields}
+    tag_to_column = {tag: column for column, tag in mapping.items()}
+    columns: Dict[str, List[Optional[str]]] = {column: [] for column in mapping}
+
+    current: Dict[str, str] = {}
+    in_item = False
+    for event, elem in ET.iterparse(io.BytesIO(content), events=("start", "end")):
+        if event == "start":
+            if elem.tag == item_tag:
+                in_item = True
+                current = {}
+            continue
+        if elem.tag == item_tag:
+            for column, values in columns.items():
+                values.append(current.get(column))
+            in_item = False
+            elem.clear()  # 처리한 item 서브트리는 바로 해제
+        elif in_item and elem.tag in tag_to_column:
+            current[tag_to_column[elem.tag]] = elem.text or ""
+    return columns
+
+
+def count_rows(columns: Dict[str, list]) -> int:
+    return len(next(iter(columns.values()), []))
@@ -1,92 +1,38 @@
-import requests
-import time
 import pandas as pd
 from dotenv import load_dotenv
 import os
-import xml.etree.ElementTree as ET
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.fetch_journal import PageJournal
+from modules.public_data import Endpoint, get_client
+from drug_snapshot import load_snapshot, save_snapshot, detect_changes, add_pending
 
 # 1. .env 파일에서 환경변수 로드
 load_dotenv()
-SERVICE_KEY = os.getenv("DRUG_DATA_API_DECODED_KEY")  
-
-if SERVICE_KEY is None:
-    raise ValueError("❌ .env 파일에 DRUG_DATA_API_KEY 항목이 없습니다.")
 
 # 2. API 기본 설정
-#e알약
-BASE_URL = "http://apis.data.go.kr/1471000/DrbEasyDrugInfoService/getDrbEasyDrugList"
-ROWS_PER_PAGE = 100  # 이 API는 최대 100건까지 허용
-
-# 3. 전체 건수 조회 함수 (XML 기반 파싱)
+#e알약 (이 API는 페이지당 최대 100건까지 허용)
+ENDPOINT = Endpoint(
+    path="DrbEasyDrugInfoService/getDrbEasyDrugList",
+    fields=[
+        'itemSeq', 'itemName', 'entpName', 'efcyQesitm', 'useMethodQesitm',
+        'atpnWarnQesitm', 'atpnQesitm', 'intrcQesitm', 'seQesitm',
+        'depositMethodQesitm', 'openDe', 'updateDe',
+    ],
+    rows_per_page=100,
+)
+
+# 3. 전체 건수 조회 함수
 def get_total_count():
-    params = {
-        'serviceKey': SERVICE_KEY,
-        'pageNo': '1',
-        'numOfRows': '1',
-        'type': 'xml'
-    }
-    response = requests.get(BASE_URL, params=params)
-    if response.status_code != 200:
-        raise ConnectionError(f"❌ 요청 실패: {response.status_code}")
+    return get_client().get_total_count(ENDPOINT)
 
-    root = ET.fromstring(response.content)
-    total_count = root.findtext('.//totalCount')
-    if total_count is None:
-        raise ValueError("❌ totalCount를 찾을 수 없습니다. 인증키 확인 필요")
+# 4. 전체 데이터 수집 함수 (페이지 병렬 수집 후 페이지 순서대로 재조립)
+# 완료된 페이지는 저널에 기록되므로, 중단되면 다음 실행에서 남은 페이지만 수집
+journal = PageJournal("drug_raw")
 
-    return int(total_count)
-
-# 4. 전체 데이터 수집 함수 (XML 기반)
 def fetch_all_drug_data():
-    total_count = get_total_count()
-    print(f"📦 총 {total_count}건 수집 예정")
-    rows = []
-    page = 1
-
-    while True:
-        params = {
-            'serviceKey': SERVICE_KEY,
-            'pageNo': str(page),
-            'numOfRows': str(ROWS_PER_PAGE),
-            'type': 'xml'
-        }
-        response = requests.get(BASE_URL, params=params)
-
-        if response.status_code != 200:
-            print(f"❌ 페이지 {page} 요청 실패: {response.status_code}")
-            break
-
-        root = ET.fromstring(response.content)
-        items = root.findall('.//item')
-
-        if not items:
-            print(f"⚠️ {page} 페이지에서 항목 없음. 종료")
-            break
-
-        for item in items:
-            rows.append({
-                'itemSeq': item.findtext('itemSeq'),
-                'itemName': item.findtext('itemName'),
-                'entpName': item.findtext('entpName'),
-                'efcyQesitm': item.findtext('efcyQesitm'),
-                'useMethodQesitm': item.findtext('useMethodQesitm'),
-                'atpnWarnQesitm': item.findtext('atpnWarnQesitm'),
-                'atpnQesitm': item.findtext('atpnQesitm'),
-                'intrcQesitm': item.findtext('intrcQesitm'),
-                'seQesitm': item.findtext('seQesitm'),
-                'depositMethodQesitm': item.findtext('depositMethodQesitm'),
-                'openDe': item.findtext('openDe'),
-                'updateDe': item.findtext('updateDe'),
-            })
-
-        print(f"✅ {page} 페이지 수집 완료 ({len(rows)} 누적)")
-        page += 1
-        time.sleep(0.1)
-
-        if len(rows) >= total_count:
-            break
-
-    return pd.DataFrame(rows)
+    return get_client().crawl(ENDPOINT, journal)
 
 # 5. CSV 저장 함수
 def save_to_csv(df, filename="data/drug_raw.csv"):
@@ -95,11 +41,27 @@ def save_to_csv(df, filename="data/drug_raw.csv"):
     df.to_csv(filename, index=False)
     print(f"💾 저장 완료: {filename}")
 
-# 6. CLI 실행
+# 6. 변경분 기록 (직전 스냅샷 대비 추가/변경/삭제 itemSeq → 2_가 해당 약품만 다시 chunk)
+def record_changes(df):
+    changes = detect_changes(df, load_snapshot())
+    print(
+        f"🧮 변경분: 추가 {len(changes['inserted'])}건 / 변경 {len(changes['updated'])}건 / "
+        f"삭제 {len(changes['deleted'])}건 / 전체 {len(df)}건"
+    )
+    add_pending(changes["inserted"] + changes["updated"] + changes["deleted"])
+    save_snapshot(df)
+    return changes
+
+# 7. CLI 실행
 if __name__ == "__main__":
     print("🚀 공공 API 약품 정보(XML) 수집 시작...")
     try:
         df = fetch_all_drug_data()
         save_to_csv(df)
+        record_changes(df)
+        journal.clear()
     except Exception as e:
-        print(f"❌ 오류 발생: {e}")
\ No newline at end of file
+        print(f"❌ 오류 발생: {e}")
+        sys.exit(1)
+    finally:
+        get_client().report()
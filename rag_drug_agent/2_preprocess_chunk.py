@@ -1,42 +1,92 @@
 import pandas as pd
 import os
+import sys
+from chunk_store import CHUNKS_PATH, save_chunks as write_chunks, read_chunk_columns, stored_chunk_mode
+from drug_snapshot import is_incremental, load_pending, clear_pending
+from sections import CHUNK_MODE, SECTIONS
+
+# chunk 템플릿 (라벨, 컬럼) — 각 필드는 Parquet에도 섹션 컬럼으로 함께 저장
+CHUNK_TEMPLATE = [
+    ("약품명", ["itemName"]),
+    ("제조사", ["entpName"]),
+    ("효능", ["efcyQesitm"]),
+    ("복용 방법", ["useMethodQesitm"]),
+    ("주의사항", ["atpnWarnQesitm", "atpnQesitm"]),
+    ("상호작용", ["intrcQesitm"]),
+    ("부작용", ["seQesitm"]),
+    ("보관 방법", ["depositMethodQesitm"]),
+]
+SECTION_COLUMNS = [column for _, columns in CHUNK_TEMPLATE for column in columns]
+KEEP_COLUMNS = ["itemSeq", "itemName", "updateDe"] + [c for c in SECTION_COLUMNS if c != "itemName"]
+LINE_SEP = "\n        "  # 기존 템플릿(f-string 들여쓰기)과 동일한 구분자 → chunk 해시/벡터 ID 유지
 
 # 1. 데이터 불러오기
 def load_raw_data(filepath="data/drug_raw.csv"):
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"❌ 파일을 찾을 수 없습니다: {filepath}")
-    return pd.read_csv(filepath)
-
-# 2. 전처리 및 Chunk 생성 함수
-def create_chunks(df):
-    df.fillna("", inplace=True)  # 결측값 처리
-
-    def make_chunk(row):
-        return f"""
-        약품명: {row['itemName']}
-        제조사: {row['entpName']}
-        효능: {row['efcyQesitm']}
-        복용 방법: {row['useMethodQesitm']}
-        주의사항: {row['atpnWarnQesitm']} {row['atpnQesitm']}
-        상호작용: {row['intrcQesitm']}
-        부작용: {row['seQesitm']}
-        보관 방법: {row['depositMethodQesitm']}
-        """.strip()
-
-    df['chunk'] = df.apply(make_chunk, axis=1)
-    return df[['itemName', 'chunk']]
-
-# 3. 저장 함수
-def save_chunks(df, filename="data/drug_chunks.csv"):
-    df.to_csv(filename, index=False)
-    print(f"💾 chunk 저장 완료: {filename}")
-
-# 4. CLI 실행
+    return pd.read_csv(filepath, dtype=str)
+
+# 2. 전처리 및 Chunk 생성 함수 (행 단위 apply 대신 컬럼 단위 문자열 연산)
+def create_chunks(df, mode=CHUNK_MODE):
+    df = df.reindex(columns=KEEP_COLUMNS).fillna("").astype(str)  # 결측값/누락 컬럼 처리
+    if mode == "section":
+        return create_section_chunks(df)
+
+    chunk = None
+    for label, columns in CHUNK_TEMPLATE:
+        value = df[columns[0]]
+        for column in columns[1:]:
+            value = value + " " + df[column]
+        line = f"{label}: " + value
+        chunk = line if chunk is None else chunk + LINE_SEP + line
+
+    df["chunk"] = chunk.str.rstrip()
+    return df
+
+# 2-1. 섹션 단위 Chunk (CHUNK_MODE=section): 약품 × 섹션마다 "약품명 + 섹션 내용" 1건, 빈 섹션은 제외
+def create_section_chunks(df):
+    frames = []
+    for section, (label, columns, _) in SECTIONS.items():
+        value = df[columns[0]]
+        for column in columns[1:]:
+            value = value + " " + df[column]
+        value = value.str.strip()
+        frame = df[["itemSeq", "itemName", "entpName", "updateDe"]].assign(  # entpName: 이름 인덱스의 제조사 좁히기용
+            section=section,
+            chunk="약품명: " + df["itemName"] + "\n" + f"{label}: " + value,
+        )
+        frames.append(frame[value != ""])
+    return pd.concat(frames, ignore_index=True).sort_values("itemSeq", kind="stable", ignore_index=True)  # 약품별로 모으되 섹션 순서 유지
+
+# 3. 증분 갱신: 대기 목록(추가/변경/삭제)의 itemSeq만 다시 chunk해 기존 결과와 병합
+def update_chunks(df_raw, pending, filename=CHUNKS_PATH):
+    previous = read_chunk_columns(filename).drop(columns=["id"])
+    kept = previous[~previous["itemSeq"].isin(pending)]
+    changed = create_chunks(df_raw[df_raw["itemSeq"].isin(pending)])  # 삭제된 약품은 원본에 없으므로 빠짐
+    print(f"🔁 증분 chunk: 재생성 {len(changed)}건 / 제거 {len(previous) - len(kept)}건 / 유지 {len(kept)}건")
+    # 새로 추가된 컬럼(예: 섹션 모드의 entpName)은 유지하고, 이전 파일에 없던 값은 빈 문자열로
+    columns = list(kept.columns) + [column for column in changed.columns if column not in kept.columns]
+    return pd.concat([kept, changed[columns]], ignore_index=True).fillna("")
+
+# 4. 저장 함수 (itemSeq / updateDe / 섹션별 필드 + chunk를 Parquet으로)
+def save_chunks(df, filename=CHUNKS_PATH):
+    write_chunks(df, filename)
+    print(f"💾 chunk 저장 완료: {filename} ({len(df)}건)")
+
+# 5. CLI 실행 (PIPELINE_MODE=full 이거나 이전 chunk 파일이 없으면 전체 재생성)
 if __name__ == "__main__":
     print("🧪 Step 2: 약품 데이터 전처리 및 Chunk 생성 중...")
     try:
         df_raw = load_raw_data()
-        df_chunks = create_chunks(df_raw)
-        save_chunks(df_chunks)
+        # chunk 방식(CHUNK_MODE)이 바뀌었으면 증분 대신 전체 재생성
+        incremental = is_incremental() and stored_chunk_mode(CHUNKS_PATH) == CHUNK_MODE
+        pending = load_pending() if incremental else set()
+        if incremental and not pending:
+            print("✅ 변경된 약품이 없어 chunk를 그대로 유지합니다.")
+        else:
+            df_chunks = update_chunks(df_raw, pending) if incremental else create_chunks(df_raw)
+            save_chunks(df_chunks)
+            clear_pending()
     except Exception as e:
         print(f"❌ 오류 발생: {e}")
+        sys.exit(1)
@@ -1,12 +1,19 @@
 import os
-import pandas as pd
+import sys
+import json
 from dotenv import load_dotenv
 from langchain.docstore.document import Document
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
+from embedding_cache import get_embeddings, embedding_dimension
+from vector_backend import use_local_backend, open_local_index, persist_index
+from hybrid_search import SEARCH_MODE, SPARSE_ENCODER_PATH, load_sparse_encoder
+from semantic_cache import bump_index_version
+from chunk_store import CHUNKS_PATH, load_vector_ids, iter_document_batches
+from doc_store import DocStore
+from embed_scheduler import EMBED_MAX_BATCH_ITEMS, EmbeddingScheduler, token_cost
 from pinecone import Pinecone, ServerlessSpec
 from tqdm import tqdm
-import concurrent.futures
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 # LangSmith 추적 설정
 from langchain_teddynote import logging
 logging.langsmith("3_embed_to_pinecone")
@@ -18,25 +25,43 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "medical-db")
 PINECONE_REGION = os.getenv("PINECONE_REGION", "us-east-1")
 NAMESPACE = "drug-rag-namespace"
-
-# 2. 데이터 로드 및 Document 변환
-def load_documents(filepath="data/drug_chunks.csv"):
-    df = pd.read_csv(filepath)
-    df.fillna("", inplace=True)
-    documents = [
-        Document(
-            page_content=row["chunk"],
-            metadata={
-                "itemName": row["itemName"],
-                "text": row["chunk"]
-            }
-        )
-        for _, row in df.iterrows()
-    ]
-    return documents
-
-# 3. Pinecone 인덱스 생성 또는 연결 (최초 1회 삭제)
+MANIFEST_PATH = "data/upsert_manifest.json"
+BATCH_SIZE = 64
+DELETE_BATCH_SIZE = 1000  # Pinecone delete 요청당 최대 ID 수
+
+# 2. 데이터 로드: chunk Parquet에서 벡터 ID만 먼저 읽고, Document는 업로드 시 배치 단위로 스트리밍
+# (make_vector_id / iter_document_batches → chunk_store.py)
+
+# 3. 업로드 매니페스트 (이미 업로드된 벡터 ID 기록)
+def load_manifest(path=MANIFEST_PATH) -> Dict[str, str]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest: Dict[str, str], path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)  # 중간에 중단되어도 매니페스트가 깨지지 않도록 원자적 교체
+
+def diff_ids(vector_ids: List[str], manifest: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """새로 생기거나 바뀐 chunk의 ID와, 사라진 chunk의 ID를 계산"""
+    current = set(vector_ids)
+    to_upsert = [doc_id for doc_id in dict.fromkeys(vector_ids) if doc_id not in manifest]
+    to_delete = [doc_id for doc_id in manifest if doc_id not in current]
+    return to_upsert, to_delete
+
+# 4. Pinecone 인덱스 생성 또는 연결 (최초 1회 삭제)
 def get_index(delete_first=False):
+    if use_local_backend():
+        index = open_local_index(dimension=embedding_dimension())
+        if delete_first:
+            print("🗑️ 기존 로컬 인덱스 삭제")
+            index.reset()
+        return index
+
     pc = Pinecone(api_key=PINECONE_API_KEY)
 
     if delete_first and PINECONE_INDEX_NAME in pc.list_indexes().names():
@@ -46,7 +71,7 @@ def get_index(delete_first=False):
     if PINECONE_INDEX_NAME not in pc.list_indexes().names():
         pc.create_index(
             name=PINECONE_INDEX_NAME,
-            dimension=3072,
+            dimension=embedding_dimension(),
             metric="dotproduct",
             spec=ServerlessSpec(cloud="aws", region=PINECONE_REGION)
         )
@@ -54,49 +79,106 @@ def get_index(delete_first=False):
 
     return pc.Index(PINECONE_INDEX_NAME)
 
-# 4. 배치 처리 함수
-def process_batch(batch: List[Document], embeddings: OpenAIEmbeddings, index: Any):
+# 5. 배치 처리 함수 (배치 구성 / 속도 제한 / 재시도 / 임베딩-저장 파이프라이닝 → embed_scheduler.py)
+def embed_batch(batch: List[Document], embeddings: Embeddings, sparse_encoder: Any = None) -> List[Dict[str, Any]]:
     texts = [doc.page_content for doc in batch]
     metadatas = [doc.metadata for doc in batch]
 
     vectors = embeddings.embed_documents(texts)
+    # 하이브리드 검색용 BM25 sparse 벡터 (dotproduct 인덱스에 dense와 함께 저장)
+    sparse_vectors = sparse_encoder.encode_documents(texts) if sparse_encoder else [None] * len(texts)
+
+    records = []
+    for doc, vector, sparse, metadata in zip(batch, vectors, sparse_vectors, metadatas):
+        record = {"id": doc.id, "values": vector, "metadata": metadata}
+        if sparse and sparse["indices"]:
+            record["sparse_values"] = sparse
+        records.append(record)
+    return records
+
+def upsert_records(records: List[Dict[str, Any]], index: Any):
+    index.upsert(vectors=records, namespace=NAMESPACE)
 
-    index.upsert(
-        vectors=[
-            (f"doc_{i}", vector, metadata)
-            for i, (vector, metadata) in enumerate(zip(vectors, metadatas))
-        ],
-        namespace=NAMESPACE
-    )
+def delete_vectors(ids: List[str], index: Any):
+    for i in range(0, len(ids), DELETE_BATCH_SIZE):
+        index.delete(ids=ids[i:i + DELETE_BATCH_SIZE], namespace=NAMESPACE)
 
-# 5. 메인 실행
+# 6. 메인 실행
 if __name__ == "__main__":
     print("🚀 약품 정보 벡터 저장 시작...")
 
     try:
-        print("📄 문서 로드 중...")
-        documents = load_documents()
+        print("📄 chunk 벡터 ID 로드 중...")
+        vector_ids = load_vector_ids(CHUNKS_PATH)
 
         print("📌 Pinecone 인덱스 삭제 후 생성 중 (최초 1회)...")
-        index = get_index(delete_first=False)  # <- 여기만 True로 변경
+        delete_first = False  # <- 여기만 True로 변경 (sparse 벡터 추가 / 메타데이터에서 본문(text)을 뺄 때도 한 번 전체 재업로드)
+        index = get_index(delete_first=delete_first)
 
-        print("🔗 임베딩 모델 준비 중...")
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+        # 인덱스를 새로 만들면 기존 매니페스트는 의미가 없으므로 전체 업로드
+        manifest = {} if delete_first else load_manifest()
+        if not manifest and not delete_first:
+            # 이전 버전이 남긴 배치별 "doc_{i}" 벡터 정리
+            delete_vectors([f"doc_{i}" for i in range(BATCH_SIZE)], index)
 
-        BATCH_SIZE = 64
-        batches = [documents[i:i + BATCH_SIZE] for i in range(0, len(documents), BATCH_SIZE)]
+        # 본문은 로컬 문서 저장소에 먼저 기록 (벡터에는 ID와 필터용 메타데이터만 업로드)
+        added, removed = DocStore().sync(CHUNKS_PATH)
+        print(f"🗄️ 문서 저장소 동기화: 추가 {added}건 / 삭제 {removed}건")
 
-        print("🚀 벡터 업로드 중...")
-        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-            futures = [
-                executor.submit(process_batch, batch, embeddings, index)
-                for batch in batches
-            ]
+        to_upsert, to_delete = diff_ids(vector_ids, manifest)
+        print(f"🧮 변경분: 업로드 {len(to_upsert)}건 / 삭제 {len(to_delete)}건 / 유지 {len(vector_ids) - len(to_upsert)}건")
+
+        if to_delete:
+            print("🗑️ 사라진 chunk 벡터 삭제 중...")
+            delete_vectors(to_delete, index)
+            for doc_id in to_delete:
+                manifest.pop(doc_id, None)
+            save_manifest(manifest)
 
-            for _ in tqdm(concurrent.futures.as_completed(futures), total=len(futures)):
-                pass
+        print("🔗 임베딩 모델 준비 중...")
+        # 디스크 캐시에 있는 chunk는 API 호출 없이 재사용
+        # 패킹된 배치 하나 = API 요청 하나가 되도록 내부 분할(chunk_size)과 자체 재시도를 끔 → RPM 예산/재시도는 스케줄러가 관리
+        embeddings = get_embeddings("text-embedding-3-large", chunk_size=EMBED_MAX_BATCH_ITEMS, max_retries=0)
+        # BM25 sparse 벡터는 인코더 파일이 있거나 SEARCH_MODE=hybrid일 때만 (hybrid인데 파일이 없으면 오류)
+        sparse_encoder = None
+        if SEARCH_MODE == "hybrid" or os.path.exists(SPARSE_ENCODER_PATH):
+            sparse_encoder = load_sparse_encoder()
+        else:
+            print(f"⚠️ sparse 인코더({SPARSE_ENCODER_PATH})가 없어 dense 벡터만 업로드합니다 (하이브리드 검색 불가)")
+
+        # 변경분 chunk만 Parquet record batch에서 바로 Document 배치로 변환
+        batches = iter_document_batches(CHUNKS_PATH, BATCH_SIZE, only_ids=set(to_upsert)) if to_upsert else []
+
+        scheduler = EmbeddingScheduler(
+            embed_fn=lambda batch: embed_batch(batch, embeddings, sparse_encoder),
+            upsert_fn=lambda records: upsert_records(records, index),
+            cost=token_cost(embeddings),  # 캐시에 있는 chunk는 API 토큰 예산에서 제외
+        )
 
-        print("✅ 벡터 저장 완료: Pinecone")
+        print("🚀 벡터 업로드 중...")
+        try:
+            with tqdm(total=len(to_upsert)) as progress:
+                for batch in scheduler.run(batches):
+                    for doc in batch:
+                        manifest[doc.id] = doc.metadata["itemSeq"]
+                    progress.update(len(batch))
+        finally:
+            scheduler.report()
+            # 실패하더라도 성공한 배치까지는 기록해 다음 실행에서 이어서 업로드
+            persist_index(index)
+            save_manifest(manifest)
+            if to_upsert or to_delete:
+                bump_index_version()  # 앱의 의미 기반 답변 캐시 무효화
+
+        if scheduler.failed:
+            # 실패한 배치는 매니페스트에 없으므로 다음 실행에서 그 chunk만 다시 업로드
+            for batch, error in scheduler.failed:
+                print(f"⚠️ {len(batch)}건 업로드 실패: {error}")
+            raise RuntimeError(f"{len(scheduler.failed)}개 배치 업로드 실패 (다시 실행하면 실패분만 재시도)")
+
+        backend = "Local" if use_local_backend() else "Pinecone"
+        print(f"✅ 벡터 저장 완료: {backend} (매니페스트 {len(manifest)}건)")
 
     except Exception as e:
         print(f"❌ 오류 발생: {e}")
+        sys.exit(1)
@@ -1,12 +1,19 @@
 import os
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from langchain_core.documents import Document
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnableMap
 from pinecone import Pinecone, ServerlessSpec
 from langchain_core.output_parsers import StrOutputParser
 from langchain_teddynote import logging
+from embedding_cache import get_embeddings, embedding_dimension
+from vector_backend import use_local_backend, open_local_index
+from hybrid_search import SEARCH_MODE, HYBRID_ALPHA, hybrid_query
+from sections import section_filter, use_section_chunks, detect_sections
+from context_budget import CONTEXT_TOKEN_BUDGET, CONTEXT_OVERFETCH, assemble_context
+from name_index import get_name_index, search_with_names
+from doc_store import resolve_texts
 # 목적: 사용자의 질문에 대해 Pinecone에서 유사 문서 검색 후 LLM 응답 생성
 
 # LangSmith 추적 설정
@@ -23,16 +30,19 @@ NAMESPACE = "drug-rag-namespace"
 
 # 2. 모델 및 임베딩 초기화
 llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
-embedder = OpenAIEmbeddings(model="text-embedding-3-large")
+embedder = get_embeddings("text-embedding-3-large")
 
 # 3. Pinecone 인덱스 준비
 def get_or_create_index():
+    if use_local_backend():
+        return open_local_index(dimension=embedding_dimension())
+
     pc = Pinecone(api_key=PINECONE_API_KEY)
 
     if PINECONE_INDEX_NAME not in pc.list_indexes().names():
         pc.create_index(
             name=PINECONE_INDEX_NAME,
-            dimension=3072,
+            dimension=embedding_dimension(),
             metric="dotproduct",
             spec=ServerlessSpec(cloud="aws", region=PINECONE_REGION)
         )
@@ -41,15 +51,42 @@ def get_or_create_index():
 
 index = get_or_create_index()
 
-# 4. 검색 함수 정의
-def similarity_search(query, top_k=5):
-    embedded_query = embedder.embed_query(query)
-    result = index.query(vector=embedded_query, top_k=top_k, namespace=NAMESPACE, include_metadata=True)
+# 4. 검색 함수 정의 (mode="hybrid"면 dense + BM25, alpha=1.0이면 dense만)
+# 섹션 단위 chunk로 색인했다면 질문의 섹션(부작용, 복용 방법 등)만 검색
+# 질문에 약품명이 확실히 있으면 이름 인덱스에서 바로 가져오고 임베딩/벡터 검색은 생략 (애매하면 벡터 검색과 결합)
+name_index = get_name_index()
+
+def similarity_search(query, top_k=5, mode=SEARCH_MODE, alpha=HYBRID_ALPHA, route_sections=None):
+    if route_sections is None:
+        route_sections = use_section_chunks()
+
+    def vector_search():
+        filter = section_filter(query) if route_sections else None
+        matches = hybrid_query(index, embedder, query, top_k, NAMESPACE, alpha=alpha if mode == "hybrid" else 1.0, filter=filter)
+        texts = resolve_texts(matches)  # 본문은 로컬 문서 저장소에서 ID로 조회
+        return [
+            Document(
+                id=match["id"],
+                page_content=text,
+                metadata={"itemName": match["metadata"].get("itemName", ""), "score": match["score"]}
+            )
+            for match, text in zip(matches, texts) if text
+        ]
+
+    sections = detect_sections(query) if route_sections else None
+    docs = search_with_names(name_index, query, top_k, sections, vector_search)
     return [
-        Document(page_content=match["metadata"].get("itemName", "") + "\n" + match["metadata"].get("text", ""))
-        for match in result["matches"]
+        Document(page_content=doc.metadata["itemName"] + "\n" + doc.page_content, metadata=doc.metadata)
+        for doc in docs
     ]
 
+# 4-1. 컨텍스트 조립 (중복 제거 + 점수 순 + 토큰 예산)
+def build_context(question, top_k=5, budget=CONTEXT_TOKEN_BUDGET):
+    docs = similarity_search(question, top_k=top_k * CONTEXT_OVERFETCH)
+    docs, stats = assemble_context(docs, budget=budget, max_docs=top_k)
+    print(stats.report())
+    return "\n\n".join([doc.page_content for doc in docs])
+
 # 5. 프롬프트 템플릿 정의
 prompt = PromptTemplate.from_template("""
 너는 의약품 정보를 설명해주는 전문가야. 아래의 약품 정보를 참고해서 사용자 질문에 친절하게 답변해줘.
@@ -64,7 +101,7 @@ prompt = PromptTemplate.from_template("""
 # 6. 체인 구성
 rag_chain = (
     RunnableMap({
-        "context": lambda x: "\n\n".join([doc.page_content for doc in similarity_search(x["question"])]),
+        "context": lambda x: build_context(x["question"]),
         "question": lambda x: x["question"]
     })
     | prompt
@@ -2,10 +2,11 @@ import os
 import gradio as gr
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Pinecone
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
+from embedding_cache import get_embeddings
+from hybrid_search import get_retriever
+from rag_stream import RAG_STREAMING, format_response, stream_answer
 from langchain.callbacks import LangChainTracer
 from langchain.schema import Document
 from typing import List
@@ -25,11 +26,13 @@ PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "medical-db")
 NAMESPACE = "drug-rag-namespace"
 
 # 4. 임베딩 모델 및 벡터 스토어 초기화
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-vectorstore = Pinecone.from_existing_index(
+embeddings = get_embeddings("text-embedding-3-large")
+# VECTOR_BACKEND=local 이면 로컬 인덱스, SEARCH_MODE=hybrid 이면 dense + BM25 (HYBRID_ALPHA로 가중치 조절)
+retriever = get_retriever(
     index_name=PINECONE_INDEX_NAME,
     embedding=embeddings,
-    namespace=NAMESPACE
+    namespace=NAMESPACE,
+    k=3
 )
 
 # 5. LLM 모델 초기화
@@ -65,9 +68,7 @@ PROMPT = PromptTemplate(
 chain = RetrievalQA.from_chain_type(
     llm=llm,
     chain_type="stuff",
-    retriever=vectorstore.as_retriever(
-        search_kwargs={"k": 3}
-    ),
+    retriever=retriever,
     chain_type_kwargs={"prompt": PROMPT},
     return_source_documents=True
 )
@@ -78,20 +79,28 @@ def query_drug_info(query: str) -> str:
     try:
         result = chain({"query": query})
         answer = result["result"]
-        sources = result["source_documents"]
+        source_names = [doc.metadata.get('itemName', '알 수 없음') for doc in result["source_documents"]]
         
         # 소스 문서 정보 추가
         source_info = "\n\n참고한 약품 정보:\n"
-        for i, doc in enumerate(sources, 1):
-            source_info += f"{i}. {doc.metadata.get('itemName', '알 수 없음')}\n"
+        for i, name in enumerate(source_names, 1):
+            source_info += f"{i}. {name}\n"
         
         return answer + source_info
     except Exception as e:
         return f"오류가 발생했습니다: {str(e)}"
 
+# 8-1. 스트리밍 버전 (검색 직후 참고 약품명 표시 → 답변 토큰을 받는 대로 갱신)
+def stream_drug_info(query: str):
+    try:
+        for source_names, answer in stream_answer(retriever, llm, PROMPT, query):
+            yield format_response(answer, source_names, title="참고한 약품 정보:")
+    except Exception as e:
+        yield f"오류가 발생했습니다: {str(e)}"
+
 # 9. Gradio 인터페이스 생성
 iface = gr.Interface(
-    fn=query_drug_info,
+    fn=stream_drug_info if RAG_STREAMING else query_drug_info,
     inputs=gr.Textbox(
         lines=2,
         placeholder="약품에 대해 궁금한 점을 입력하세요...",
@@ -113,4 +122,4 @@ iface = gr.Interface(
 # 10. 서버 실행
 if __name__ == "__main__":
     print("🚀 약품 정보 검색 시스템 시작...")
-    iface.launch(share=True) 
\ No newline at end of file
+    iface.queue().launch(share=True)  # 제너레이터(스트리밍) 응답은 큐 필요
\ No newline at end of file
@@ -1,10 +1,13 @@
 import os
 import gradio as gr
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import Pinecone
+from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
+from embedding_cache import get_embeddings
+from hybrid_search import get_retriever
+from semantic_cache import SemanticAnswerCache
+from rag_stream import RAG_STREAMING, format_response, stream_answer
 from langchain.schema import Document
 from langchain_teddynote import logging
 # 목적: 약품 정보를 검색하는 RAG 기반 Agent + Gradio UI
@@ -19,11 +22,13 @@ PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "medical-db")
 NAMESPACE = "drug-rag-namespace"
 
 # 3. 임베딩 모델 및 벡터스토어 초기화
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-vectorstore = Pinecone.from_existing_index(
+embeddings = get_embeddings("text-embedding-3-large")
+# VECTOR_BACKEND=local 이면 로컬 인덱스, SEARCH_MODE=hybrid 이면 dense + BM25 (HYBRID_ALPHA로 가중치 조절)
+retriever = get_retriever(
     index_name=PINECONE_INDEX_NAME,
     embedding=embeddings,
-    namespace=NAMESPACE
+    namespace=NAMESPACE,
+    k=3
 )
 
 # 4. LLM 모델 설정
@@ -60,26 +65,48 @@ PROMPT = PromptTemplate(
 chain = RetrievalQA.from_chain_type(
     llm=llm,
     chain_type="stuff",
-    retriever=vectorstore.as_retriever(search_kwargs={"k": 3}),
+    retriever=retriever,
     chain_type_kwargs={"prompt": PROMPT},
     return_source_documents=True
 )
 
+# 반복 질문은 LLM 호출 없이 캐시된 답변 반환 (인덱스 재구축 시 자동 무효화)
+answer_cache = SemanticAnswerCache(embeddings)
+
 # 7. 질의 함수 정의
 def query_drug_info(query: str) -> str:
     try:
-        result = chain.invoke({"query": query})
-        answer = result["result"]
-        sources = result["source_documents"]
+        cached = answer_cache.lookup(query)
+        if cached:
+            answer, source_names = cached["answer"], cached["sources"]
+        else:
+            result = chain.invoke({"query": query})
+            answer = result["result"]
+            source_names = [doc.metadata.get("itemName", "알 수 없음") for doc in result["source_documents"]]
+            answer_cache.store(query, answer, source_names)
 
         source_info = "\n\n📚 참고한 약품 정보:\n"
-        for i, doc in enumerate(sources, 1):
-            source_info += f"{i}. {doc.metadata.get('itemName', '알 수 없음')}\n"
+        for i, name in enumerate(source_names, 1):
+            source_info += f"{i}. {name}\n"
 
         return answer + source_info
     except Exception as e:
         return f"❌ 오류 발생: {str(e)}"
 
+# 7-1. 스트리밍 버전 (검색 직후 참고 약품명 표시 → 답변 토큰을 받는 대로 갱신)
+def stream_drug_info(query: str):
+    try:
+        cached = answer_cache.lookup(query)
+        if cached:
+            answer, source_names = cached["answer"], cached["sources"]
+            yield format_response(answer, source_names)
+            return
+        for source_names, answer in stream_answer(retriever, llm, PROMPT, query):
+            yield format_response(answer, source_names)
+        answer_cache.store(query, answer, source_names)
+    except Exception as e:
+        yield f"❌ 오류 발생: {str(e)}"
+
 # 8. Gradio UI 정의
 def build_ui():
     with gr.Blocks(title="약품 검색 에이전트") as demo:
@@ -92,7 +119,7 @@ def build_ui():
         )
         output = gr.Textbox(label="답변")
 
-        query.submit(fn=query_drug_info, inputs=query, outputs=output)
+        query.submit(fn=stream_drug_info if RAG_STREAMING else query_drug_info, inputs=query, outputs=output)
 
     return demo
 
@@ -100,4 +127,4 @@ def build_ui():
 if __name__ == "__main__":
     print("🚀 약품 검색 에이전트 UI 실행 중...")
     ui = build_ui()
-    ui.launch(share=True)
\ No newline at end of file
+    ui.queue().launch(share=True)  # 제너레이터(스트리밍) 응답은 큐 필요
\ No newline at end of file
@@ -1,10 +1,11 @@
 import os
 import streamlit as st
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import Pinecone
+from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
+from embedding_cache import get_embeddings
+from hybrid_search import get_retriever
 
 # 0. 초기 설정 및 환경 변수 로드
 load_dotenv()
@@ -14,13 +15,14 @@ PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "medical-db")
 NAMESPACE = "drug-rag-namespace"
 
 # 1. 벡터스토어 초기화
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-vectorstore = Pinecone.from_existing_index(
+embeddings = get_embeddings("text-embedding-3-large")
+# VECTOR_BACKEND=local 이면 로컬 인덱스, SEARCH_MODE=hybrid 이면 dense + BM25 (HYBRID_ALPHA로 가중치 조절)
+retriever = get_retriever(
     index_name=PINECONE_INDEX_NAME,
     embedding=embeddings,
-    namespace=NAMESPACE
+    namespace=NAMESPACE,
+    k=3
 )
-retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
 
 # 2. LLM 및 프롬프트 세팅 (질문에 맞는 정보만 추출하게 유도)
 template = """
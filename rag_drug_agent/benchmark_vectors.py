@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+from typing import Dict, List, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from chunk_store import CHUNKS_PATH, read_chunk_columns
+from embedding_cache import EmbeddingCache, get_embedding_cache, get_embeddings, MODEL_DIMENSIONS
+from vector_backend import LocalIndex, STORAGE_DTYPES
+# 목적: 벡터 차원 축소(단축 임베딩) × 저장 형식(float32/float16/int8) 조합별 검색 품질/메모리/속도 비교
+# - 기준: 원래 차원 float32 전수 검색의 top-k
+# - 차원 축소는 앞쪽 d개 성분을 자르고 다시 정규화 (OpenAI dimensions 파라미터와 같은 방식) → API 재호출 없음
+# - chunk 벡터는 임베딩 캐시(3_ 실행 시 저장)에서 읽고, 질문만 임베딩
+# - 각 조합을 실제 LocalIndex(임시 디렉터리)에 넣어 recall@k, 벡터당 바이트, 디스크 크기, 질의 지연 측정
+# 사용법: python rag_drug_agent/benchmark_vectors.py [--queries 질문.txt] [--dims 3072,1536,1024,512,256] [--k 5]
+
+MODEL = "text-embedding-3-large"
+DEFAULT_DIMS = "3072,1536,1024,512,256"
+DEFAULT_QUERIES = [
+    "타이레놀 부작용 알려줘",
+    "아스피린은 어떤 효능이 있나요?",
+    "감기약 복용 방법",
+    "임산부가 먹으면 안 되는 약",
+    "위장약과 같이 먹으면 안 되는 약",
+    "두통에 먹는 약",
+    "소화불량에 좋은 약",
+    "졸음이 오는 약",
+    "어린이 해열제 용량",
+    "알레르기 비염 약 주의사항",
+    "변비약 보관 방법",
+    "진통제를 술과 함께 먹어도 되나요?",
+]
+UPSERT_BATCH = 1024
+
+
+def load_corpus_vectors(filename: str = CHUNKS_PATH) -> Tuple[List[str], np.ndarray]:
+    """chunk 파일의 ID와, 임베딩 캐시에 저장된 원래 차원 벡터 (캐시에 없는 chunk는 제외)"""
+    df = read_chunk_columns(filename, columns=["id", "chunk"]).drop_duplicates("id")
+    hashes = [EmbeddingCache.text_hash(text) for text in df["chunk"]]
+    cached = get_embedding_cache().get_many(MODEL, 0, hashes)
+    keep = [i for i, vector in enumerate(cached) if vector is not None]
+    if not keep:
+        raise RuntimeError("❌ 임베딩 캐시에 chunk 벡터가 없습니다. 3_embed_to_pinecone.py를 먼저 실행하세요.")
+    if len(keep) < len(df):
+        print(f"⚠️ 캐시에 없는 chunk {len(df) - len(keep)}건 제외")
+    ids = df["id"].iloc[keep].tolist()
+    return ids, np.stack([cached[i] for i in keep]).astype(np.float32)
+
+
+def shorten(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """앞쪽 dim개 성분만 남기고 L2 정규화"""
+    short = vectors[:, :dim]
+    norms = np.linalg.norm(short, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (short / norms).astype(np.float32)
+
+
+def build_index(path: str, ids: List[str], vectors: np.ndarray, dtype: str) -> LocalIndex:
+    index = LocalIndex(path=path, dimension=vectors.shape[1], mode="exact", dtype=dtype)
+    for start in range(0, len(ids), UPSERT_BATCH):
+        index.upsert(vectors=[
+            {"id": doc_id, "values": vector}
+            for doc_id, vector in zip(ids[start:start + UPSERT_BATCH], vectors[start:start + UPSERT_BATCH])
+        ])
+    index.persist()
+    return index
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def run_queries(index: LocalIndex, queries: np.ndarray, k: int) -> Tuple[List[List[str]], List[float]]:
+    results, latencies = [], []
+    index.query(vector=queries[0], top_k=k)  # 첫 질의의 memmap 로딩은 측정에서 제외
+    for query in queries:
+        start = time.perf_counter()
+        matches = index.query(vector=query, top_k=k)["matches"]
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([match["id"] for match in matches])
+    return results, latencies
+
+
+def recall_at_k(results: List[List[str]], baseline: List[List[str]]) -> float:
+    return float(np.mean([len(set(r) & set(b)) / max(len(b), 1) for r, b in zip(results, baseline)]))
+
+
+def benchmark(ids: List[str], corpus: np.ndarray, queries: np.ndarray, dims: List[int], dtypes: List[str],
+              k: int) -> List[Dict]:
+    rows = []
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for dim in dims:
+            corpus_d, queries_d = shorten(corpus, dim), shorten(queries, dim)
+            for dtype in dtypes:
+                path = os.path.join(tmp_dir, f"{dim}_{dtype}")
+                index = build_index(path, ids, corpus_d, dtype)
+                results, latencies = run_queries(index, queries_d, k)
+                if baseline is None:
+                    baseline = results  # 첫 조합(원래 차원 float32)이 기준
+                itemsize = np.dtype(STORAGE_DTYPES[dtype][0]).itemsize
+                rows.append({
+                    "dim": dim,
+                    "dtype": dtype,
+                    "recall": recall_at_k(results, baseline),
+                    "bytes_per_vector": dim * itemsize + (4 if dtype == "int8" else 0),
+                    "disk_mb": directory_size(path) / 1024 / 1024,
+                    "p50_ms": float(np.percentile(latencies, 50)),
+                    "p95_ms": float(np.percentile(latencies, 95)),
+                })
+                print(f"  ✔ {dim}차원 / {dtype}: recall@{k}={rows[-1]['recall']:.3f}")
+    return rows
+
+
+def print_report(rows: List[Dict], k: int, n_vectors: int, n_queries: int):
+    print(f"\n📊 벡터 저장 방식 비교 (chunk {n_vectors}건, 질문 {n_queries}개, 기준: {rows[0]['dim']}차원 float32)")
+    print(f"{'차원':>6} {'형식':<8} {f'recall@{k}':>9} {'B/벡터':>8} {'디스크(MB)':>10} {'p50(ms)':>8} {'p95(ms)':>8}")
+    for row in rows:
+        print(f"{row['dim']:>6} {row['dtype']:<8} {row['recall']:>9.3f} {row['bytes_per_vector']:>8} "
+              f"{row['disk_mb']:>10.1f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="벡터 차원/저장 형식별 recall·메모리·지연 벤치마크")
+    parser.add_argument("--queries", help="질문 목록 파일 (한 줄에 하나, 없으면 기본 질문 사용)")
+    parser.add_argument("--dims", default=DEFAULT_DIMS, help="비교할 차원 목록 (쉼표 구분, 첫 값 = 기준)")
+    parser.add_argument("--dtypes", default=",".join(STORAGE_DTYPES), help="비교할 저장 형식 (쉼표 구분)")
+    parser.add_argument("--k", type=int, default=5)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    args = parse_args()
+    print("🧪 벡터 저장 방식 벤치마크 시작...")
+    try:
+        dims = [int(d) for d in args.dims.split(",")]
+        dtypes = args.dtypes.split(",")
+        if dims[0] != MODEL_DIMENSIONS[MODEL] or dtypes[0] != "float32":
+            raise ValueError(f"❌ 첫 조합은 기준({MODEL_DIMENSIONS[MODEL]}차원 float32)이어야 합니다.")
+
+        ids, corpus = load_corpus_vectors()
+        if args.queries:
+            with open(args.queries, encoding="utf-8") as f:
+                questions = [line.strip() for line in f if line.strip()]
+        else:
+            questions = DEFAULT_QUERIES
+        embedder = get_embeddings(MODEL, dimensions=0)  # 원래 차원으로 임베딩 후 잘라서 비교
+        queries = np.asarray([embedder.embed_query(q) for q in questions], dtype=np.float32)
+
+        rows = benchmark(ids, corpus, queries, dims, dtypes, args.k)
+        print_report(rows, args.k, len(ids), len(questions))
+    except Exception as e:
+        print(f"❌ 오류 발생: {e}")
+        sys.exit(1)
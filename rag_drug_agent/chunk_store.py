@@ -0,0 +1,93 @@
+import os
+import hashlib
+from typing import Iterable, Iterator, List, Optional, Set
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from langchain.docstore.document import Document
+# 목적: 2_ 전처리 결과(chunk)를 컬럼형 Parquet으로 저장하고, 3_ 업로드 단계로 배치 단위 스트리밍
+# - 벡터 ID(itemSeq + chunk 해시)를 전처리 시점에 계산해 저장 → 변경분 계산은 id 컬럼만 읽음
+# - 업로드는 record batch를 바로 Document 배치로 변환 (전체 코퍼스를 메모리에 올리지 않음)
+
+CHUNKS_PATH = "data/drug_chunks.parquet"
+ROW_GROUP_SIZE = 4096
+DOCUMENT_COLUMNS = ["id", "itemSeq", "itemName", "chunk"]
+OPTIONAL_COLUMNS = ["section"]  # CHUNK_MODE=section 일 때만 존재
+
+
+def make_vector_id(item_seq, text):
+    """itemSeq + chunk 내용 해시로 안정적인 벡터 ID 생성 (내용이 같으면 ID도 같음)"""
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+    return f"{item_seq}-{digest}"
+
+
+def save_chunks(df: pd.DataFrame, filename: str = CHUNKS_PATH):
+    """chunk DataFrame(모든 컬럼 문자열)에 벡터 ID를 붙여 Parquet으로 원자적 저장"""
+    df = df.assign(id=[make_vector_id(seq, text) for seq, text in zip(df["itemSeq"], df["chunk"])])
+    schema = pa.schema([(name, pa.string()) for name in df.columns])
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp_path = filename + ".tmp"
+    pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, filename)
+
+
+def read_chunk_columns(filename: str = CHUNKS_PATH, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    if not os.path.exists(filename):
+        raise FileNotFoundError(f"❌ 파일을 찾을 수 없습니다: {filename} (2_preprocess_chunk.py를 먼저 실행하세요)")
+    return pq.read_table(filename, columns=columns).to_pandas()
+
+
+def stored_chunk_mode(filename: str = CHUNKS_PATH) -> Optional[str]:
+    """저장된 chunk 파일의 방식 ("drug" | "section"), 파일이 없으면 None"""
+    if not os.path.exists(filename):
+        return None
+    return "section" if "section" in pq.read_schema(filename).names else "drug"
+
+
+def load_vector_ids(filename: str = CHUNKS_PATH) -> List[str]:
+    """저장된 chunk의 벡터 ID 목록 (id 컬럼만 읽음)"""
+    return read_chunk_columns(filename, columns=["id"])["id"].tolist()
+
+
+def _to_documents(batch: pa.RecordBatch, only_ids: Optional[Set[str]]) -> Iterable[Document]:
+    columns = batch.to_pydict()
+    sections = columns.get("section") or [None] * batch.num_rows
+    for doc_id, item_seq, item_name, chunk, section in zip(
+        columns["id"], columns["itemSeq"], columns["itemName"], columns["chunk"], sections
+    ):
+        if only_ids is not None and doc_id not in only_ids:
+            continue
+        # 본문은 벡터 메타데이터에 넣지 않음 (doc_store.py의 로컬 저장소에서 ID로 조회)
+        metadata = {
+            "itemSeq": item_seq or "",
+            "itemName": item_name or "",
+        }
+        if section:
+            metadata["section"] = section
+        yield Document(id=doc_id, page_content=chunk, metadata=metadata)
+
+
+def iter_document_batches(filename: str = CHUNKS_PATH, batch_size: int = 64,
+                          only_ids: Optional[Set[str]] = None) -> Iterator[List[Document]]:
+    """Parquet record batch를 읽는 즉시 batch_size개씩 Document 배치로 변환
+
+    Args:
+        filename (str): save_chunks로 저장한 Parquet 파일
+        batch_size (int): 임베딩 배치 크기
+        only_ids (set): 지정하면 이 ID의 chunk만 (업로드할 변경분)
+    """
+    if not os.path.exists(filename):
+        raise FileNotFoundError(f"❌ 파일을 찾을 수 없습니다: {filename} (2_preprocess_chunk.py를 먼저 실행하세요)")
+    parquet_file = pq.ParquetFile(filename)
+    columns = DOCUMENT_COLUMNS + [c for c in OPTIONAL_COLUMNS if c in parquet_file.schema_arrow.names]
+    buffer: List[Document] = []
+    for record_batch in parquet_file.iter_batches(batch_size=ROW_GROUP_SIZE, columns=columns):
+        for doc in _to_documents(record_batch, only_ids):
+            buffer.append(doc)
+            if len(buffer) == batch_size:
+                yield buffer
+                buffer = []
+    if buffer:
+        yield buffer
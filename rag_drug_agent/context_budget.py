@@ -0,0 +1,139 @@
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import tiktoken
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+# 목적: 검색 결과를 프롬프트에 넣기 전 컨텍스트 조립 단계
+# - 거의 같은 문서(같은 성분의 제조사별 약품 등)는 점수가 가장 높은 1건만 남김
+# - 점수 순으로 정렬 후 토큰 예산(CONTEXT_TOKEN_BUDGET)까지만 채우고, 넘치는 마지막 문서는 잘라냄
+# → 요청당 프롬프트 토큰(비용, 첫 토큰까지 시간)의 상한이 고정됨
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))  # 0이면 조립 단계 미사용
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.9"))  # 문자 3-gram Jaccard 유사도
+CONTEXT_OVERFETCH = int(os.getenv("CONTEXT_OVERFETCH", "2"))  # 중복 제거 여유분: k × 배수만큼 후보 검색
+CONTEXT_MIN_TAIL = 100  # 마지막 문서를 잘라 넣을 때 최소 토큰 수 (이보다 적게 남으면 생략)
+TOKENIZER_MODEL = os.getenv("CONTEXT_TOKENIZER_MODEL", "gpt-4")
+
+_encoding = None
+
+
+def get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text))
+
+
+IDENTITY_PREFIXES = ("약품명:", "제조사:")  # 제조사별 동일 성분 약품은 이 줄만 다름 → 중복 비교에서 제외
+MIN_BODY_CHARS = 20  # 식별 줄을 뺀 본문이 이보다 짧으면(섹션 모드 제조사 chunk 등) 식별 줄까지 비교
+
+
+def _shingles(text: str, n: int = 3) -> set:
+    lines = [line for line in text.splitlines() if not line.strip().startswith(IDENTITY_PREFIXES)]
+    body = "".join("".join(lines).split())  # 공백/줄바꿈 차이는 무시
+    if len(body) < MIN_BODY_CHARS:
+        body = "".join(text.split())
+    return {body[i:i + n] for i in range(max(len(body) - n + 1, 1))}
+
+
+def _truncate(encoding, token_ids: List[int], limit: int) -> Tuple[str, List[int]]:
+    """앞에서 limit 토큰 이하로 자르되, 한글 등 여러 토큰에 걸친 글자 중간에서 끊기지 않도록 경계까지 되돌림"""
+    for cut in range(limit, max(limit - 4, -1), -1):  # UTF-8 한 글자는 최대 4바이트
+        try:
+            return encoding.decode_bytes(token_ids[:cut]).decode("utf-8"), token_ids[:cut]
+        except UnicodeDecodeError:
+            continue
+    # 글자 경계가 토큰 경계와 계속 어긋나는 드문 경우: 잘린 바이트만 버림
+    return encoding.decode_bytes(token_ids[:limit]).decode("utf-8", errors="ignore"), token_ids[:limit]
+
+
+@dataclass
+class ContextStats:
+    candidates: int = 0
+    duplicates: int = 0
+    dropped: int = 0  # 예산/문서 수 초과로 빠진 문서 수
+    tokens_before: int = 0  # 조립 단계 없이 상위 max_docs건을 그대로 넣었을 때의 토큰 수
+    tokens_after: int = 0
+
+    @property
+    def saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def report(self) -> str:
+        return (
+            f"✂️ 컨텍스트 {self.tokens_before} → {self.tokens_after} 토큰 ({self.saved} 절약, "
+            f"후보 {self.candidates}건 중 중복 {self.duplicates}건 / 예산 초과 {self.dropped}건 제외)"
+        )
+
+
+def assemble_context(docs: List[Document], budget: int = CONTEXT_TOKEN_BUDGET, max_docs: Optional[int] = None,
+                     threshold: float = CONTEXT_DEDUP_THRESHOLD) -> Tuple[List[Document], ContextStats]:
+    """중복 제거 → 점수 순 정렬 → 토큰 예산/문서 수 제한을 적용한 문서 목록과 통계 반환
+
+    점수(metadata["score"])가 없는 문서는 검색 순서를 그대로 따름
+    """
+    encoding = get_encoding()
+    stats = ContextStats(candidates=len(docs))
+    stats.tokens_before = sum(len(encoding.encode(doc.page_content)) for doc in docs[:max_docs])
+    ordered = sorted(enumerate(docs), key=lambda pair: (-pair[1].metadata.get("score", 0.0), pair[0]))
+
+    # 1. 중복 제거 (점수가 높은 문서를 남기고, 빠진 약품명은 merged_items에 기록)
+    unique: List[Tuple[Document, set]] = []
+    for _, doc in ordered:
+        shingles = _shingles(doc.page_content)
+        duplicate_of = next(
+            (kept for kept, kept_shingles in unique
+             if len(shingles & kept_shingles) / len(shingles | kept_shingles) >= threshold),
+            None,
+        )
+        if duplicate_of is not None:
+            stats.duplicates += 1
+            duplicate_of.metadata.setdefault("merged_items", []).append(doc.metadata.get("itemName", ""))
+            continue
+        unique.append((Document(id=doc.id, page_content=doc.page_content, metadata=dict(doc.metadata)), shingles))
+
+    # 2. 토큰 예산 채우기
+    selected: List[Document] = []
+    remaining = budget
+    for doc, _ in unique:
+        if max_docs is not None and len(selected) >= max_docs:
+            stats.dropped += 1
+            continue
+        token_ids = encoding.encode(doc.page_content)
+        if len(token_ids) > remaining:
+            if remaining < CONTEXT_MIN_TAIL:
+                stats.dropped += 1
+                continue
+            doc.page_content, token_ids = _truncate(encoding, token_ids, remaining)
+            doc.metadata["truncated"] = True
+        selected.append(doc)
+        remaining -= len(token_ids)
+        stats.tokens_after += len(token_ids)
+    return selected, stats
+
+
+class ContextBudgetRetriever(BaseRetriever):
+    """기존 리트리버 결과에 컨텍스트 조립 단계(중복 제거 + 토큰 예산)를 적용하는 래퍼"""
+
+    base: BaseRetriever
+    budget: int = CONTEXT_TOKEN_BUDGET
+    max_docs: Optional[int] = None
+    threshold: float = CONTEXT_DEDUP_THRESHOLD
+    verbose: bool = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs = self.base.invoke(query, config={"callbacks": run_manager.get_child()})
+        selected, stats = assemble_context(docs, self.budget, self.max_docs, self.threshold)
+        if self.verbose:
+            print(stats.report())
+        return selected
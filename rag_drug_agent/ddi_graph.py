@@ -0,0 +1,289 @@
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from name_index import AhoCorasick, name_aliases, normalize
+from sections import SECTIONS
+# 목적: DUR 병용금기 데이터(CSV)를 약품/성분 노드의 CSR 그래프로 만들어 이진 파일(npz)로 저장
+# - 간선: 약품 ↔ 병용금기 약품 (사유 포함), 약품 ↔ 함유 성분
+# - 검색 결과 앞에 DUR 사실을 문서로 덧붙임 (DDIContextRetriever, get_retriever에서 자동 적용)
+#   → "A랑 B 같이 먹어도 돼?"(쌍) / "A와 같이 먹으면 안 되는 약"(이웃) 질문에서 LLM이 약품 설명서와 DUR 기준을 함께 참고
+#   답변 자체를 대신하지 않음 — 임부/음주 주의 등 설명서 내용은 그대로 컨텍스트에 남음
+# 사용법: python rag_drug_agent/ddi_graph.py  (taboo CSV → data/ddi_graph.npz)
+
+DDI_GRAPH_PATH = "data/ddi_graph.npz"
+TABOO_SOURCES = [
+    # (CSV 경로, {표준 컬럼: CSV 컬럼})
+    ("data/taboo_from_drfstf.csv", {"item": "품목명", "ingredient": "성분명", "other": "혼합금기대상약품명",
+                                    "other_fallback": "금기약품명", "content": "금기내용"}),
+    ("data/narcotic_taboo_interactions.csv", {"item": "ITEM_NAME", "ingredient": "INGR_NAME", "other": "MIXTURE_ITEM_NAME",
+                                              "other_fallback": "PROHBT_ITEM_NAME", "content": "PROHBT_CONTENT"}),
+]
+PRODUCT, INGREDIENT = 0, 1
+CONTRA, HAS_INGREDIENT = 0, 1
+MAX_NEIGHBOURS = 20  # 이웃 질문에 나열할 최대 약품 수
+INTERACTION_KEYWORDS = SECTIONS["interaction"][2] + ["먹으면 안", "금기", "먹어도", "복용해도", "같이", "함께"]
+# 약품 하나만 언급된 질문은 병용금기 목록을 직접 묻는 표현일 때만 이웃 목록을 붙임 (공백 제거 후 비교)
+CONTRA_LIST_PHRASES = ["먹으면안되는", "복용하면안되는", "먹으면안돼는", "병용금기", "금기약", "같이먹으면안", "함께먹으면안"]
+DUR_SOURCE_NAME = "식약처 DUR 병용금기"
+
+
+def _pack_strings(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """문자열 목록 → (UTF-8 바이트 배열, 오프셋 배열)"""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def load_taboo_pairs(sources=TABOO_SOURCES) -> pd.DataFrame:
+    """수집된 병용금기 CSV들을 (item, ingredient, other, content) 표준 컬럼으로 합침"""
+    frames = []
+    for path, columns in sources:
+        if not os.path.exists(path):
+            continue
+        df = pd.read_csv(path, dtype=str, encoding="utf-8-sig").fillna("")
+        get = lambda key: df[columns[key]] if columns[key] in df.columns else pd.Series("", index=df.index)
+        other = get("other").where(get("other") != "", get("other_fallback"))
+        frames.append(pd.DataFrame({
+            "item": get("item").str.strip(),
+            "ingredient": get("ingredient").str.strip(),
+            "other": other.str.strip(),
+            "content": get("content").str.strip(),
+        }))
+    if not frames:
+        raise FileNotFoundError("❌ 병용금기 CSV가 없습니다. data_analysis 수집 스크립트를 먼저 실행하세요.")
+    return pd.concat(frames, ignore_index=True).drop_duplicates()
+
+
+class DDIGraph:
+    """약품/성분 노드 CSR 그래프 (indptr/indices/edge_kind/edge_reason)"""
+
+    def __init__(self, names: List[str], kinds: np.ndarray, indptr: np.ndarray, indices: np.ndarray,
+                 edge_kind: np.ndarray, edge_reason: np.ndarray, reasons: List[str]):
+        self.names = names
+        self.kinds = kinds
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_kind = edge_kind
+        self.edge_reason = edge_reason
+        self.reasons = reasons
+        # 질문 속 약품/성분명 탐지용 (별칭 → 노드)
+        alias_nodes: Dict[str, List[int]] = {}
+        for node, (name, kind) in enumerate(zip(names, kinds)):
+            aliases = name_aliases(name) if kind == PRODUCT else [normalize(name)]
+            for alias in aliases:
+                alias_nodes.setdefault(alias, []).append(node)
+        self.alias_nodes = alias_nodes
+        self.automaton = AhoCorasick(list(alias_nodes))
+
+    # --- 생성 / 저장 -------------------------------------------------------
+    @classmethod
+    def build(cls, pairs: pd.DataFrame) -> "DDIGraph":
+        node_ids: Dict[Tuple[int, str], int] = {}
+        names: List[str] = []
+        kinds: List[int] = []
+
+        def node(name: str, kind: int) -> int:
+            key = (kind, name)
+            if key not in node_ids:
+                node_ids[key] = len(names)
+                names.append(name)
+                kinds.append(kind)
+            return node_ids[key]
+
+        reason_ids: Dict[str, int] = {}
+        edges = set()  # (src, dst, kind, reason)
+        for item, ingredient, other, content in pairs[["item", "ingredient", "other", "content"]].itertuples(index=False):
+            if not item:
+                continue
+            src = node(item, PRODUCT)
+            if ingredient:
+                ingr = node(ingredient, INGREDIENT)
+                edges.add((src, ingr, HAS_INGREDIENT, -1))
+                edges.add((ingr, src, HAS_INGREDIENT, -1))
+            if other:
+                dst = node(other, PRODUCT)
+                reason = reason_ids.setdefault(content, len(reason_ids))
+                edges.add((src, dst, CONTRA, reason))
+                edges.add((dst, src, CONTRA, reason))
+
+        edge_array = np.array(sorted(edges), dtype=np.int64).reshape(-1, 4)
+        indptr = np.zeros(len(names) + 1, dtype=np.int64)
+        np.add.at(indptr, edge_array[:, 0] + 1, 1)
+        return cls(
+            names=names,
+            kinds=np.array(kinds, dtype=np.int8),
+            indptr=np.cumsum(indptr),
+            indices=edge_array[:, 1].astype(np.int32),
+            edge_kind=edge_array[:, 2].astype(np.int8),
+            edge_reason=edge_array[:, 3].astype(np.int32),
+            reasons=list(reason_ids),
+        )
+
+    def save(self, path: str = DDI_GRAPH_PATH):
+        name_blob, name_offsets = _pack_strings(self.names)
+        reason_blob, reason_offsets = _pack_strings(self.reasons)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, kinds=self.kinds, indptr=self.indptr, indices=self.indices,
+                 edge_kind=self.edge_kind, edge_reason=self.edge_reason,
+                 name_blob=name_blob, name_offsets=name_offsets,
+                 reason_blob=reason_blob, reason_offsets=reason_offsets)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = DDI_GRAPH_PATH) -> "DDIGraph":
+        with np.load(path) as data:
+            return cls(
+                names=_unpack_strings(data["name_blob"], data["name_offsets"]),
+                kinds=data["kinds"],
+                indptr=data["indptr"],
+                indices=data["indices"],
+                edge_kind=data["edge_kind"],
+                edge_reason=data["edge_reason"],
+                reasons=_unpack_strings(data["reason_blob"], data["reason_offsets"]),
+            )
+
+    # --- 조회 --------------------------------------------------------------
+    def _edges(self, node: int, kind: int) -> List[Tuple[int, int]]:
+        start, end = self.indptr[node], self.indptr[node + 1]
+        mask = self.edge_kind[start:end] == kind
+        return list(zip(self.indices[start:end][mask].tolist(), self.edge_reason[start:end][mask].tolist()))
+
+    def products_of(self, nodes: List[int]) -> List[int]:
+        """약품 노드는 자기 자신, 성분 노드는 그 성분을 함유한 약품들"""
+        products: Dict[int, None] = {}
+        for node in nodes:
+            if self.kinds[node] == PRODUCT:
+                products[node] = None
+            else:
+                products.update((product, None) for product, _ in self._edges(node, HAS_INGREDIENT))
+        return list(products)
+
+    def find_mentions(self, query: str) -> List[Tuple[str, List[int]]]:
+        """질문에 등장한 약품/성분 언급 (언급 텍스트, 해당 노드들) — 긴 이름 우선, 겹치는 짧은 이름은 무시
+
+        "트라마돌"처럼 약품 별칭과 성분명이 같으면 한 언급에 두 노드가 함께 묶임
+        """
+        text = normalize(query)
+        matches = sorted(self.automaton.search(text), key=lambda m: (-len(m[1]), m[0]))
+        taken = [False] * len(text)
+        mentions: List[Tuple[int, str, List[int]]] = []
+        for start, alias in matches:
+            if any(taken[start:start + len(alias)]):
+                continue
+            taken[start:start + len(alias)] = [True] * len(alias)
+            mentions.append((start, alias, self.alias_nodes[alias]))
+        return [(alias, nodes) for _, alias, nodes in sorted(mentions)]
+
+    def contraindicated(self, nodes: List[int]) -> Dict[int, int]:
+        """노드(약품/성분)들과 병용금기인 약품 → 사유"""
+        result: Dict[int, int] = {}
+        for product in self.products_of(nodes):
+            for other, reason in self._edges(product, CONTRA):
+                result.setdefault(other, reason)
+        return result
+
+    def check_pair(self, a: List[int], b: List[int]) -> List[Tuple[int, int, int]]:
+        """두 언급(노드 목록) 사이의 병용금기 (약품, 상대 약품, 사유) 목록"""
+        b_products = set(self.products_of(b))
+        hits = []
+        for product in self.products_of(a):
+            for other, reason in self._edges(product, CONTRA):
+                if other in b_products:
+                    hits.append((product, other, reason))
+        return hits
+
+
+_ddi_graph: Optional[DDIGraph] = None
+
+
+def get_ddi_graph(path: str = DDI_GRAPH_PATH) -> Optional[DDIGraph]:
+    """그래프 파일이 있으면 프로세스당 한 번 로드, 없으면 None"""
+    global _ddi_graph
+    if _ddi_graph is None and os.path.exists(path):
+        _ddi_graph = DDIGraph.load(path)
+    return _ddi_graph
+
+
+def interaction_facts(query: str, graph: Optional[DDIGraph] = None) -> Optional[Document]:
+    """질문에 해당하는 DUR 병용금기 사실을 RAG 컨텍스트용 Document로 반환, 해당 없으면 None
+
+    - 약품/성분 언급이 2개 이상 확인되고 상호작용 키워드가 있으면: 쌍별 병용금기 여부
+    - 1개뿐이면: 병용금기 목록을 직접 묻는 표현("같이 먹으면 안 되는 약")일 때만 병용금기 약품 목록
+    답변을 대신하지 않으므로 "목록에 없음"도 설명서 내용과 함께 LLM이 판단하도록 넘김
+    """
+    graph = graph or get_ddi_graph()
+    if graph is None:
+        return None
+    mentions = graph.find_mentions(query)
+    compact = "".join(query.split())
+    names = graph.names
+    label = lambda nodes: names[nodes[0]]
+
+    if len(mentions) >= 2:
+        if not any(keyword in query for keyword in INTERACTION_KEYWORDS):
+            return None
+        lines, related = [], []
+        for i, (_, a) in enumerate(mentions):
+            for _, b in mentions[i + 1:]:
+                related.extend([label(a), label(b)])
+                hits = graph.check_pair(a, b)
+                if not hits:
+                    lines.append(f"- {label(a)} ↔ {label(b)}: DUR 병용금기 목록에 없음 "
+                                 "(안전하다는 뜻은 아님 — 다른 상호작용/주의사항은 약품 정보 참고)")
+                    continue
+                product, other, reason = hits[0]
+                lines.append(f"- {names[product]} ↔ {names[other]}: 병용금기 — {graph.reasons[reason] or '사유 미기재'}")
+    elif len(mentions) == 1 and any(phrase in compact for phrase in CONTRA_LIST_PHRASES):
+        nodes = mentions[0][1]
+        neighbours = graph.contraindicated(nodes)
+        if not neighbours:
+            return None
+        related = [label(nodes)]
+        lines = [f"- {label(nodes)} ↔ {names[other]}: 병용금기 — {graph.reasons[reason] or '사유 미기재'}"
+                 for other, reason in list(neighbours.items())[:MAX_NEIGHBOURS]]
+        if len(neighbours) > MAX_NEIGHBOURS:
+            lines.append(f"- ... 외 {len(neighbours) - MAX_NEIGHBOURS}개")
+    else:
+        return None
+
+    content = f"[{DUR_SOURCE_NAME} 데이터]\n" + "\n".join(lines)
+    return Document(page_content=content, metadata={
+        "itemName": DUR_SOURCE_NAME, "source": "ddi_graph", "related_items": list(dict.fromkeys(related)),
+    })
+
+
+class DDIContextRetriever(BaseRetriever):
+    """기존 리트리버 결과 앞에 질문 관련 DUR 병용금기 사실 문서를 덧붙이는 래퍼"""
+
+    base: BaseRetriever
+    graph: Any
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs = self.base.invoke(query, config={"callbacks": run_manager.get_child()})
+        facts = interaction_facts(query, self.graph)
+        return [facts] + docs if facts else docs
+
+
+if __name__ == "__main__":
+    print("🕸️ 병용금기 그래프 생성 중...")
+    try:
+        graph = DDIGraph.build(load_taboo_pairs())
+        graph.save()
+        print(f"💾 저장 완료: {DDI_GRAPH_PATH} (노드 {len(graph.names)}개, 간선 {len(graph.indices)}개, 사유 {len(graph.reasons)}개)")
+    except Exception as e:
+        print(f"❌ 오류 발생: {e}")
+        sys.exit(1)
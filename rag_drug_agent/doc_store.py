@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from chunk_store import CHUNKS_PATH, read_chunk_columns
+# 목적: chunk 본문을 벡터 메타데이터 대신 로컬 SQLite 키-값 저장소(벡터 ID → 본문)에 보관
+# - Pinecone 벡터에는 ID와 필터용 작은 필드(itemSeq, itemName, section)만 저장 → upsert/query 응답 크기 감소,
+#   레코드당 메타데이터 용량 제한(40KB)과도 무관
+# - 검색 결과의 ID로 본문을 한 번의 SELECT로 가져옴
+# - 예전에 본문(text)까지 메타데이터로 올린 벡터도 그대로 읽을 수 있도록 메타데이터 본문을 대체값으로 사용
+
+DOC_STORE_PATH = os.getenv("DOC_STORE_PATH", "data/doc_store.sqlite")
+SQLITE_MAX_VARIABLES = 900  # IN (...) 한 번에 넣을 최대 ID 수
+
+
+class DocStore:
+    """벡터 ID → chunk 본문 SQLite 저장소 (스레드 간 공유, 조회는 잠금으로 직렬화)"""
+
+    def __init__(self, path: str = DOC_STORE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, text TEXT NOT NULL) WITHOUT ROWID")
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def put_many(self, items: Iterable[Tuple[str, str]]):
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO docs (id, text) VALUES (?, ?)", items)
+
+    def delete_many(self, ids: List[str]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM docs WHERE id = ?", [(doc_id,) for doc_id in ids])
+
+    def get_many(self, ids: List[str]) -> Dict[str, str]:
+        texts: Dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(ids), SQLITE_MAX_VARIABLES):
+                chunk = ids[i:i + SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
+                texts.update(self._conn.execute(f"SELECT id, text FROM docs WHERE id IN ({placeholders})", chunk))
+        return texts
+
+    def sync(self, chunks_path: str = CHUNKS_PATH) -> Tuple[int, int]:
+        """chunk Parquet과 같아지도록 새 ID는 추가, 사라진 ID는 삭제 → (추가 수, 삭제 수)
+
+        벡터 ID는 본문 해시를 포함하므로 같은 ID의 본문은 바뀌지 않음
+        """
+        with self._lock:
+            stored = {row[0] for row in self._conn.execute("SELECT id FROM docs")}
+        df = read_chunk_columns(chunks_path, columns=["id", "chunk"]).drop_duplicates("id")
+        new_rows = df[~df["id"].isin(stored)]
+        removed = list(stored - set(df["id"]))
+        self.put_many(new_rows.itertuples(index=False, name=None))
+        self.delete_many(removed)
+        return len(new_rows), len(removed)
+
+
+_doc_store: Optional[DocStore] = None
+
+
+def get_doc_store(path: str = DOC_STORE_PATH) -> Optional[DocStore]:
+    """저장소 파일이 있으면 프로세스당 한 번 연결, 없으면 None (메타데이터 본문만 사용)"""
+    global _doc_store
+    if _doc_store is None and os.path.exists(path):
+        _doc_store = DocStore(path)
+    return _doc_store
+
+
+def resolve_texts(matches: List[Dict[str, Any]], text_key: str = "text") -> List[str]:
+    """검색 결과(matches)의 본문 목록 — 로컬 저장소 우선, 없으면 메타데이터 text_key
+
+    matches의 metadata에서 text_key는 제거됨. 본문을 찾지 못한 결과는 ""(호출 측에서 제외)이고 경고를 출력,
+    모든 결과의 본문이 없으면 빈 컨텍스트로 답하지 않도록 LookupError
+    """
+    store = get_doc_store()
+    stored = store.get_many([match["id"] for match in matches]) if store is not None else {}
+    texts = []
+    for match in matches:
+        legacy_text = (match.get("metadata") or {}).pop(text_key, "")
+        texts.append(stored.get(match["id"]) or legacy_text)
+
+    missing = [match["id"] for match, text in zip(matches, texts) if not text]
+    if missing:
+        where = DOC_STORE_PATH if store is None else store.path
+        hint = f"문서 저장소({where})가 없거나 인덱스와 맞지 않습니다. 3_embed_to_pinecone.py를 다시 실행하세요."
+        if len(missing) == len(matches):
+            raise LookupError(f"❌ 검색 결과 {len(missing)}건 모두 본문이 없습니다 — {hint}")
+        print(f"⚠️ 본문이 없는 검색 결과 {len(missing)}건 제외 ({', '.join(missing[:3])}) — {hint}")
+    return texts
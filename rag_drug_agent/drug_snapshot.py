@@ -0,0 +1,82 @@
+import os
+import json
+from typing import Dict, List, Set
+
+import pandas as pd
+# 목적: 1_ → 2_ → 3_ 증분 파이프라인
+# - 직전 수집 스냅샷(itemSeq, updateDe, 행 해시)과 새 수집 결과를 비교해 추가/변경/삭제 약품 계산
+# - 변경된 itemSeq는 "대기 목록"에 누적 → 2_가 해당 약품의 chunk만 다시 만들고 목록을 비움
+# - 3_는 매니페스트(벡터 ID = itemSeq + chunk 해시) 비교로 바뀐 chunk만 임베딩/업서트/삭제
+
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "incremental")  # incremental | full
+SNAPSHOT_PATH = "data/drug_snapshot.parquet"
+PENDING_PATH = "data/drug_pending_changes.json"
+
+
+def is_incremental() -> bool:
+    return PIPELINE_MODE == "incremental"
+
+
+def row_hashes(df: pd.DataFrame) -> pd.Series:
+    """itemSeq를 제외한 모든 필드 기준 행 해시 (updateDe가 그대로여도 내용이 바뀌면 감지)"""
+    columns = sorted(c for c in df.columns if c != "itemSeq")
+    values = df[columns].fillna("").astype(str)
+    return pd.util.hash_pandas_object(values, index=False).map("{:016x}".format)
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH) -> pd.DataFrame:
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["itemSeq", "updateDe", "rowHash"])
+    return pd.read_parquet(path)
+
+
+def save_snapshot(df: pd.DataFrame, path: str = SNAPSHOT_PATH):
+    snapshot = pd.DataFrame({
+        "itemSeq": df["itemSeq"].astype(str),
+        "updateDe": df["updateDe"].fillna("").astype(str),
+        "rowHash": row_hashes(df).values,
+    })
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    snapshot.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def detect_changes(df: pd.DataFrame, snapshot: pd.DataFrame) -> Dict[str, List[str]]:
+    """새 수집 결과와 스냅샷을 itemSeq로 맞대어 추가/변경/삭제 itemSeq 목록 계산"""
+    current = pd.DataFrame({
+        "itemSeq": df["itemSeq"].astype(str),
+        "updateDe": df["updateDe"].fillna("").astype(str),
+        "rowHash": row_hashes(df).values,
+    })
+    merged = current.merge(snapshot, on="itemSeq", how="outer", suffixes=("", "_prev"), indicator=True)
+    both = merged[merged["_merge"] == "both"]
+    changed = (both["updateDe"] != both["updateDe_prev"]) | (both["rowHash"] != both["rowHash_prev"])
+    return {
+        "inserted": merged.loc[merged["_merge"] == "left_only", "itemSeq"].tolist(),
+        "updated": both.loc[changed, "itemSeq"].tolist(),
+        "deleted": merged.loc[merged["_merge"] == "right_only", "itemSeq"].tolist(),
+    }
+
+
+def load_pending(path: str = PENDING_PATH) -> Set[str]:
+    """아직 2_에서 chunk에 반영되지 않은 itemSeq 집합"""
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return set(json.load(f))
+
+
+def add_pending(item_seqs: List[str], path: str = PENDING_PATH):
+    """변경 itemSeq를 대기 목록에 누적 (1_을 여러 번 실행해도 2_ 전까지 변경분이 사라지지 않음)"""
+    pending = sorted(load_pending(path) | set(item_seqs))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(pending, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def clear_pending(path: str = PENDING_PATH):
+    if os.path.exists(path):
+        os.remove(path)
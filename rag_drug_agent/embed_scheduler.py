@@ -0,0 +1,248 @@
+import os
+import sys
+import time
+import random
+import threading
+import concurrent.futures
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+
+from context_budget import count_tokens
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.public_data import TokenBucket
+# 목적: 3_ 업로드용 임베딩 스케줄러
+# - 배치를 고정 개수 대신 토큰 수로 채움 (요청당 토큰/입력 수 한도까지, 캐시에 있는 chunk는 0토큰)
+# - 분당 토큰(TPM) / 분당 요청(RPM) 예산을 토큰 버킷으로 지킴
+# - 429를 받으면 동시 요청 수를 절반으로 줄이고, 성공이 이어지면 1씩 다시 늘림 (AIMD)
+# - 실패한 배치는 백오프 후 스스로 재시도, 끝내 실패한 배치만 모아 보고 (전체 실행은 중단하지 않음)
+#   입력 오류(400 등)는 배치를 반씩 나눠 다시 보내 문제 chunk만 실패 처리
+# - 임베딩과 벡터 upsert를 별도 스레드 풀로 분리 → 배치 N 저장 중에 배치 N+1 임베딩
+
+EMBED_MAX_BATCH_TOKENS = int(os.getenv("EMBED_MAX_BATCH_TOKENS", "200000"))  # OpenAI 요청당 한도 300K 토큰
+EMBED_MAX_BATCH_ITEMS = int(os.getenv("EMBED_MAX_BATCH_ITEMS", "2048"))  # OpenAI 요청당 최대 입력 수
+EMBED_TPM = int(os.getenv("EMBED_TPM", "1000000"))
+EMBED_RPM = int(os.getenv("EMBED_RPM", "3000"))
+EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", "8"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+UPSERT_WORKERS = 2
+UPSERT_BATCH_SIZE = 64  # upsert 요청당 벡터 수 (Pinecone 요청 크기 2MB 한도)
+MAX_PENDING_UPSERTS = 4  # 저장을 기다리는 임베딩 배치 상한 (메모리 상한)
+BACKOFF_MAX = 60
+RATE_LIMIT_COOLDOWN = 5  # 연속된 429로 동시 요청 수를 한 번에 여러 번 줄이지 않도록
+
+
+def status_code(error: Exception) -> Optional[int]:
+    code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return status_code(error) == 429 or type(error).__name__ == "RateLimitError" or "429" in str(error)
+
+
+def is_retryable(error: Exception) -> bool:
+    """429, 5xx, 연결/시간 초과는 재시도 (입력 오류 같은 4xx는 재시도해도 같으므로 즉시 실패)"""
+    code = status_code(error)
+    name = type(error).__name__
+    return (
+        is_rate_limited(error)
+        or (code is not None and code >= 500)
+        or isinstance(error, (ConnectionError, TimeoutError))
+        or "Timeout" in name or "Connection" in name
+    )
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def token_cost(embeddings: Any = None) -> Callable[[List[str]], List[int]]:
+    """텍스트별 API 토큰 비용 함수 (embeddings.is_cached가 있으면 캐시 적중 텍스트는 0)"""
+    def cost(texts: List[str]) -> List[int]:
+        cached = embeddings.is_cached(texts) if hasattr(embeddings, "is_cached") else [False] * len(texts)
+        return [0 if hit else count_tokens(text) for text, hit in zip(texts, cached)]
+    return cost
+
+
+def pack_batches(doc_batches: Iterable[List[Document]], cost: Callable[[List[str]], List[int]],
+                 max_tokens: int = EMBED_MAX_BATCH_TOKENS,
+                 max_items: int = EMBED_MAX_BATCH_ITEMS) -> Iterator[Tuple[List[Document], int]]:
+    """Document 스트림을 (배치, API 토큰 수)로 묶음 — 토큰/입력 수 한도를 넘기 직전에 자름"""
+    batch: List[Document] = []
+    tokens = 0
+    for docs in doc_batches:
+        for doc, doc_tokens in zip(docs, cost([doc.page_content for doc in docs])):
+            if batch and (tokens + doc_tokens > max_tokens or len(batch) >= max_items):
+                yield batch, tokens
+                batch, tokens = [], 0
+            batch.append(doc)
+            tokens += doc_tokens
+    if batch:
+        yield batch, tokens
+
+
+class AdaptiveConcurrency:
+    """429에는 동시 요청 수를 절반으로, 연속 성공에는 1씩 늘리는 AIMD 제어"""
+
+    def __init__(self, maximum: int, minimum: int = 1):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = maximum
+        self.successes = 0
+        self.last_cut = 0.0
+        self.lock = threading.Lock()
+
+    def on_success(self):
+        with self.lock:
+            self.successes += 1
+            if self.successes >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self.successes = 0
+
+    def on_rate_limit(self):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_cut < RATE_LIMIT_COOLDOWN:
+                return
+            self.last_cut = now
+            self.successes = 0
+            self.limit = max(self.minimum, self.limit // 2)
+            print(f"🐢 429 감지 → 동시 임베딩 요청 {self.limit}개로 축소")
+
+
+class EmbeddingScheduler:
+    """토큰 기반 배치 + TPM/RPM 예산 + 적응형 동시성 + 재시도 + 임베딩/upsert 파이프라이닝
+
+    Args:
+        embed_fn: Document 배치 → upsert 레코드 목록 (임베딩 API 호출)
+        upsert_fn: 레코드 목록 → 벡터 DB 저장
+        cost: 텍스트별 API 토큰 비용 (token_cost 참고)
+    """
+
+    def __init__(self, embed_fn: Callable[[List[Document]], List[dict]], upsert_fn: Callable[[List[dict]], Any],
+                 cost: Callable[[List[str]], List[int]], max_workers: int = EMBED_MAX_WORKERS,
+                 tpm: int = EMBED_TPM, rpm: int = EMBED_RPM, max_retries: int = EMBED_MAX_RETRIES,
+                 max_batch_tokens: int = EMBED_MAX_BATCH_TOKENS, max_batch_items: int = EMBED_MAX_BATCH_ITEMS):
+        self.embed_fn = embed_fn
+        self.upsert_fn = upsert_fn
+        self.cost = cost
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.concurrency = AdaptiveConcurrency(max_workers)
+        self.token_budget = TokenBucket(tpm / 60, capacity=tpm)
+        self.request_budget = TokenBucket(rpm / 60, capacity=rpm)
+        self.failed: List[Tuple[List[Document], str]] = []
+        self.stats = {"requests": 0, "tokens": 0, "retries": 0, "rate_limited": 0}
+        self._stats_lock = threading.Lock()
+        self._started = time.monotonic()
+
+    def _count(self, **values: int):
+        with self._stats_lock:
+            for name, value in values.items():
+                self.stats[name] += value
+
+    def _with_retry(self, fn: Callable[[], Any], on_attempt: Callable[[], None] = lambda: None) -> Any:
+        for attempt in range(self.max_retries + 1):
+            on_attempt()
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                if is_rate_limited(e):
+                    self._count(rate_limited=1)
+                    self.concurrency.on_rate_limit()
+                self._count(retries=1)
+                time.sleep(retry_after(e) or min(BACKOFF_MAX, 2 ** attempt) + random.random())
+
+    def _embed(self, batch: List[Document], tokens: int) -> Tuple[List[Document], List[dict]]:
+        """(임베딩에 성공한 Document, upsert 레코드)"""
+        def reserve():
+            if tokens:  # 전부 캐시에 있으면 API 요청이 없으므로 예산도 쓰지 않음
+                self.request_budget.acquire()
+                self.token_budget.acquire(tokens)
+                self._count(requests=1, tokens=tokens)
+
+        try:
+            records = self._with_retry(lambda: self.embed_fn(batch), on_attempt=reserve)
+        except Exception as e:
+            if len(batch) == 1 or is_retryable(e):
+                raise
+            done, records = [], []
+            half = len(batch) // 2
+            for part in (batch[:half], batch[half:]):
+                try:
+                    part_done, part_records = self._embed(part, sum(self.cost([doc.page_content for doc in part])))
+                except Exception as part_error:
+                    self.failed.append((part, f"임베딩 실패: {part_error}"))
+                    continue
+                done += part_done
+                records += part_records
+            return done, records
+        self.concurrency.on_success()
+        return batch, records
+
+    def _upsert(self, records: List[dict]):
+        for start in range(0, len(records), UPSERT_BATCH_SIZE):
+            part = records[start:start + UPSERT_BATCH_SIZE]
+            self._with_retry(lambda: self.upsert_fn(part))
+
+    def run(self, doc_batches: Iterable[List[Document]]) -> Iterator[List[Document]]:
+        """저장까지 끝난 Document 배치를 완료 순서대로 반환 (끝내 실패한 배치는 self.failed)"""
+        batches = pack_batches(doc_batches, self.cost, self.max_batch_tokens, self.max_batch_items)
+        embedding = {}  # future -> 배치
+        upserting = {}
+        exhausted = False
+        embed_pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        upsert_pool = concurrent.futures.ThreadPoolExecutor(max_workers=UPSERT_WORKERS)
+        try:
+            while True:
+                # 현재 허용된 동시 요청 수만큼 임베딩 시작 (저장 대기 배치가 많으면 잠시 멈춤)
+                while not exhausted and len(embedding) < self.concurrency.limit and len(upserting) < MAX_PENDING_UPSERTS:
+                    packed = next(batches, None)
+                    if packed is None:
+                        exhausted = True
+                        break
+                    embedding[embed_pool.submit(self._embed, *packed)] = packed[0]
+                if not embedding and not upserting:
+                    break
+                done, _ = concurrent.futures.wait(
+                    list(embedding) + list(upserting), return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    if future in embedding:
+                        batch = embedding.pop(future)
+                        try:
+                            done_docs, records = future.result()
+                        except Exception as e:
+                            self.failed.append((batch, f"임베딩 실패: {e}"))
+                            continue
+                        if done_docs:
+                            upserting[upsert_pool.submit(self._upsert, records)] = done_docs
+                    else:
+                        batch = upserting.pop(future)
+                        try:
+                            future.result()
+                        except Exception as e:
+                            self.failed.append((batch, f"저장 실패: {e}"))
+                            continue
+                        yield batch
+        finally:
+            embed_pool.shutdown(wait=True)
+            upsert_pool.shutdown(wait=True)
+
+    def report(self):
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        print(
+            f"📈 임베딩 요청 {self.stats['requests']}회 · {self.stats['tokens']:,}토큰 "
+            f"({self.stats['tokens'] / elapsed * 60:,.0f} TPM) · 재시도 {self.stats['retries']}회 "
+            f"(429 {self.stats['rate_limited']}회) · 최종 동시 요청 {self.concurrency.limit}개 · 실패 배치 {len(self.failed)}개"
+        )
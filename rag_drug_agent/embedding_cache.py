@@ -0,0 +1,244 @@
+import os
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+# 목적: 색인(3_)과 질의(4_~8_) 경로가 함께 쓰는 디스크 임베딩 캐시
+# - SQLite: (model, dimensions, text_hash) -> 벡터 행 번호
+# - memmap float32 배열: 실제 벡터 값 (차원별 파일)
+# - 프로세스 내 LRU: 자주 쓰는 질문은 디스크도 거치지 않음
+# - 색인 스크립트와 여러 앱 프로세스가 함께 쓰므로 행 할당은 SQLite 쓰기 트랜잭션(BEGIN IMMEDIATE) 안에서 수행
+# - EMBEDDING_DIMENSIONS로 출력 차원을 줄이면 OpenAI 단축 임베딩 사용 (캐시 키에 차원 포함)
+
+CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "data/embedding_cache")
+LRU_SIZE = int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", "4096"))
+GROW_ROWS = 1024  # memmap 파일 확장 단위 (행)
+MODEL_DIMENSIONS = {"text-embedding-3-large": 3072, "text-embedding-3-small": 1536}
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0"))  # 0이면 모델 기본 차원
+
+
+class VectorFile:
+    """고정 차원 벡터(기본 float32)를 행 단위로 저장하는 memmap 파일"""
+
+    def __init__(self, path: str, dim: int, dtype=np.float32):
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._mm = None
+        self._capacity = 0
+        self._refresh()
+
+    def _file_rows(self) -> int:
+        return os.path.getsize(self.path) // (self.dtype.itemsize * self.dim) if os.path.exists(self.path) else 0
+
+    def _refresh(self):
+        """다른 프로세스가 파일을 늘렸으면 그 크기로 다시 매핑"""
+        rows = self._file_rows()
+        if rows > self._capacity:
+            self._capacity = rows
+            self._remap()
+
+    def _remap(self):
+        if self._mm is not None:
+            self._mm.flush()
+            del self._mm
+        self._mm = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=(self._capacity, self.dim))
+
+    def _ensure_capacity(self, rows: int):
+        if rows <= self._capacity:
+            return
+        self._refresh()  # 파일을 줄이지 않도록 실제 크기 기준으로 확장
+        if rows <= self._capacity:
+            return
+        new_capacity = max(rows, self._capacity + GROW_ROWS)
+        with open(self.path, "ab") as f:
+            f.truncate(new_capacity * self.dim * self.dtype.itemsize)
+        self._capacity = new_capacity
+        self._remap()
+
+    def read(self, row: int) -> np.ndarray:
+        if row >= self._capacity:  # 다른 프로세스가 추가한 행
+            self._refresh()
+        return np.array(self._mm[row])
+
+    def view(self, rows: int) -> np.ndarray:
+        """앞쪽 rows개 행을 복사 없이 memmap 그대로 반환"""
+        if self._mm is None:
+            return np.empty((0, self.dim), dtype=self.dtype)
+        return self._mm[:rows]
+
+    def write(self, start_row: int, vectors: np.ndarray):
+        self._ensure_capacity(start_row + len(vectors))
+        self._mm[start_row:start_row + len(vectors)] = vectors
+        self._mm.flush()
+
+    def write_rows(self, rows: List[int], vectors: np.ndarray):
+        """흩어진 행 번호에 한 번에 기록 (기존 행 덮어쓰기 포함)"""
+        self._ensure_capacity(max(rows) + 1)
+        self._mm[rows] = vectors
+        self._mm.flush()
+
+
+class EmbeddingCache:
+    """(model, dimensions, text_hash) 키로 임베딩을 저장하는 디스크 캐시"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, lru_size: int = LRU_SIZE):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.lru_size = lru_size
+        self._lru: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._files = {}
+        self._lock = threading.Lock()
+        # 3_의 ThreadPoolExecutor에서 함께 쓰므로 스레드 간 커넥션 공유 허용 (접근은 _lock으로 직렬화)
+        # isolation_level=None: 트랜잭션을 직접 시작 (put_many의 BEGIN IMMEDIATE로 프로세스 간 행 할당 직렬화)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "embeddings.sqlite"), check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                text_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (model, dimensions, text_hash)
+            )"""
+        )
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _vector_file(self, dim: int) -> VectorFile:
+        if dim not in self._files:
+            self._files[dim] = VectorFile(os.path.join(self.cache_dir, f"vectors_{dim}.f32"), dim)
+        return self._files[dim]
+
+    def _lru_put(self, key: tuple, vector: np.ndarray):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, model: str, dimensions: int, hashes: List[str]) -> List[Optional[np.ndarray]]:
+        results: List[Optional[np.ndarray]] = [None] * len(hashes)
+        with self._lock:
+            missing = []
+            for i, h in enumerate(hashes):
+                key = (model, dimensions, h)
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    results[i] = self._lru[key]
+                else:
+                    missing.append(i)
+            # SQLite 변수 개수 제한을 피하기 위해 나눠서 조회
+            for start in range(0, len(missing), 500):
+                part = missing[start:start + 500]
+                part_hashes = [hashes[i] for i in part]
+                placeholders = ",".join("?" * len(part_hashes))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, dim, row FROM embeddings "
+                    f"WHERE model = ? AND dimensions = ? AND text_hash IN ({placeholders})",
+                    [model, dimensions, *part_hashes],
+                ).fetchall()
+                found = {h: (dim, row) for h, dim, row in rows}
+                for i in part:
+                    if hashes[i] in found:
+                        dim, row = found[hashes[i]]
+                        vector = self._vector_file(dim).read(row)
+                        self._lru_put((model, dimensions, hashes[i]), vector)
+                        results[i] = vector
+        return results
+
+    def put_many(self, model: str, dimensions: int, hashes: List[str], vectors: List[List[float]]):
+        if not vectors:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        dim = array.shape[1]
+        with self._lock:
+            # 쓰기 잠금을 먼저 잡고 행 번호 할당 → 벡터 기록 → 행 등록까지 한 트랜잭션으로
+            # (다른 프로세스가 같은 행을 받아 덮어쓰지 않고, 행이 보일 때는 벡터도 이미 기록되어 있음)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                (next_row,) = self._conn.execute(
+                    "SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings WHERE dim = ?", (dim,)
+                ).fetchone()
+                self._vector_file(dim).write(next_row, array)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, dimensions, text_hash, dim, row) VALUES (?, ?, ?, ?, ?)",
+                    [(model, dimensions, h, dim, next_row + i) for i, h in enumerate(hashes)],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            for h, vector in zip(hashes, array):
+                self._lru_put((model, dimensions, h), vector)
+
+
+class CachedEmbeddings(Embeddings):
+    """캐시에 없는 텍스트만 실제 임베딩 모델로 보내는 Embeddings 래퍼"""
+
+    def __init__(self, embeddings: OpenAIEmbeddings, cache: Optional[EmbeddingCache] = None):
+        self.embeddings = embeddings
+        self.cache = cache or get_embedding_cache()
+        self.model = embeddings.model
+        self.dimensions = getattr(embeddings, "dimensions", None) or 0
+
+    def is_cached(self, texts: List[str]) -> List[bool]:
+        """텍스트별 캐시 적중 여부 (적중한 텍스트는 API로 보내지 않음)"""
+        hashes = [EmbeddingCache.text_hash(t) for t in texts]
+        return [vector is not None for vector in self.cache.get_many(self.model, self.dimensions, hashes)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [EmbeddingCache.text_hash(t) for t in texts]
+        cached = self.cache.get_many(self.model, self.dimensions, hashes)
+
+        # 같은 배치 안의 중복 텍스트는 한 번만 임베딩
+        missing = {}
+        for i, (h, vector) in enumerate(zip(hashes, cached)):
+            if vector is None and h not in missing:
+                missing[h] = texts[i]
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            self.cache.put_many(self.model, self.dimensions, list(missing.keys()), new_vectors)
+            fresh = dict(zip(missing.keys(), new_vectors))
+            cached = [fresh[h] if vector is None else vector for h, vector in zip(hashes, cached)]
+
+        return [np.asarray(vector, dtype=np.float32).tolist() for vector in cached]
+
+    def embed_query(self, text: str) -> List[float]:
+        h = EmbeddingCache.text_hash(text)
+        (vector,) = self.cache.get_many(self.model, self.dimensions, [h])
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many(self.model, self.dimensions, [h], [vector])
+        return np.asarray(vector, dtype=np.float32).tolist()
+
+
+_default_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """프로세스 전체에서 하나의 캐시 인스턴스를 공유"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = EmbeddingCache()
+    return _default_cache
+
+
+def embedding_dimension(model: str = "text-embedding-3-large") -> int:
+    """색인/인덱스 생성에 쓸 벡터 차원 (EMBEDDING_DIMENSIONS 또는 모델 기본 차원)"""
+    return EMBEDDING_DIMENSIONS or MODEL_DIMENSIONS[model]
+
+
+def get_embeddings(model: str = "text-embedding-3-large", dimensions: int = EMBEDDING_DIMENSIONS,
+                   **options: Any) -> CachedEmbeddings:
+    """스크립트들이 공통으로 쓰는 캐시된 임베딩 모델 생성 (dimensions를 주면 단축 임베딩, options는 OpenAIEmbeddings로 전달)"""
+    kwargs = {"dimensions": dimensions} if dimensions else {}
+    return CachedEmbeddings(OpenAIEmbeddings(model=model, **kwargs, **options))
@@ -0,0 +1,122 @@
+import os
+import pickle
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from vector_backend import open_index
+from sections import section_filter, use_section_chunks
+from context_budget import CONTEXT_TOKEN_BUDGET, CONTEXT_OVERFETCH, ContextBudgetRetriever
+from name_index import NameFastPathRetriever, get_name_index
+from doc_store import resolve_texts
+from ddi_graph import DDIContextRetriever, get_ddi_graph
+# 목적: dense(OpenAI) + sparse(BM25, sparse_encoder.pkl) 하이브리드 검색
+# - Pinecone dotproduct 인덱스의 sparse-dense 규칙을 따름: dense * alpha, sparse * (1 - alpha)
+# - alpha=1.0 이면 순수 dense, alpha=0.0 이면 순수 BM25 (약품명 정확 매칭)
+
+SPARSE_ENCODER_PATH = os.getenv("SPARSE_ENCODER_PATH", "sparse_encoder.pkl")
+SEARCH_MODE = os.getenv("SEARCH_MODE", "dense")  # "dense" | "hybrid"
+HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", "0.5"))
+
+_sparse_encoder = None
+
+
+def load_sparse_encoder(path: str = SPARSE_ENCODER_PATH):
+    """학습된 BM25Encoder(Kiwi 토크나이저) 로드 (프로세스당 1회)"""
+    global _sparse_encoder
+    if _sparse_encoder is None:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ sparse 인코더 파일을 찾을 수 없습니다: {path}")
+        with open(path, "rb") as f:
+            _sparse_encoder = pickle.load(f)
+    return _sparse_encoder
+
+
+def hybrid_scale(dense: List[float], sparse: Dict[str, list], alpha: float) -> Tuple[List[float], Dict[str, list]]:
+    """dense/sparse 쿼리 벡터에 alpha 가중치 적용"""
+    if not 0 <= alpha <= 1:
+        raise ValueError("❌ alpha는 0과 1 사이여야 합니다.")
+    scaled_sparse = {
+        "indices": sparse["indices"],
+        "values": [v * (1 - alpha) for v in sparse["values"]],
+    }
+    return [v * alpha for v in dense], scaled_sparse
+
+
+def hybrid_query(index: Any, embeddings: Embeddings, query: str, top_k: int, namespace: str,
+                 alpha: float = HYBRID_ALPHA, filter: Optional[dict] = None) -> List[Dict[str, Any]]:
+    """하이브리드 쿼리를 실행하고 Pinecone 형식의 matches 반환 (alpha=1.0이면 sparse 인코딩 생략)"""
+    dense = embeddings.embed_query(query)
+    kwargs = {}
+    if alpha < 1:
+        sparse = load_sparse_encoder().encode_queries(query)
+        dense, sparse = hybrid_scale(dense, sparse, alpha)
+        if sparse["indices"]:
+            kwargs["sparse_vector"] = sparse
+    if filter:
+        kwargs["filter"] = filter
+    result = index.query(vector=dense, top_k=top_k, namespace=namespace, include_metadata=True, **kwargs)
+    return result["matches"]
+
+
+class HybridRetriever(BaseRetriever):
+    """RetrievalQA 체인에서 쓰는 dense + BM25 하이브리드 리트리버
+
+    route_sections=True 이면 질문의 섹션 키워드(부작용, 복용 등)로 section 메타데이터를 필터링
+    """
+
+    index: Any
+    embeddings: Embeddings
+    namespace: str
+    top_k: int = 3
+    alpha: float = HYBRID_ALPHA
+    text_key: str = "text"
+    filter: Optional[dict] = None
+    route_sections: bool = False
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        filter = section_filter(query, self.filter) if self.route_sections else self.filter
+        matches = hybrid_query(self.index, self.embeddings, query, self.top_k, self.namespace,
+                               alpha=self.alpha, filter=filter)
+        texts = resolve_texts(matches, self.text_key)  # 본문은 로컬 문서 저장소에서 ID로 조회
+        return [
+            Document(id=match["id"], page_content=text, metadata={**match["metadata"], "score": match["score"]})
+            for match, text in zip(matches, texts) if text
+        ]
+
+
+def get_retriever(index_name: str, embedding: Embeddings, namespace: str, k: int = 3,
+                  search_mode: str = SEARCH_MODE, alpha: float = HYBRID_ALPHA,
+                  route_sections: Optional[bool] = None,
+                  token_budget: int = CONTEXT_TOKEN_BUDGET) -> BaseRetriever:
+    """SEARCH_MODE에 따라 dense(alpha=1.0) 또는 하이브리드 리트리버 반환 (5_~8_ 앱 공용)
+
+    섹션 단위 chunk(CHUNK_MODE=section)로 색인했다면 기본으로 질문별 섹션 필터를 적용하고,
+    token_budget > 0 이면 k × CONTEXT_OVERFETCH건을 검색해 중복 제거 후 최대 k건을 토큰 예산 안에서 반환.
+    질문에 약품명이 있으면(NAME_FASTPATH) 전체 이름의 확실한 일치는 이름 인덱스 chunk만 반환, 애매한 일치는 벡터 검색 결과와 순위 결합.
+    병용금기 그래프(data/ddi_graph.npz)가 있으면 관련 DUR 사실을 결과 맨 앞에 문서로 덧붙임
+    """
+    if route_sections is None:
+        route_sections = use_section_chunks()
+    fetch_k = k * CONTEXT_OVERFETCH if token_budget > 0 else k
+    # 벡터 메타데이터에 본문이 없으므로 dense 모드도 LangChain 벡터스토어 대신 원시 query + 문서 저장소 사용
+    retriever = HybridRetriever(
+        index=open_index(index_name),
+        embeddings=embedding,
+        namespace=namespace,
+        top_k=fetch_k,
+        alpha=alpha if search_mode == "hybrid" else 1.0,  # dense 모드는 alpha=1.0 (sparse 미사용)
+        route_sections=route_sections,
+    )
+    name_index = get_name_index()
+    if name_index is not None:
+        retriever = NameFastPathRetriever(name_index=name_index, fallback=retriever, k=fetch_k, route_sections=route_sections)
+    if token_budget > 0:
+        retriever = ContextBudgetRetriever(base=retriever, budget=token_budget, max_docs=k)
+    ddi_graph = get_ddi_graph()
+    if ddi_graph is not None:
+        retriever = DDIContextRetriever(base=retriever, graph=ddi_graph)
+    return retriever
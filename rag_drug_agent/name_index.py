@@ -0,0 +1,260 @@
+import os
+import re
+import unicodedata
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from chunk_store import CHUNKS_PATH, read_chunk_columns
+from sections import detect_sections
+# 목적: 질문에 약품명이 그대로 등장하면 해당 chunk를 검색 결과에 확실히 포함
+# - chunk 데이터의 itemName(+ entpName)으로 Aho-Corasick 오토마톤을 만들어 질문을 한 번만 훑음
+# - 한글 정규화(NFKC, 공백/기호 제거) + 별칭(괄호 성분명, 용량, 제형 접미사 제거: "타이레놀정500밀리그람" → "타이레놀")
+# - 제형 등을 떼어 낸 짧은 별칭은 단어 시작에서만 인정 ("하루에" 속 "하루" 같은 우연한 일치 방지)
+# - 전체 이름이 약품 하나로 확실히 일치하면 임베딩/벡터 검색 없이 바로 반환
+# - 제형을 뗀 별칭이나 여러 약품에 걸친 일치는 기존 리트리버(임베딩 + Pinecone) 결과와 순위 결합(RRF)
+#   → "두통엔 뭐가 좋아?"처럼 약품명과 일반 단어가 겹쳐도 벡터 검색 결과가 사라지지 않음
+
+NAME_FASTPATH = os.getenv("NAME_FASTPATH", "1") == "1"
+MIN_ALIAS_LENGTH = 2
+MIN_STRIPPED_ALIAS_LENGTH = 3  # 용량/제형을 떼어 낸 별칭의 최소 길이 ("하루정" → "하루"는 사용하지 않음)
+RRF_K = 60  # 이름 일치 / 벡터 검색 순위 결합 상수
+MAX_ITEMS_PER_ALIAS = 20  # 이보다 많은 약품이 걸리는 별칭("비타민" 등)은 너무 모호해 사용하지 않음
+
+_DOSE_PATTERN = re.compile(r"\d+(\.\d+)?\s*(밀리그램|밀리그람|마이크로그램|밀리리터|그램|mg|mcg|ml|g|%)?\s*$", re.IGNORECASE)
+_FORM_SUFFIXES = ("서방정", "장용정", "츄어블정", "필름코팅정", "연질캡슐", "경질캡슐", "캡슐", "시럽", "내복액", "현탁액",
+                  "액", "과립", "산", "정", "크림", "연고", "겔", "패취", "패치")
+
+
+def normalize(text: str) -> str:
+    """NFKC + 소문자 + 한글/영문/숫자 외 문자 제거 (띄어쓰기·기호 차이 무시)"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return "".join(ch for ch in text if ch.isalnum())
+
+
+def name_aliases(item_name: str) -> List[str]:
+    """품목명에서 질문에 쓰일 만한 별칭 생성 (전체 이름, 괄호 제거, 용량/제형 제거)"""
+    without_paren = re.sub(r"\(.*?\)|\[.*?\]", "", item_name or "")
+    base = without_paren.strip()
+    changed = True
+    while changed:  # 끝의 용량("500밀리그람")과 제형("정", "서방정")을 번갈아 제거
+        stripped = _DOSE_PATTERN.sub("", base).strip()
+        changed = stripped != base and len(normalize(stripped)) >= MIN_ALIAS_LENGTH
+        if changed:
+            base = stripped
+        for suffix in _FORM_SUFFIXES:
+            if base.endswith(suffix) and len(normalize(base[:-len(suffix)])) >= MIN_ALIAS_LENGTH:
+                base = base[:-len(suffix)].strip()
+                changed = True
+    aliases = dict.fromkeys(normalize(name) for name in (item_name, without_paren))
+    stripped = normalize(base)
+    if stripped not in aliases and len(stripped) >= MIN_STRIPPED_ALIAS_LENGTH:
+        aliases[stripped] = None
+    return [alias for alias in aliases if len(alias) >= MIN_ALIAS_LENGTH]
+
+
+def full_name_aliases(item_name: str) -> List[str]:
+    """용량/제형을 떼지 않은 별칭 (전체 이름, 괄호 제거)"""
+    return [normalize(item_name), normalize(re.sub(r"\(.*?\)|\[.*?\]", "", item_name or ""))]
+
+
+def _word_starts(query: str) -> List[bool]:
+    """normalize(query)의 각 글자가 원문에서 단어 첫 글자인지 (앞 글자가 없거나 공백/기호)"""
+    text = unicodedata.normalize("NFKC", query or "").lower()
+    return [ch.isalnum() and (i == 0 or not text[i - 1].isalnum()) for i, ch in enumerate(text) if ch.isalnum()]
+
+
+class AhoCorasick:
+    """여러 패턴을 입력 길이에 비례하는 시간에 한 번에 찾는 오토마톤"""
+
+    def __init__(self, patterns: List[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[str]] = [[]]
+        for pattern in patterns:
+            state = 0
+            for ch in pattern:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.output[state].append(pattern)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def search(self, text: str) -> List[Tuple[int, str]]:
+        """(시작 위치, 패턴) 목록"""
+        matches = []
+        state = 0
+        for end, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for pattern in self.output[state]:
+                matches.append((end - len(pattern) + 1, pattern))
+        return matches
+
+
+class DrugNameIndex:
+    """약품명 별칭 → itemSeq → chunk 목록 인메모리 인덱스"""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.chunks: Dict[str, List[Dict[str, Any]]] = {}
+        self.names: Dict[str, str] = {}
+        self.companies: Dict[str, str] = {}
+        alias_items: Dict[str, List[str]] = {}
+        full_aliases = set()
+        for row in rows:
+            item_seq = row["itemSeq"]
+            if item_seq not in self.chunks:
+                self.chunks[item_seq] = []
+                self.names[item_seq] = row.get("itemName") or ""
+                self.companies[item_seq] = normalize(row.get("entpName") or "")
+                for alias in name_aliases(self.names[item_seq]):
+                    alias_items.setdefault(alias, []).append(item_seq)
+                full_aliases.update(full_name_aliases(self.names[item_seq]))
+            self.chunks[item_seq].append(row)
+
+        # 별칭이 품목명 전체와 같은 약품 → 이름이 짧은 약품 순으로 우선
+        self.alias_items = {
+            alias: sorted(items, key=lambda seq: (normalize(self.names[seq]) != alias, len(self.names[seq])))
+            for alias, items in alias_items.items() if len(items) <= MAX_ITEMS_PER_ALIAS
+        }
+        # 어떤 약품의 전체 이름도 아닌 별칭(제형/용량 제거)은 단어 시작에서 일치할 때만 사용
+        self.stripped_aliases = {alias for alias in self.alias_items if alias not in full_aliases}
+        self.automaton = AhoCorasick(list(self.alias_items))
+
+    @classmethod
+    def from_chunks(cls, filename: str = CHUNKS_PATH) -> "DrugNameIndex":
+        df = read_chunk_columns(filename)
+        return cls(df.fillna("").to_dict("records"))
+
+    def _match_aliases(self, query: str) -> List[Tuple[str, List[str]]]:
+        """질문에 등장한 (별칭, itemSeq 목록) — 긴 별칭 우선, 겹치는 짧은 별칭은 무시"""
+        text = normalize(query)
+        word_starts = _word_starts(query)
+        matches = sorted(self.automaton.search(text), key=lambda m: (-len(m[1]), m[0]))
+        taken = [False] * len(text)
+        found: List[Tuple[str, List[str]]] = []
+        for start, alias in matches:
+            if any(taken[start:start + len(alias)]):
+                continue
+            if alias in self.stripped_aliases and not word_starts[start]:
+                continue
+            taken[start:start + len(alias)] = [True] * len(alias)
+            items = self.alias_items[alias]
+            # 질문에 제조사명도 있으면 해당 제조사 제품으로 좁힘
+            by_company = [seq for seq in items if self.companies[seq] and self.companies[seq] in text]
+            found.append((alias, by_company or items))
+        return found
+
+    def match(self, query: str) -> List[str]:
+        """질문에 등장한 약품의 itemSeq 목록 (긴 별칭 우선, 겹치는 짧은 별칭은 무시)"""
+        return self.match_with_confidence(query)[0]
+
+    def match_with_confidence(self, query: str) -> Tuple[List[str], bool]:
+        """(itemSeq 목록, 확실한 일치 여부)
+
+        확실한 일치: 모든 별칭이 제형/용량을 떼지 않은 전체 이름이고 각각 약품 하나로만 정해질 때
+        """
+        found = self._match_aliases(query)
+        item_seqs: List[str] = []
+        for _, items in found:
+            item_seqs.extend(seq for seq in items if seq not in item_seqs)
+        confident = bool(found) and all(
+            alias not in self.stripped_aliases and len(items) == 1 for alias, items in found
+        )
+        return item_seqs, confident
+
+    def lookup(self, query: str, k: int, sections: Optional[List[str]] = None,
+               item_seqs: Optional[List[str]] = None) -> List[Document]:
+        """일치한 약품의 chunk를 Document로 반환 (sections를 주면 해당 섹션 chunk만, item_seqs를 주면 다시 매칭하지 않음)"""
+        docs = []
+        for item_seq in self.match(query) if item_seqs is None else item_seqs:
+            for row in self.chunks[item_seq]:
+                if sections and row.get("section") and row["section"] not in sections:
+                    continue
+                metadata = {"itemSeq": item_seq, "itemName": row.get("itemName", ""), "score": 1.0, "match": "name"}
+                if row.get("section"):
+                    metadata["section"] = row["section"]
+                docs.append(Document(id=row.get("id"), page_content=row["chunk"], metadata=metadata))
+                if len(docs) >= k:
+                    return docs
+        return docs
+
+
+_name_index: Optional[DrugNameIndex] = None
+
+
+def get_name_index(filename: str = CHUNKS_PATH) -> Optional[DrugNameIndex]:
+    """chunk 파일이 있으면 프로세스당 한 번 인덱스 생성, 없으면 None (빠른 경로 비활성)"""
+    global _name_index
+    if _name_index is None and NAME_FASTPATH and os.path.exists(filename):
+        _name_index = DrugNameIndex.from_chunks(filename)
+        print(f"⚡ 약품명 인덱스 로드: 약품 {len(_name_index.chunks)}개, 별칭 {len(_name_index.alias_items)}개")
+    return _name_index
+
+
+def fuse_ranked(*ranked: List[Document]) -> List[Document]:
+    """여러 검색 결과 목록을 RRF(1 / (RRF_K + 순위))로 결합 — 결합 점수는 metadata["score"]에 기록"""
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for results in ranked:
+        for rank, doc in enumerate(results, 1):
+            key = doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1 / (RRF_K + rank)
+            docs.setdefault(key, doc)
+    return [
+        Document(id=docs[key].id, page_content=docs[key].page_content, metadata={**docs[key].metadata, "score": scores[key]})
+        for key in sorted(scores, key=lambda key: -scores[key])
+    ]
+
+
+def search_with_names(name_index: Optional[DrugNameIndex], query: str, k: int, sections: Optional[List[str]],
+                      vector_search: Callable[[], List[Document]]) -> List[Document]:
+    """이름 인덱스 우선 검색 (NameFastPathRetriever와 4_ CLI 공용)
+
+    - 전체 이름이 약품 하나로 확실히 일치: 이름 인덱스 결과만 반환 (임베딩/벡터 검색 생략)
+    - 제형을 뗀 별칭이거나 여러 약품에 걸친 일치: vector_search() 결과와 RRF 결합
+    - 일치 없음: vector_search() 결과 그대로
+    """
+    if name_index is None:
+        return vector_search()
+    item_seqs, confident = name_index.match_with_confidence(query)
+    docs = name_index.lookup(query, k, sections, item_seqs=item_seqs) if item_seqs else []
+    if docs and confident:
+        return docs
+    vector_docs = vector_search()
+    if not docs:
+        return vector_docs
+    return fuse_ranked(docs, vector_docs)[:k]
+
+
+class NameFastPathRetriever(BaseRetriever):
+    """질문에 약품명이 확실히 있으면 이름 인덱스에서 바로 반환, 애매하면 fallback 결과와 결합 (search_with_names)"""
+
+    name_index: Any
+    fallback: BaseRetriever
+    k: int = 3
+    route_sections: bool = False
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        sections = detect_sections(query) if self.route_sections else None
+        return search_with_names(
+            self.name_index, query, self.k, sections,
+            lambda: self.fallback.invoke(query, config={"callbacks": run_manager.get_child()}),
+        )
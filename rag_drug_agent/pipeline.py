@@ -0,0 +1,261 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+import threading
+import concurrent.futures
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+# 목적: 번호 붙은 수집 → 전처리 → 임베딩 스크립트를 단계(stage)로 선언해 한 번에 실행
+# - 단계별 입력/출력 파일, 스크립트/모듈 소스, 환경변수로 지문(fingerprint)을 만들어
+#   지난 실행과 같고 출력이 그대로면 건너뜀 → chunk 템플릿 등을 고치면 그 하위 단계만 다시 실행
+# - 서로 의존하지 않는 단계(약품 수집 / 마약류·병용금기 수집)는 병렬 실행
+#   수집 단계들은 같은 data.go.kr 키를 쓰므로 하나의 속도 제한 파일(RATE_LIMIT_FILE)을 공유
+#   → 병렬로 실행해도 전체 요청 수는 DATA_GO_KR_RPS를 넘지 않음 (modules/public_data.SharedRateLimiter)
+# - 실행 후 단계별 소요 시간 리포트 출력
+# 사용법: python rag_drug_agent/pipeline.py [단계명 ...] [--force] [--workers N]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_PATH = os.path.join(ROOT, "data", "pipeline_state.json")
+FETCH_TTL = int(os.getenv("PIPELINE_FETCH_TTL", str(24 * 60 * 60)))  # 수집 단계 결과 유효 시간(초)
+COMMON_SOURCES = ["modules/public_data.py", "modules/fetch_journal.py", "modules/xml_stream.py"]
+RATE_LIMIT_FILE = os.path.join(ROOT, "data", "api_rate_limit")  # 수집 단계 프로세스들이 공유하는 속도 제한 상태
+
+
+@dataclass
+class Stage:
+    name: str
+    script: str  # 저장소 루트 기준 경로
+    outputs: List[str]
+    inputs: List[str] = field(default_factory=list)
+    after: List[str] = field(default_factory=list)  # 먼저 끝나야 하는 단계
+    sources: List[str] = field(default_factory=list)  # 결과에 영향을 주는 모듈 소스
+    env: List[str] = field(default_factory=list)  # 결과에 영향을 주는 환경변수
+    max_age: Optional[int] = None  # 입력 파일이 없는 수집 단계는 이 시간이 지나면 다시 실행
+
+
+STAGES = [
+    Stage(
+        name="drug_fetch",
+        script="rag_drug_agent/1_ealach_fetch_data.py",
+        outputs=["data/drug_raw.csv", "data/drug_snapshot.parquet"],
+        sources=COMMON_SOURCES + ["rag_drug_agent/drug_snapshot.py"],
+        max_age=FETCH_TTL,
+    ),
+    Stage(
+        name="narcotic_fetch",
+        script="data_analysis/fetch_narcotic_drug_data.py",
+        outputs=["data/narcotic_drug_list.csv"],
+        sources=COMMON_SOURCES,
+        max_age=FETCH_TTL,
+    ),
+    Stage(
+        name="taboo_fetch",
+        script="data_analysis/fetch_taboo_drug_data.py",
+        inputs=["data/narcotic_drug_list.csv"],
+        outputs=["data/taboo_from_drfstf.csv"],
+        after=["narcotic_fetch"],
+        sources=COMMON_SOURCES,
+        max_age=FETCH_TTL,
+    ),
+    Stage(
+        name="narcotic_taboo_fetch",
+        script="data_analysis/orgin_taboo_drug_data.py",
+        outputs=["data/narcotic_taboo_interactions.csv"],
+        sources=COMMON_SOURCES,
+        max_age=FETCH_TTL,
+    ),
+    Stage(
+        name="chunk",
+        script="rag_drug_agent/2_preprocess_chunk.py",
+        inputs=["data/drug_raw.csv"],
+        outputs=["data/drug_chunks.parquet"],
+        after=["drug_fetch"],
+        sources=["rag_drug_agent/chunk_store.py", "rag_drug_agent/drug_snapshot.py", "rag_drug_agent/sections.py"],
+        env=["PIPELINE_MODE", "CHUNK_MODE"],
+    ),
+    Stage(
+        name="embed",
+        script="rag_drug_agent/3_embed_to_pinecone.py",
+        inputs=["data/drug_chunks.parquet", "sparse_encoder.pkl"],
+        outputs=["data/upsert_manifest.json", "data/doc_store.sqlite"],
+        after=["chunk"],
+        sources=[
+            "rag_drug_agent/chunk_store.py", "rag_drug_agent/embedding_cache.py",
+            "rag_drug_agent/vector_backend.py", "rag_drug_agent/hybrid_search.py",
+            "rag_drug_agent/doc_store.py", "rag_drug_agent/embed_scheduler.py",
+            "rag_drug_agent/semantic_cache.py", "rag_drug_agent/sections.py",
+        ],
+        env=["VECTOR_BACKEND", "PINECONE_INDEX_NAME", "EMBEDDING_DIMENSIONS", "LOCAL_INDEX_DTYPE", "SEARCH_MODE"],
+    ),
+    Stage(
+        name="ddi_graph",
+        script="rag_drug_agent/ddi_graph.py",
+        inputs=["data/taboo_from_drfstf.csv", "data/narcotic_taboo_interactions.csv"],
+        outputs=["data/ddi_graph.npz"],
+        after=["taboo_fetch", "narcotic_taboo_fetch"],
+        sources=["rag_drug_agent/name_index.py", "rag_drug_agent/sections.py"],
+    ),
+]
+
+
+# --- 지문 ------------------------------------------------------------------
+def file_hash(path: str) -> Optional[str]:
+    full_path = os.path.join(ROOT, path)
+    if not os.path.exists(full_path):
+        return None
+    digest = hashlib.sha1()
+    with open(full_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(stage: Stage) -> str:
+    """스크립트/모듈 소스 + 입력 파일 내용 + 환경변수로 만든 단계 지문"""
+    parts = [f"{path}={file_hash(path)}" for path in [stage.script] + stage.sources + stage.inputs]
+    parts += [f"${name}={os.getenv(name, '')}" for name in stage.env]
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def load_state() -> Dict[str, dict]:
+    if not os.path.exists(STATE_PATH):
+        return {}
+    with open(STATE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state: Dict[str, dict]):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def is_up_to_date(stage: Stage, record: Optional[dict], current: str) -> Optional[str]:
+    """최신이면 None, 다시 실행해야 하면 그 이유"""
+    if record is None:
+        return "첫 실행"
+    if record["fingerprint"] != current:
+        return "입력/소스 변경"
+    for path in stage.outputs:
+        if file_hash(path) != record["outputs"].get(path):
+            return f"출력 변경/없음: {path}"
+    if stage.max_age is not None and time.time() - record["finished_at"] > stage.max_age:
+        return "수집 결과 만료"
+    return None
+
+
+# --- 실행 ------------------------------------------------------------------
+_print_lock = threading.Lock()
+
+
+def run_script(stage: Stage) -> int:
+    """단계 스크립트를 저장소 루트에서 실행하고 출력에 [단계명] 접두어를 붙여 전달"""
+    env = {**os.environ, "PYTHONUNBUFFERED": "1", "PYTHONIOENCODING": "utf-8"}
+    env.setdefault("DATA_GO_KR_RATE_FILE", RATE_LIMIT_FILE)  # 병렬 수집 단계가 같은 요청 한도를 나눠 쓰도록
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, stage.script)], cwd=ROOT, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace",
+    )
+    for line in process.stdout:
+        with _print_lock:
+            print(f"[{stage.name}] {line}", end="")
+    return process.wait()
+
+
+def select_stages(targets: List[str]) -> List[Stage]:
+    """지정한 단계와 그 선행 단계 (지정이 없으면 전체)"""
+    by_name = {stage.name: stage for stage in STAGES}
+    unknown = [name for name in targets if name not in by_name]
+    if unknown:
+        raise ValueError(f"❌ 알 수 없는 단계: {', '.join(unknown)} (가능: {', '.join(by_name)})")
+    selected = set()
+    pending = list(targets or by_name)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(by_name[name].after)
+    return [stage for stage in STAGES if stage.name in selected]
+
+
+def run_pipeline(targets: List[str] = (), force: bool = False, workers: int = 4) -> Dict[str, dict]:
+    stages = select_stages(list(targets))
+    selected = {stage.name for stage in stages}
+    state = load_state()
+    state_lock = threading.Lock()
+    report: Dict[str, dict] = {}
+
+    def run_stage(stage: Stage) -> dict:
+        started = time.monotonic()
+        current = fingerprint(stage)
+        reason = "강제 실행" if force else is_up_to_date(stage, state.get(stage.name), current)
+        if reason is None:
+            return {"status": "skipped", "seconds": time.monotonic() - started, "reason": "최신"}
+
+        with _print_lock:
+            print(f"▶️ [{stage.name}] 실행 ({reason})")
+        code = run_script(stage)
+        seconds = time.monotonic() - started
+        missing = [path for path in stage.outputs if file_hash(path) is None]
+        if code != 0 or missing:
+            detail = f"종료 코드 {code}" if code != 0 else f"출력 없음: {', '.join(missing)}"
+            return {"status": "failed", "seconds": seconds, "reason": detail}
+
+        with state_lock:
+            # 실행 중 입력이 바뀌었을 수 있으므로 지문은 실행 직전 값으로 기록
+            state[stage.name] = {
+                "fingerprint": current,
+                "outputs": {path: file_hash(path) for path in stage.outputs},
+                "finished_at": time.time(),
+            }
+            save_state(state)
+        return {"status": "ran", "seconds": seconds, "reason": reason}
+
+    pipeline_started = time.monotonic()
+    remaining = {stage.name: stage for stage in stages}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        running = {}
+        while remaining or running:
+            for name, stage in list(remaining.items()):
+                deps = [dep for dep in stage.after if dep in selected]
+                if any(report.get(dep, {}).get("status") in ("failed", "blocked") for dep in deps):
+                    report[name] = {"status": "blocked", "seconds": 0.0, "reason": "선행 단계 실패"}
+                    del remaining[name]
+                elif all(dep in report for dep in deps):
+                    running[executor.submit(run_stage, stage)] = name
+                    del remaining[name]
+            if not running:
+                continue
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                report[running.pop(future)] = future.result()
+
+    print_report(stages, report, time.monotonic() - pipeline_started)
+    return report
+
+
+def print_report(stages: List[Stage], report: Dict[str, dict], elapsed: float):
+    icons = {"ran": "✅ 실행", "skipped": "⏭️ 건너뜀", "failed": "❌ 실패", "blocked": "⛔ 중단"}
+    print("\n📊 파이프라인 단계별 결과")
+    for stage in stages:
+        result = report[stage.name]
+        print(f"  {stage.name:<22} {icons[result['status']]:<8} {result['seconds']:8.1f}초  ({result['reason']})")
+    print(f"  {'단계 합계 / 전체 경과':<22} {sum(r['seconds'] for r in report.values()):8.1f}초 / {elapsed:.1f}초")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="약품 RAG 데이터 파이프라인 실행기")
+    parser.add_argument("targets", nargs="*", help="실행할 단계 (선행 단계 포함, 생략 시 전체)")
+    parser.add_argument("--force", action="store_true", help="최신 여부와 관계없이 모두 다시 실행")
+    parser.add_argument("--workers", type=int, default=4, help="동시에 실행할 단계 수")
+    args = parser.parse_args()
+
+    result = run_pipeline(args.targets, force=args.force, workers=args.workers)
+    if any(r["status"] in ("failed", "blocked") for r in result.values()):
+        sys.exit(1)
@@ -0,0 +1,35 @@
+import os
+from typing import Iterator, List, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import PromptTemplate
+from langchain_core.retrievers import BaseRetriever
+# 목적: 5_~7_ Gradio 앱의 스트리밍 응답
+# - 검색이 끝나면 바로 참고 약품명(itemName)을 보여주고, 답변은 LLM 토큰이 도착하는 대로 이어 붙임
+# - RetrievalQA(stuff) 체인과 같은 프롬프트/컨텍스트(문서 본문을 빈 줄로 연결)를 사용
+# → 체감 대기 시간이 전체 생성 시간에서 첫 토큰까지의 시간으로 줄어듦
+
+RAG_STREAMING = os.getenv("RAG_STREAMING", "1") == "1"  # 0이면 기존처럼 답변 완성 후 한 번에 표시
+
+
+def source_names(docs) -> List[str]:
+    return [doc.metadata.get("itemName", "알 수 없음") for doc in docs]
+
+
+def format_response(answer: str, names: List[str], title: str = "📚 참고한 약품 정보:") -> str:
+    """답변 + 참고 약품 목록 (답변 생성 전에는 진행 표시)"""
+    source_info = f"\n\n{title}\n" + "".join(f"{i}. {name}\n" for i, name in enumerate(names, 1))
+    return (answer or "✍️ 답변 생성 중...") + source_info
+
+
+def stream_answer(retriever: BaseRetriever, llm: BaseChatModel, prompt: PromptTemplate,
+                  query: str) -> Iterator[Tuple[List[str], str]]:
+    """(참고 약품명, 지금까지의 답변)을 반환 — 첫 값은 검색 직후 빈 답변"""
+    docs = retriever.invoke(query)
+    names = source_names(docs)
+    yield names, ""
+    context = "\n\n".join(doc.page_content for doc in docs)
+    answer = ""
+    for chunk in llm.stream(prompt.format(context=context, question=query)):
+        answer += chunk.content
+        yield names, answer
@@ -0,0 +1,36 @@
+import os
+from typing import Dict, List, Optional
+# 목적: 섹션 단위 chunk(CHUNK_MODE=section)와 질문 → 섹션 라우팅
+# - 2_는 약품 하나를 섹션(효능/복용 방법/주의사항/...)별 chunk로 나누고 metadata에 section을 붙임
+# - 리트리버는 질문에 섹션 키워드가 있으면 {"section": {"$in": [...]}} 필터로 해당 섹션만 검색
+#   → 약품 설명서 전체 대신 필요한 섹션만 프롬프트에 들어감
+
+CHUNK_MODE = os.getenv("CHUNK_MODE", "drug")  # "drug"(약품당 1 chunk) | "section"(섹션당 1 chunk)
+
+# 섹션 키: (라벨, 원본 컬럼, 질문 키워드)
+SECTIONS: Dict[str, tuple] = {
+    "manufacturer": ("제조사", ["entpName"], ["제조사", "제약사", "회사", "만든 곳"]),
+    "efficacy": ("효능", ["efcyQesitm"], ["효능", "효과", "적응증", "무슨 약", "어디에 좋", "용도"]),
+    "usage": ("복용 방법", ["useMethodQesitm"], ["복용", "먹는 법", "먹는 방법", "용법", "용량", "하루에", "몇 번", "몇 알", "언제 먹"]),
+    "warning": ("주의사항", ["atpnWarnQesitm", "atpnQesitm"], ["주의", "경고", "금기", "임산부", "임신", "수유", "어린이", "노인", "먹으면 안"]),
+    "interaction": ("상호작용", ["intrcQesitm"], ["상호작용", "같이 먹", "함께 먹", "같이 복용", "함께 복용", "병용", "음주", "술과", "술이랑", "술 마"]),
+    "side_effect": ("부작용", ["seQesitm"], ["부작용", "이상반응", "이상 반응", "졸음", "어지러"]),
+    "storage": ("보관 방법", ["depositMethodQesitm"], ["보관", "유통기한", "냉장"]),
+}
+
+
+def use_section_chunks() -> bool:
+    return CHUNK_MODE == "section"
+
+
+def detect_sections(query: str) -> List[str]:
+    """질문에 등장한 키워드로 관련 섹션 키 목록 반환 (없으면 빈 리스트 = 전체 섹션)"""
+    return [key for key, (_, _, keywords) in SECTIONS.items() if any(k in query for k in keywords)]
+
+
+def section_filter(query: str, base: Optional[dict] = None) -> Optional[dict]:
+    """기존 메타데이터 필터에 질문 섹션 필터를 더한 Pinecone 형식 필터"""
+    sections = detect_sections(query)
+    if not sections:
+        return base
+    return {**(base or {}), "section": {"$in": sections}}
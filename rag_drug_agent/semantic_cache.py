@@ -0,0 +1,130 @@
+import os
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from name_index import DrugNameIndex, get_name_index
+# 목적: RetrievalQA 체인 앞단의 의미 기반 답변 캐시
+# - (질문 임베딩, 답변, 참고 itemName) 저장 → 코사인 유사도가 임계값 이상이면 LLM 호출 없이 반환
+# - 질문에 나온 약품(이름 인덱스 itemSeq 집합)이 같은 항목만 적중 → "A정 부작용"에 B정 답변을 주지 않음
+# - TTL 만료 + LRU 축출, 인덱스가 다시 만들어지면(index_version 변경) 전체 무효화
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", str(24 * 60 * 60)))  # 초
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1000"))
+INDEX_VERSION_PATH = "data/index_version"
+
+
+def read_index_version(path: str = INDEX_VERSION_PATH) -> str:
+    if not os.path.exists(path):
+        return ""
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def bump_index_version(path: str = INDEX_VERSION_PATH) -> str:
+    """인덱스 재구축(3_ 업로드) 후 호출 → 이 버전을 본 답변 캐시는 모두 무효화됨"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    version = str(time.time_ns())
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(version)
+    return version
+
+
+class SemanticAnswerCache:
+    """질문 임베딩 코사인 유사도 기반 답변 캐시"""
+
+    def __init__(self, embeddings: Embeddings, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl: int = SEMANTIC_CACHE_TTL, max_entries: int = SEMANTIC_CACHE_SIZE,
+                 version_path: str = INDEX_VERSION_PATH, name_index: Optional[DrugNameIndex] = None):
+        self.embeddings = embeddings
+        self.name_index = name_index if name_index is not None else get_name_index()
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_path = version_path
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None  # (max_entries, dim) 정규화된 질문 임베딩
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._version = read_index_version(version_path)
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _items(self, query: str) -> frozenset:
+        """질문에 나온 약품의 itemSeq 집합 (이름 인덱스가 없으면 빈 집합)"""
+        if self.name_index is None:
+            return frozenset()
+        return frozenset(self.name_index.match(query))
+
+    def _check_version(self):
+        version = read_index_version(self.version_path)
+        if version != self._version:
+            self._clear()
+            self._version = version
+
+    def _clear(self):
+        self._vectors = None
+        self._entries = [None] * self.max_entries
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """유사한 질문의 캐시된 {"answer", "sources"} 반환, 없으면 None"""
+        vector = self._embed(query)
+        items = self._items(query)
+        now = time.time()
+        with self._lock:
+            self._check_version()
+            if self._vectors is None:
+                self.misses += 1
+                return None
+
+            scores = self._vectors @ vector
+            for slot, entry in enumerate(self._entries):
+                if entry is None or now - entry["created"] > self.ttl:
+                    scores[slot] = -np.inf
+                    self._entries[slot] = None
+                elif entry["items"] != items:  # 다른 약품에 대한 답변
+                    scores[slot] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry = self._entries[best]
+            entry["last_used"] = now
+            self.hits += 1
+            return {"answer": entry["answer"], "sources": entry["sources"], "score": float(scores[best])}
+
+    def store(self, query: str, answer: str, sources: List[str]):
+        vector = self._embed(query)
+        items = self._items(query)
+        now = time.time()
+        with self._lock:
+            self._check_version()
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            # 빈 슬롯 → 만료된 슬롯 → 가장 오래 안 쓰인 슬롯(LRU) 순으로 사용
+            slot = next((i for i, e in enumerate(self._entries) if e is None), None)
+            if slot is None:
+                slot = next((i for i, e in enumerate(self._entries) if now - e["created"] > self.ttl), None)
+            if slot is None:
+                slot = min(range(self.max_entries), key=lambda i: self._entries[i]["last_used"])
+            self._vectors[slot] = vector
+            self._entries[slot] = {
+                "query": query,
+                "items": items,
+                "answer": answer,
+                "sources": list(sources),
+                "created": now,
+                "last_used": now,
+            }
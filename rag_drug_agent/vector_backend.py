@@ -0,0 +1,420 @@
+import os
+import json
+import shutil
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from embedding_cache import VectorFile, embedding_dimension
+# 목적: Pinecone과 같은 upsert/query/delete 인터페이스를 가진 로컬 벡터 인덱스
+# - VECTOR_BACKEND=local 로 선택하면 네트워크 없이 색인/검색 가능 (CI, 오프라인 테스트)
+# - 벡터는 memmap float32 행렬, 점수는 한 번의 행렬-벡터 곱(dotproduct)으로 계산
+# - LOCAL_INDEX_MODE=ivf 이면 k-means 클러스터 중 일부(nprobe)만 스캔하는 근사 검색
+# - sparse_values(BM25)도 함께 저장해 Pinecone과 같은 하이브리드 점수(dense + sparse) 계산
+# - LOCAL_INDEX_DTYPE=float16 | int8 이면 벡터를 2배 / 4배 작게 저장 (int8은 행별 스케일), 점수는 float32로 계산
+#   → 정확도 영향은 benchmark_vectors.py로 측정
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")  # "pinecone" | "local"
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "data/local_index")
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX_MODE", "exact")  # "exact" | "ivf"
+IVF_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "8"))
+IVF_MIN_ROWS = 20000  # 이보다 작으면 근사 검색보다 전수 스캔이 더 빠름
+LOCAL_INDEX_DTYPE = os.getenv("LOCAL_INDEX_DTYPE", "float32")  # "float32" | "float16" | "int8"
+STORAGE_DTYPES = {"float32": (np.float32, "f32"), "float16": (np.float16, "f16"), "int8": (np.int8, "i8")}
+SCORE_BLOCK_ROWS = 8192  # float32가 아닌 행렬은 이 행 수만큼씩 변환해 점수 계산 (임시 메모리 상한)
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """float32 벡터 → 저장 형식 (int8은 행별 스케일 max|v|/127도 함께 반환)"""
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return vectors.astype(STORAGE_DTYPES[dtype][0]), None
+
+
+def _match_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """Pinecone 메타데이터 필터 중 $eq / $ne / $in / $nin 만 지원"""
+    if not filter:
+        return True
+    for key, cond in filter.items():
+        value = metadata.get(key)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, operand in cond.items():
+            if op == "$eq" and value != operand:
+                return False
+            if op == "$ne" and value == operand:
+                return False
+            if op == "$in" and value not in operand:
+                return False
+            if op == "$nin" and value in operand:
+                return False
+    return True
+
+
+class _Namespace:
+    """네임스페이스 하나의 벡터 행렬과 ID/메타데이터"""
+
+    def __init__(self, path: str, dimension: int, dtype: str = "float32"):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"❌ 지원하지 않는 LOCAL_INDEX_DTYPE: {dtype} ({', '.join(STORAGE_DTYPES)})")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dimension = dimension
+        self.dtype = dtype
+        self.ids: List[Optional[str]] = []  # 행 번호 -> ID (삭제된 행은 None)
+        self.metadata: List[Optional[Dict[str, Any]]] = []
+        self.sparse: List[Optional[Dict[str, list]]] = []
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                saved = json.load(f)
+            saved_dtype = saved.get("dtype", "float32")
+            if saved_dtype != dtype:
+                raise ValueError(
+                    f"❌ 로컬 인덱스 저장 형식({saved_dtype})이 LOCAL_INDEX_DTYPE({dtype})과 다릅니다. "
+                    f"3_embed_to_pinecone.py를 delete_first=True로 다시 실행하세요."
+                )
+            # memmap은 행 너비를 모르므로 차원이 다르면 벡터를 잘못 읽음 (dimension 기록 이전 인덱스는 다음 저장부터 확인)
+            saved_dimension = saved.get("dimension")
+            if saved_dimension is not None and saved_dimension != dimension:
+                raise ValueError(
+                    f"❌ 로컬 인덱스 벡터 차원({saved_dimension})이 현재 임베딩 차원({dimension})과 다릅니다. "
+                    f"EMBEDDING_DIMENSIONS를 되돌리거나 3_embed_to_pinecone.py를 delete_first=True로 다시 실행하세요."
+                )
+            self.ids = saved["ids"]
+            self.metadata = saved["metadata"]
+            self.sparse = saved.get("sparse") or [None] * len(self.ids)
+        numpy_dtype, suffix = STORAGE_DTYPES[dtype]
+        self.vectors = VectorFile(os.path.join(path, f"vectors.{suffix}"), dimension, numpy_dtype)
+        self.scales = VectorFile(os.path.join(path, "scales.f32"), 1) if dtype == "int8" else None
+        self.row_of = {doc_id: row for row, doc_id in enumerate(self.ids) if doc_id is not None}
+        self.free_rows = [row for row, doc_id in enumerate(self.ids) if doc_id is None]
+        self._invalidate()
+
+    def _invalidate(self):
+        self._alive_rows = None
+        self._ivf = None
+        self._sparse_coo = None
+
+    @property
+    def alive_rows(self) -> np.ndarray:
+        if self._alive_rows is None:
+            self._alive_rows = np.array(sorted(self.row_of.values()), dtype=np.int64)
+        return self._alive_rows
+
+    def upsert(self, items: List[Tuple[str, List[float], Dict[str, Any], Optional[Dict[str, list]]]]):
+        rows = []
+        for doc_id, _, metadata, sparse in items:
+            row = self.row_of.get(doc_id)
+            if row is None:
+                row = self.free_rows.pop() if self.free_rows else len(self.ids)
+                if row == len(self.ids):
+                    self.ids.append(None)
+                    self.metadata.append(None)
+                    self.sparse.append(None)
+            self.ids[row] = doc_id
+            self.metadata[row] = metadata
+            self.sparse[row] = sparse
+            self.row_of[doc_id] = row
+            rows.append(row)
+        if rows:
+            codes, scales = quantize(np.asarray([item[1] for item in items], dtype=np.float32), self.dtype)
+            self.vectors.write_rows(rows, codes)
+            if self.scales is not None:
+                self.scales.write_rows(rows, scales[:, None])
+        self._invalidate()
+
+    def delete(self, ids: Iterable[str]):
+        for doc_id in ids:
+            row = self.row_of.pop(doc_id, None)
+            if row is not None:
+                self.ids[row] = None
+                self.metadata[row] = None
+                self.sparse[row] = None
+                self.free_rows.append(row)
+        self._invalidate()
+
+    def persist(self):
+        tmp_path = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dtype": self.dtype, "dimension": self.dimension, "ids": self.ids,
+                       "metadata": self.metadata, "sparse": self.sparse}, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+    def decode(self, rows: np.ndarray) -> np.ndarray:
+        """저장된 행들을 float32 벡터로 복원"""
+        vectors = self.vectors.view(len(self.ids))[rows].astype(np.float32)
+        if self.scales is not None:
+            vectors *= self.scales.view(len(self.ids))[rows]
+        return vectors
+
+    def dense_scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """rows(None이면 모든 행)에 대한 dense dot product"""
+        matrix = self.vectors.view(len(self.ids))
+        if self.dtype == "float32":
+            return matrix @ query if rows is None else matrix[rows] @ query
+        if rows is None:
+            # 연속된 memmap을 블록 단위로 float32 변환 후 matvec (전체 행렬 복사 방지)
+            scores = np.empty(len(matrix), dtype=np.float32)
+            for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+                block = matrix[start:start + SCORE_BLOCK_ROWS]
+                scores[start:start + len(block)] = block.astype(np.float32) @ query
+        else:
+            scores = matrix[rows].astype(np.float32) @ query
+        if self.scales is not None:
+            scales = self.scales.view(len(self.ids))[:, 0]
+            scores *= scales if rows is None else scales[rows]
+        return scores
+
+    def sparse_scores(self, sparse_vector: Dict[str, list]) -> np.ndarray:
+        """모든 행에 대한 sparse dot product (COO 배열 + searchsorted로 벡터화)"""
+        if self._sparse_coo is None:
+            rows, cols, vals = [], [], []
+            for row, sv in enumerate(self.sparse):
+                if sv and self.ids[row] is not None:
+                    rows.extend([row] * len(sv["indices"]))
+                    cols.extend(sv["indices"])
+                    vals.extend(sv["values"])
+            self._sparse_coo = (
+                np.asarray(rows, dtype=np.int64),
+                np.asarray(cols, dtype=np.int64),
+                np.asarray(vals, dtype=np.float32),
+            )
+        rows, cols, vals = self._sparse_coo
+        order = np.argsort(sparse_vector["indices"])
+        q_idx = np.asarray(sparse_vector["indices"], dtype=np.int64)[order]
+        q_val = np.asarray(sparse_vector["values"], dtype=np.float32)[order]
+        if len(q_idx) == 0 or len(cols) == 0:
+            return np.zeros(len(self.ids), dtype=np.float32)
+        pos = np.clip(np.searchsorted(q_idx, cols), 0, len(q_idx) - 1)
+        hit = q_idx[pos] == cols
+        return np.bincount(rows[hit], weights=vals[hit] * q_val[pos[hit]], minlength=len(self.ids)).astype(np.float32)
+
+    def _build_ivf(self, alive_rows: np.ndarray, iterations: int = 10):
+        """alive 행에 대해 간단한 k-means로 역색인(IVF) 리스트 생성"""
+        data = self.decode(alive_rows)
+        nlist = max(1, int(np.sqrt(len(alive_rows))))
+        rng = np.random.default_rng(0)
+        centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = data[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+        assign = np.argmax(data @ centroids.T, axis=1)
+        lists = [alive_rows[assign == c] for c in range(nlist)]
+        self._ivf = (centroids, lists)
+
+    def candidate_rows(self, query: np.ndarray, mode: str, nprobe: int) -> Optional[np.ndarray]:
+        """근사 검색에서 스캔할 행 번호 (전수 스캔이면 None)"""
+        alive_rows = self.alive_rows
+        if mode != "ivf" or len(alive_rows) < IVF_MIN_ROWS:
+            return None
+        if self._ivf is None:
+            self._build_ivf(alive_rows)
+        centroids, lists = self._ivf
+        probe = np.argsort(-(centroids @ query))[:nprobe]
+        return np.concatenate([lists[c] for c in probe])
+
+
+class LocalIndex:
+    """Pinecone Index 대신 쓸 수 있는 로컬 인메모리/memmap 벡터 인덱스"""
+
+    def __init__(self, path: str = LOCAL_INDEX_DIR, dimension: Optional[int] = None,
+                 mode: str = LOCAL_INDEX_MODE, nprobe: int = IVF_NPROBE, dtype: str = LOCAL_INDEX_DTYPE):
+        self.path = path
+        self.dimension = dimension or embedding_dimension()
+        self.dtype = dtype
+        self.mode = mode
+        self.nprobe = nprobe
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.Lock()
+
+    def _ns(self, namespace: str) -> _Namespace:
+        if namespace not in self._namespaces:
+            self._namespaces[namespace] = _Namespace(
+                os.path.join(self.path, namespace or "__default__"), self.dimension, self.dtype
+            )
+        return self._namespaces[namespace]
+
+    @staticmethod
+    def _normalize(vector: Any) -> Tuple[str, List[float], Dict[str, Any], Optional[Dict[str, list]]]:
+        if isinstance(vector, dict):
+            return vector["id"], vector["values"], vector.get("metadata") or {}, vector.get("sparse_values")
+        doc_id, values, *rest = vector
+        return doc_id, values, (rest[0] if rest else {}) or {}, None
+
+    def upsert(self, vectors: List[Any], namespace: str = "", **kwargs):
+        items = [self._normalize(v) for v in vectors]
+        with self._lock:
+            self._ns(namespace).upsert(items)
+        return {"upserted_count": len(items)}
+
+    def delete(self, ids: Optional[List[str]] = None, namespace: str = "", delete_all: bool = False, **kwargs):
+        with self._lock:
+            ns = self._ns(namespace)
+            ns.delete(list(ns.row_of) if delete_all else (ids or []))
+        return {}
+
+    def query(self, vector: List[float], top_k: int = 10, namespace: str = "",
+              include_metadata: bool = False, include_values: bool = False,
+              filter: Optional[Dict[str, Any]] = None, sparse_vector: Optional[Dict[str, list]] = None,
+              **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            ns = self._ns(namespace)
+            if not ns.row_of:
+                return {"matches": [], "namespace": namespace}
+            query = np.asarray(vector, dtype=np.float32)
+            rows = ns.candidate_rows(query, self.mode, self.nprobe)
+            if rows is None:
+                # 전수 스캔: 연속된 memmap 행렬 전체에 한 번의 matvec 후 살아있는 행만 선택
+                rows = ns.alive_rows
+                scores = ns.dense_scores(query)[rows]
+            else:
+                scores = ns.dense_scores(query, rows)
+            if sparse_vector:
+                scores = scores + ns.sparse_scores(sparse_vector)[rows]
+            if filter:
+                keep = np.array([_match_filter(ns.metadata[r], filter) for r in rows], dtype=bool)
+                rows, scores = rows[keep], scores[keep]
+            if len(rows) == 0:
+                return {"matches": [], "namespace": namespace}
+
+            k = min(top_k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            matches = []
+            for i in top:
+                row = rows[i]
+                match = {"id": ns.ids[row], "score": float(scores[i])}
+                if include_metadata:
+                    match["metadata"] = dict(ns.metadata[row])
+                if include_values:
+                    match["values"] = ns.decode(np.array([row]))[0].tolist()
+                matches.append(match)
+        return {"matches": matches, "namespace": namespace}
+
+    def describe_index_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            namespaces = {name: {"vector_count": len(ns.row_of)} for name, ns in self._namespaces.items()}
+        return {"dimension": self.dimension, "namespaces": namespaces}
+
+    def persist(self):
+        """메타데이터를 디스크에 기록 (벡터는 memmap이라 upsert 시점에 이미 기록됨)"""
+        with self._lock:
+            for ns in self._namespaces.values():
+                ns.persist()
+
+    def reset(self):
+        with self._lock:
+            self._namespaces.clear()
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+class LocalVectorStore(VectorStore):
+    """LocalIndex를 LangChain VectorStore로 감싼 어댑터 (Pinecone 벡터스토어와 같은 text_key 규칙)"""
+
+    def __init__(self, index: LocalIndex, embedding: Embeddings, namespace: str = "", text_key: str = "text"):
+        self.index = index
+        self._embedding = embedding
+        self.namespace = namespace
+        self.text_key = text_key
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(i) for i in range(len(texts))]
+        vectors = self._embedding.embed_documents(texts)
+        self.index.upsert(
+            vectors=[
+                (doc_id, vector, {**metadata, self.text_key: text})
+                for doc_id, vector, metadata, text in zip(ids, vectors, metadatas, texts)
+            ],
+            namespace=self.namespace,
+        )
+        self.index.persist()
+        return ids
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        result = self.index.query(vector=embedding, top_k=k, namespace=self.namespace,
+                                  include_metadata=True, filter=filter)
+        docs = []
+        for match in result["matches"]:
+            metadata = match["metadata"]
+            text = metadata.pop(self.text_key, "")
+            docs.append((Document(id=match["id"], page_content=text, metadata=metadata), match["score"]))
+        return docs
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   namespace: str = "", **kwargs: Any) -> "LocalVectorStore":
+        store = cls(open_local_index(), embedding, namespace=namespace)
+        store.add_texts(texts, metadatas, ids=kwargs.get("ids"))
+        return store
+
+
+_local_index: Optional[LocalIndex] = None
+
+
+def open_local_index(dimension: Optional[int] = None) -> LocalIndex:
+    """프로세스 전체에서 하나의 LocalIndex를 공유"""
+    global _local_index
+    if _local_index is None:
+        _local_index = LocalIndex(dimension=dimension)
+    return _local_index
+
+
+def use_local_backend() -> bool:
+    return VECTOR_BACKEND == "local"
+
+
+def persist_index(index: Any):
+    """LocalIndex면 메타데이터를 저장, Pinecone이면 아무 것도 하지 않음"""
+    if isinstance(index, LocalIndex):
+        index.persist()
+
+
+def open_index(index_name: str) -> Any:
+    """VECTOR_BACKEND에 따라 Pinecone Index 또는 LocalIndex 반환 (하이브리드 검색처럼 원시 query가 필요할 때)"""
+    if use_local_backend():
+        return open_local_index()
+
+    from pinecone import Pinecone
+    return Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(index_name)
+
+
+def get_vectorstore(index_name: str, embedding: Embeddings, namespace: str) -> VectorStore:
+    """VECTOR_BACKEND 환경변수에 따라 Pinecone 또는 로컬 벡터스토어 반환 (5_~8_ 앱 공용)"""
+    if use_local_backend():
+        return LocalVectorStore(open_local_index(), embedding, namespace=namespace)
+
+    from langchain_community.vectorstores import Pinecone
+    return Pinecone.from_existing_index(
+        index_name=index_name,
+        embedding=embedding,
+        namespace=namespace
+    )
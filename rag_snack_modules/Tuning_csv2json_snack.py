@@ -1,52 +1,41 @@
 import pandas as pd
 import json
 
-# CSV 파일 로드
-snack_df = pd.read_csv("raw_snack_data/snack.csv")
-snack_item_df = pd.read_csv("raw_snack_data/snack_item.csv")
-snack_additive_df = pd.read_csv("raw_snack_data/snack_additive.csv")
-map_df = pd.read_csv("raw_snack_data/map_snack_item_additive.csv")
+from snack_join import load_joined_snack_items, format_nutrients
 
-# 데이터 병합 및 JSON 변환
-formatted_records = []
+# CSV 파일 로드 및 4개 테이블 조인 (snack_join.py)
+joined_df, additives, missing_snack_ids = load_joined_snack_items("raw_snack_data")
 
-for _, item in snack_item_df.iterrows():
-    snack = snack_df[snack_df['id'] == item['snack_id']].iloc[0]
-    additive_ids = map_df[map_df['snack_item_id'] == item['id']]['snack_additive_id'].tolist()
-    additives = snack_additive_df[snack_additive_df['id'].isin(additive_ids)]
+# 첨가물 정보는 첨가물당 한 번만 생성해 재사용
+additive_info_by_id = {
+    additive_id: {
+        "korean_name": a['korean_name'],
+        "grade": a['grade'],
+        "uses": a['uses'],
+        "description": a['description'],
+        "stability_message": a['stability_message'] if pd.notnull(a['stability_message']) else '정보 없음'
+    }
+    for additive_id, a in additives.items()
+}
 
-    additive_list = []
-    for _, row in additives.iterrows():
-        uses = json.loads(row['main_use_list']) if pd.notnull(row['main_use_list']) else []
-        additive_info = {
-            "korean_name": row['korean_name'],
-            "grade": row['grade'],
-            "uses": uses,
-            "description": row['description'],
-            "stability_message": row['stability_message'] if pd.notnull(row['stability_message']) else '정보 없음'
-        }
-        additive_list.append(additive_info)
+# 데이터 병합 및 JSON 변환
+if missing_snack_ids:
+    raise KeyError(f"snack.csv에 없는 snack_id: {missing_snack_ids[:5]}")
 
-    nutrients = json.loads(item['nutrient_list']) if pd.notnull(item['nutrient_list']) else []
-    nutrient_list = [
-        {
-            "nutrient": n['nutrient'],
-            "amount": n['servingAmountInfo']['amount'],
-            "unit": n['servingAmountInfo']['amountUnit']
-        } for n in nutrients
-    ]
+formatted_records = []
 
+for item in joined_df.to_dict("records"):
     record = {
-        "snack_name": snack['name'],
-        "manufacturer": snack['company'],
-        "type": snack['snack_type'],
+        "snack_name": item['snack_name'],
+        "manufacturer": item['snack_company'],
+        "type": item['snack_snack_type'],
         "serving_unit": item['service_unit'],
         "calories": item['calorie'],
-        "total_serving_size": snack['total_serving_size'],
-        "nutrients": nutrient_list,
-        "additives": additive_list,
-        "allergy_info": json.loads(snack['allergy_list']) if pd.notnull(snack['allergy_list']) else [],
-        "certifications": json.loads(snack['safe_food_mark_list']) if pd.notnull(snack['safe_food_mark_list']) else []
+        "total_serving_size": item['snack_total_serving_size'],
+        "nutrients": format_nutrients(item['nutrients']),
+        "additives": [additive_info_by_id[additive_id] for additive_id in item['additive_ids']],
+        "allergy_info": item['snack_allergy_list'] if item['snack_allergy_list'] is not None else [],
+        "certifications": item['snack_safe_food_mark_list'] if item['snack_safe_food_mark_list'] is not None else []
     }
     formatted_records.append(record)
 
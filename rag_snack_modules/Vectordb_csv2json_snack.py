@@ -1,53 +1,31 @@
-# CSV 파일들을 로드
+# CSV 파일들을 로드 (4개 테이블을 한 번에 조인 → snack_join.py)
 import pandas as pd
-import ast
 import json
 
-# CSV 파일 경로
-snack_df = pd.read_csv("raw_snack_data/snack.csv")
-snack_item_df = pd.read_csv("raw_snack_data/snack_item.csv")
-snack_additive_df = pd.read_csv("raw_snack_data/snack_additive.csv")
-map_df = pd.read_csv("raw_snack_data/map_snack_item_additive.csv")
+from snack_join import load_joined_snack_items, format_nutrients
 
-# RAG용 JSON 구조 생성
-rag_documents = []
-
-for i, item in snack_item_df.iterrows():
-    snack = snack_df[snack_df['id'] == item['snack_id']]
-    if snack.empty:
-        continue
-    snack = snack.iloc[0]
-
-    additive_ids = map_df[map_df['snack_item_id'] == item['id']]['snack_additive_id'].tolist()
-    additives = snack_additive_df[snack_additive_df['id'].isin(additive_ids)]
+joined_df, additives, _ = load_joined_snack_items("raw_snack_data")  # 간식 정보가 없는 품목은 제외
 
-    additive_texts = []
-    for _, row in additives.iterrows():
-        try:
-            uses = ast.literal_eval(row['main_use_list']) if pd.notnull(row['main_use_list']) else []
-        except:
-            uses = []
-        additive_texts.append(
-            f"- {row['korean_name']} ({row['grade']} 등급) / 용도: {', '.join(uses)} / 설명: {row['description']}"
-        )
+# 첨가물 설명 문구는 첨가물당 한 번만 생성해 재사용
+additive_texts_by_id = {
+    additive_id: f"- {a['korean_name']} ({a['grade']} 등급) / 용도: {', '.join(a['uses'])} / 설명: {a['description']}"
+    for additive_id, a in additives.items()
+}
 
-    try:
-        nutrients = json.loads(item['nutrient_list']) if pd.notnull(item['nutrient_list']) else []
-    except:
-        nutrients = []
+# RAG용 JSON 구조 생성
+rag_documents = []
 
-    nutrient_texts = [
-        f"{n['nutrient']}: {n['servingAmountInfo']['amount']}{n['servingAmountInfo']['amountUnit']}"
-        for n in nutrients
-    ]
+for item in joined_df.to_dict("records"):
+    additive_texts = [additive_texts_by_id[additive_id] for additive_id in item['additive_ids']]
+    nutrient_texts = [f"{n['nutrient']}: {n['amount']}{n['unit']}" for n in format_nutrients(item['nutrients'])]
 
     page_content = "\n".join([
-        f"간식명: {snack['name']}",
-        f"제조사: {snack['company']}",
-        f"종류: {snack['snack_type']}",
+        f"간식명: {item['snack_name']}",
+        f"제조사: {item['snack_company']}",
+        f"종류: {item['snack_snack_type']}",
         f"제공단위: {item['service_unit']}",
         f"열량: {item['calorie']} kcal",
-        f"총 제공량: {snack['total_serving_size']}",
+        f"총 제공량: {item['snack_total_serving_size']}",
         "",
         "📌 영양 정보:",
         " / ".join(nutrient_texts),
@@ -55,14 +33,14 @@ for i, item in snack_item_df.iterrows():
         "📌 첨가물:",
         "\n".join(additive_texts),
         "",
-        f"📌 알레르기 정보: {', '.join(json.loads(snack['allergy_list'])) if pd.notnull(snack['allergy_list']) else '없음'}",
-        f"📌 인증 마크: {', '.join(json.loads(snack['safe_food_mark_list'])) if pd.notnull(snack['safe_food_mark_list']) else '없음'}"
+        f"📌 알레르기 정보: {', '.join(item['snack_allergy_list']) if item['snack_allergy_list'] is not None else '없음'}",
+        f"📌 인증 마크: {', '.join(item['snack_safe_food_mark_list']) if item['snack_safe_food_mark_list'] is not None else '없음'}"
     ])
 
     rag_documents.append({
         "page_content": page_content,
         "metadata": {
-            "filename": f"snack_{i}"
+            "filename": f"snack_{item['item_index']}"
         }
     })
 
@@ -72,4 +50,3 @@ with open(output_path, "w", encoding="utf-8") as f:
     json.dump(rag_documents, f, ensure_ascii=False, indent=2)
 
 output_path
-
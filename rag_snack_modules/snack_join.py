@@ -0,0 +1,104 @@
+import ast
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+# 목적: 간식 CSV 4종(snack / snack_item / snack_additive / map_snack_item_additive)을 한 번에 조인
+# - 테이블마다 한 번만 인덱싱(merge + groupby)해 품목별 반복 필터링(O(품목 × 테이블 크기))을 제거
+# - 첨가물의 main_use_list, 간식의 allergy/인증 JSON은 행마다가 아니라 원본 행당 한 번만 파싱
+# - Vectordb_csv2json_snack.py / Tuning_csv2json_snack.py가 공유
+
+RAW_DIR = "raw_snack_data"
+
+
+def parse_json_list(value: Any) -> Optional[list]:
+    """JSON(또는 파이썬 리터럴) 문자열 → 리스트, 비어 있으면 None, 파싱 실패 시 []"""
+    if not isinstance(value, str) and pd.isnull(value):
+        return None
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return []
+
+
+def load_snack_tables(raw_dir: str = RAW_DIR) -> Dict[str, pd.DataFrame]:
+    return {
+        "snack": pd.read_csv(os.path.join(raw_dir, "snack.csv")),
+        "snack_item": pd.read_csv(os.path.join(raw_dir, "snack_item.csv")),
+        "snack_additive": pd.read_csv(os.path.join(raw_dir, "snack_additive.csv")),
+        "map": pd.read_csv(os.path.join(raw_dir, "map_snack_item_additive.csv")),
+    }
+
+
+def build_additives(snack_additive_df: pd.DataFrame) -> Dict[Any, Dict[str, Any]]:
+    """첨가물 id → 파싱된 첨가물 정보 (main_use_list는 첨가물당 한 번만 파싱)"""
+    return {
+        row["id"]: {
+            "korean_name": row["korean_name"],
+            "grade": row["grade"],
+            "uses": parse_json_list(row["main_use_list"]) or [],
+            "description": row["description"],
+            "stability_message": row["stability_message"],
+        }
+        for row in snack_additive_df.drop_duplicates("id").to_dict("records")
+    }
+
+
+def join_snack_items(snack_df: pd.DataFrame, snack_item_df: pd.DataFrame,
+                     snack_additive_df: pd.DataFrame, map_df: pd.DataFrame) -> pd.DataFrame:
+    """간식이 있는 품목(snack_item) 한 행당 간식 정보 + 첨가물 id 목록 + 파싱된 영양 정보를 붙인 DataFrame
+
+    snack.csv에 없는 snack_id를 가리키는 품목은 빠짐 (inner 조인 — left 조인이면 간식 정수 컬럼이 float로 바뀜)
+
+    Returns:
+        pd.DataFrame: snack_item 컬럼 + snack_* 컬럼(snack.csv, allergy/인증은 파싱된 리스트 또는 None)
+            + item_index(원본 행 번호), additive_ids(첨가물 테이블 순서), nutrients
+    """
+    # 1. 간식: id 중복 시 첫 행 사용, JSON 컬럼은 간식당 한 번만 파싱
+    snacks = snack_df.drop_duplicates("id").copy()
+    snacks["allergy_list"] = snacks["allergy_list"].map(parse_json_list)
+    snacks["safe_food_mark_list"] = snacks["safe_food_mark_list"].map(parse_json_list)
+
+    # 2. 품목별 첨가물 id 목록 (존재하는 첨가물만, 중복 제거, 첨가물 테이블 순서 유지)
+    additive_order = pd.Series(range(len(snack_additive_df)), index=snack_additive_df["id"])
+    additive_order = additive_order[~additive_order.index.duplicated()]
+    links = map_df[["snack_item_id", "snack_additive_id"]].drop_duplicates()
+    links = links[links["snack_additive_id"].isin(additive_order.index)]
+    links = links.assign(order=links["snack_additive_id"].map(additive_order)).sort_values(["snack_item_id", "order"])
+    additive_ids = links.groupby("snack_item_id", sort=False)["snack_additive_id"].agg(list)
+
+    # 3. 품목 ← 간식 조인 (품목 순서 유지)
+    items = snack_item_df.assign(item_index=snack_item_df.index)
+    joined = items.merge(snacks.add_prefix("snack_"), on="snack_id", how="inner")
+    joined["additive_ids"] = [ids if isinstance(ids, list) else [] for ids in joined["id"].map(additive_ids)]
+    joined["nutrients"] = [parse_json_list(value) or [] for value in joined["nutrient_list"]]
+    return joined
+
+
+def missing_snack_ids(snack_df: pd.DataFrame, snack_item_df: pd.DataFrame) -> list:
+    """snack.csv에 없는 snack_id 목록 (품목 순서, 중복 제거)"""
+    orphans = snack_item_df.loc[~snack_item_df["snack_id"].isin(snack_df["id"]), "snack_id"]
+    return orphans.unique().tolist()
+
+
+def load_joined_snack_items(raw_dir: str = RAW_DIR):
+    """CSV 로드 → (간식이 있는 품목의 조인 DataFrame, 첨가물 id → 정보 dict, 간식이 없는 snack_id 목록)"""
+    tables = load_snack_tables(raw_dir)
+    joined = join_snack_items(tables["snack"], tables["snack_item"], tables["snack_additive"], tables["map"])
+    missing = missing_snack_ids(tables["snack"], tables["snack_item"])
+    return joined, build_additives(tables["snack_additive"]), missing
+
+
+def format_nutrients(nutrients: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "nutrient": n['nutrient'],
+            "amount": n['servingAmountInfo']['amount'],
+            "unit": n['servingAmountInfo']['amountUnit'],
+        } for n in nutrients
+    ]
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# rag_drug_agent 스크립트들은 같은 폴더 모듈을 바로 import하므로 (from name_index import ...) 경로에 추가
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "rag_drug_agent"))
+sys.path.insert(0, ROOT)
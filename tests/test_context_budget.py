@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("tiktoken")
+
+from langchain_core.documents import Document
+
+from context_budget import CONTEXT_MIN_TAIL, assemble_context, count_tokens
+
+BODY = "이 약은 두통, 치통, 생리통 등의 통증 완화와 해열에 사용합니다. 1회 1~2정씩 하루 3~4회 복용합니다."
+
+
+def test_duplicates_keep_higher_score_and_record_merged_item():
+    docs = [
+        Document(page_content=f"약품명: 가정\n{BODY}", metadata={"itemName": "가정", "score": 0.7}),
+        Document(page_content=f"약품명: 나정\n{BODY}", metadata={"itemName": "나정", "score": 0.9}),
+        Document(page_content="약품명: 다정\n졸음이 올 수 있으므로 운전을 피하십시오.", metadata={"itemName": "다정", "score": 0.8}),
+    ]
+    selected, stats = assemble_context(docs, budget=10_000)
+    assert [doc.metadata["itemName"] for doc in selected] == ["나정", "다정"]
+    assert selected[0].metadata["merged_items"] == ["가정"]
+    assert stats.duplicates == 1 and stats.dropped == 0
+    assert "merged_items" not in docs[1].metadata  # 원본 문서는 그대로
+
+
+def test_max_docs_and_budget():
+    docs = [Document(page_content=f"{i}번 문서 " + "설명 " * 200, metadata={"score": 1.0 - i / 10}) for i in range(3)]
+    first = count_tokens(docs[0].page_content)
+
+    selected, stats = assemble_context(docs, budget=10_000, max_docs=2)
+    assert len(selected) == 2 and stats.dropped == 1
+
+    # 첫 문서만 다 들어가고, 남은 예산이 CONTEXT_MIN_TAIL 이상이면 다음 문서는 잘라서 넣음
+    selected, stats = assemble_context(docs, budget=first + CONTEXT_MIN_TAIL)
+    assert len(selected) == 2 and selected[1].metadata["truncated"]
+    assert stats.tokens_after <= first + CONTEXT_MIN_TAIL
+    assert "�" not in selected[1].page_content
+
+    selected, stats = assemble_context(docs, budget=first + CONTEXT_MIN_TAIL - 1)
+    assert len(selected) == 1 and stats.dropped == 2
@@ -0,0 +1,59 @@
+import pandas as pd
+
+from ddi_graph import DDIGraph, DUR_SOURCE_NAME, interaction_facts
+
+
+def make_graph() -> DDIGraph:
+    pairs = pd.DataFrame([
+        {"item": "트라마돌정", "ingredient": "트라마돌", "other": "세레길린정", "content": "세로토닌 증후군"},
+        {"item": "트라마돌정", "ingredient": "트라마돌", "other": "리네졸리드주", "content": ""},
+        {"item": "타이레놀정", "ingredient": "아세트아미노펜", "other": "", "content": ""},
+    ])
+    return DDIGraph.build(pairs)
+
+
+def node(graph: DDIGraph, name: str) -> int:
+    return graph.names.index(name)
+
+
+def test_check_pair_through_ingredient():
+    graph = make_graph()
+    hits = graph.check_pair([node(graph, "트라마돌")], [node(graph, "세레길린정")])
+    assert [(graph.names[a], graph.names[b], graph.reasons[r]) for a, b, r in hits] == [
+        ("트라마돌정", "세레길린정", "세로토닌 증후군"),
+    ]
+    assert graph.check_pair([node(graph, "타이레놀정")], [node(graph, "세레길린정")]) == []
+
+
+def test_contraindicated_neighbours():
+    graph = make_graph()
+    neighbours = graph.contraindicated([node(graph, "트라마돌정")])
+    assert sorted(graph.names[other] for other in neighbours) == ["리네졸리드주", "세레길린정"]
+    assert [graph.names[other] for other in graph.contraindicated([node(graph, "세레길린정")])] == ["트라마돌정"]
+
+
+def test_save_and_load(tmp_path):
+    graph = make_graph()
+    path = str(tmp_path / "ddi_graph.npz")
+    graph.save(path)
+    loaded = DDIGraph.load(path)
+    assert loaded.names == graph.names
+    assert loaded.reasons == graph.reasons
+    assert loaded.contraindicated([node(loaded, "트라마돌정")]) == graph.contraindicated([node(graph, "트라마돌정")])
+
+
+def test_interaction_facts_pair():
+    doc = interaction_facts("트라마돌정이랑 세레길린정 같이 먹어도 돼?", make_graph())
+    assert doc.metadata["itemName"] == DUR_SOURCE_NAME
+    assert "병용금기 — 세로토닌 증후군" in doc.page_content
+
+    doc = interaction_facts("타이레놀정이랑 세레길린정 같이 먹어도 돼?", make_graph())
+    assert "목록에 없음" in doc.page_content
+
+
+def test_interaction_facts_neighbours_and_no_match():
+    graph = make_graph()
+    doc = interaction_facts("트라마돌정이랑 같이 먹으면 안 되는 약 알려줘", graph)
+    assert "리네졸리드주: 병용금기 — 사유 미기재" in doc.page_content
+    assert interaction_facts("트라마돌정 부작용 알려줘", graph) is None
+    assert interaction_facts("두통약 추천해줘", graph) is None
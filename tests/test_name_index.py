@@ -0,0 +1,74 @@
+from langchain_core.documents import Document
+
+from name_index import DrugNameIndex, fuse_ranked, name_aliases, search_with_names
+
+
+def make_index() -> DrugNameIndex:
+    rows = [
+        {"id": "1-0", "itemSeq": "1", "itemName": "타이레놀정500밀리그람(아세트아미노펜)", "entpName": "한국얀센", "chunk": "타이레놀"},
+        {"id": "2-0", "itemSeq": "2", "itemName": "하루정", "entpName": "가나제약", "chunk": "하루"},
+        {"id": "3-0", "itemSeq": "3", "itemName": "두통엔정", "entpName": "다라제약", "chunk": "두통엔"},
+        {"id": "4-0", "itemSeq": "4", "itemName": "게보린정", "entpName": "삼진제약", "chunk": "게보린 삼진"},
+        {"id": "5-0", "itemSeq": "5", "itemName": "게보린정", "entpName": "마바제약", "chunk": "게보린 마바"},
+    ]
+    return DrugNameIndex(rows)
+
+
+def test_name_aliases_strip_dose_form_and_parens():
+    aliases = name_aliases("타이레놀정500밀리그람(아세트아미노펜)")
+    assert aliases[0] == "타이레놀정500밀리그람아세트아미노펜"
+    assert "타이레놀정500밀리그람" in aliases
+    assert "타이레놀" in aliases
+
+
+def test_short_stripped_alias_is_not_generated():
+    # "하루정" → "하루"는 MIN_STRIPPED_ALIAS_LENGTH 미만이라 별칭으로 쓰지 않음
+    assert name_aliases("하루정") == ["하루정"]
+
+
+def test_stripped_alias_requires_word_start():
+    index = make_index()
+    assert index.match("타이레놀 부작용") == ["1"]
+    assert index.match("두통엔 뭐가 좋아?") == ["3"]
+    assert index.match("편두통엔 뭐가 좋아?") == []  # "편두통엔" 속 "두통엔"은 우연한 일치
+    assert index.match("하루에 몇 번 먹어요?") == []
+
+
+def test_company_narrows_same_name_products():
+    index = make_index()
+    assert sorted(index.match("게보린정 복용법")) == ["4", "5"]
+    assert index.match("삼진제약 게보린정 복용법") == ["4"]
+
+
+def test_confidence():
+    index = make_index()
+    assert index.match_with_confidence("하루정 부작용") == (["2"], True)
+    assert index.match_with_confidence("타이레놀 부작용") == (["1"], False)  # 제형/용량을 뗀 별칭
+    assert index.match_with_confidence("게보린정 부작용")[1] is False  # 같은 이름의 약품 2개
+    assert index.match_with_confidence("두통") == ([], False)
+
+
+def test_search_with_names_skips_vector_search_on_confident_hit():
+    index = make_index()
+    calls = []
+
+    def vector_search():
+        calls.append(1)
+        return [Document(id="v", page_content="vector", metadata={"itemName": "기타", "score": 0.5})]
+
+    docs = search_with_names(index, "하루정 부작용", 3, None, vector_search)
+    assert [doc.id for doc in docs] == ["2-0"] and not calls
+
+    docs = search_with_names(index, "타이레놀 부작용", 3, None, vector_search)
+    assert {doc.id for doc in docs} == {"1-0", "v"} and calls
+
+    assert [doc.id for doc in search_with_names(index, "열이 나요", 3, None, vector_search)] == ["v"]
+    assert [doc.id for doc in search_with_names(None, "하루정", 3, None, vector_search)] == ["v"]
+
+
+def test_fuse_ranked_merges_duplicates():
+    a = Document(id="a", page_content="a")
+    b = Document(id="b", page_content="b")
+    fused = fuse_ranked([a, b], [b])
+    assert [doc.id for doc in fused] == ["b", "a"]
+    assert fused[0].metadata["score"] > fused[1].metadata["score"]
@@ -0,0 +1,94 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from vector_backend import LocalIndex, quantize
+
+DIMENSION = 8
+
+
+def random_vectors(n: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((n, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_index(path, dtype: str) -> LocalIndex:
+    return LocalIndex(path=str(path), dimension=DIMENSION, mode="exact", dtype=dtype)
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_quantize_round_trip(dtype):
+    vectors = random_vectors(16)
+    stored, scales = quantize(vectors, dtype)
+    decoded = stored.astype(np.float32) * (scales[:, None] if scales is not None else 1.0)
+    assert np.abs(decoded - vectors).max() < 0.02
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_query_returns_nearest_vector(tmp_path, dtype):
+    vectors = random_vectors(20)
+    index = make_index(tmp_path, dtype)
+    index.upsert([(f"doc-{i}", vector.tolist(), {"itemName": f"약품{i}"}) for i, vector in enumerate(vectors)])
+
+    result = index.query(vectors[7].tolist(), top_k=3, include_metadata=True)
+    assert result["matches"][0]["id"] == "doc-7"
+    assert result["matches"][0]["metadata"] == {"itemName": "약품7"}
+    assert result["matches"][0]["score"] == pytest.approx(1.0, abs=0.02)
+
+
+def test_filter(tmp_path):
+    vectors = random_vectors(6)
+    index = make_index(tmp_path, "float32")
+    index.upsert([
+        {"id": f"doc-{i}", "values": vector.tolist(), "metadata": {"section": "effect" if i % 2 else "caution"}}
+        for i, vector in enumerate(vectors)
+    ])
+
+    result = index.query(vectors[0].tolist(), top_k=6, include_metadata=True, filter={"section": "effect"})
+    assert {match["id"] for match in result["matches"]} == {"doc-1", "doc-3", "doc-5"}
+
+
+def test_delete_and_reupsert(tmp_path):
+    vectors = random_vectors(4)
+    index = make_index(tmp_path, "float16")
+    index.upsert([(f"doc-{i}", vector.tolist()) for i, vector in enumerate(vectors)])
+
+    index.delete(ids=["doc-2"])
+    assert "doc-2" not in [m["id"] for m in index.query(vectors[2].tolist(), top_k=4)["matches"]]
+    assert index.describe_index_stats()["namespaces"][""]["vector_count"] == 3
+
+    index.upsert([("doc-2", vectors[3].tolist())])  # 같은 ID를 다른 벡터로 다시 추가
+    matches = index.query(vectors[3].tolist(), top_k=2)["matches"]
+    assert {m["id"] for m in matches} == {"doc-2", "doc-3"}
+    assert index.describe_index_stats()["namespaces"][""]["vector_count"] == 4
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_persist_and_reopen(tmp_path, dtype):
+    vectors = random_vectors(10)
+    index = make_index(tmp_path, dtype)
+    index.upsert([(f"doc-{i}", vector.tolist(), {"n": i}) for i, vector in enumerate(vectors)], namespace="drug")
+    index.delete(ids=["doc-0"], namespace="drug")
+    index.persist()
+
+    meta_path = os.path.join(tmp_path, "drug", "meta.json")
+    with open(meta_path, encoding="utf-8") as f:
+        assert json.load(f)["dimension"] == DIMENSION
+
+    reopened = make_index(tmp_path, dtype)
+    result = reopened.query(vectors[4].tolist(), top_k=1, namespace="drug", include_metadata=True)
+    assert result["matches"][0]["id"] == "doc-4"
+    assert result["matches"][0]["metadata"] == {"n": 4}
+    assert reopened.query(vectors[0].tolist(), top_k=10, namespace="drug")["matches"][0]["id"] != "doc-0"
+    assert len(reopened.query(vectors[0].tolist(), top_k=10, namespace="drug")["matches"]) == 9
+
+
+def test_reopen_with_other_dimension_fails(tmp_path):
+    index = make_index(tmp_path, "float32")
+    index.upsert([("doc-0", random_vectors(1)[0].tolist())])
+    index.persist()
+
+    with pytest.raises(ValueError):
+        LocalIndex(path=str(tmp_path), dimension=DIMENSION * 2, dtype="float32").query([0.0] * DIMENSION * 2)